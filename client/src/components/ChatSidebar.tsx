@@ -24,6 +24,7 @@ export const ChatSidebar = () => {
   ]);
   const [input, setInput] = useState("");
   const [isLoading, setIsLoading] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
   const scrollAreaRef = useRef<HTMLDivElement>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
@@ -78,12 +79,22 @@ export const ChatSidebar = () => {
     setIsLoading(true);
 
     try {
-      const response = await api.sendMessage(currentInput);
-      const aiMessage: Message = {
-        role: "assistant",
-        content: response.response
-      };
-      setMessages(prev => [...prev, aiMessage]);
+      let started = false;
+      await api.streamMessage(currentInput, {
+        onToken: (token) => {
+          if (!started) {
+            // Replace the "Thinking..." indicator with the message being streamed
+            started = true;
+            setIsStreaming(true);
+            setMessages(prev => [...prev, { role: "assistant", content: token }]);
+            return;
+          }
+          setMessages(prev => {
+            const last = prev[prev.length - 1];
+            return [...prev.slice(0, -1), { ...last, content: last.content + token }];
+          });
+        },
+      });
     } catch (error) {
       const errorMessage: Message = {
         role: "assistant",
@@ -94,6 +105,7 @@ export const ChatSidebar = () => {
       setMessages(prev => [...prev, errorMessage]);
     } finally {
       setIsLoading(false);
+      setIsStreaming(false);
     }
   };
 
@@ -127,7 +139,7 @@ export const ChatSidebar = () => {
                 </div>
               </div>
             ))}
-            {isLoading && (
+            {isLoading && !isStreaming && (
               <div className="flex justify-start">
                 <div className="max-w-[80%] rounded-lg px-4 py-2 bg-muted text-foreground">
                   <p className="text-sm italic">
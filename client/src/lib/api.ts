@@ -55,11 +55,37 @@ export interface User {
   created_at: string;
 }
 
+export interface ChatSource {
+  url: string | null;
+  source: string | null;
+  type: string;
+}
+
+export interface ChatStreamHandlers {
+  onSources?: (sources: ChatSource[]) => void;
+  onToken: (token: string) => void;
+}
+
 export interface LoginResponse {
   access_token: string;
   token_type: string;
 }
 
+// Identifies this browser tab's chat history on the server
+function getChatSessionId(): string {
+  let sessionId = sessionStorage.getItem("chat_session_id");
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    sessionStorage.setItem("chat_session_id", sessionId);
+  }
+  return sessionId;
+}
+
+function chatHeaders(): Record<string, string> {
+  const token = localStorage.getItem("auth_token");
+  return token ? { Authorization: `Bearer ${token}` } : {};
+}
+
 async function fetchAPI<T>(endpoint: string, options?: RequestInit): Promise<T> {
   const controller = new AbortController();
   const timeoutId = setTimeout(() => controller.abort(), 10000); // 10 second timeout
@@ -164,13 +190,68 @@ export const api = {
   sendMessage: async (message: string): Promise<{ response: string }> => {
     return fetchAPI<{ response: string }>("/chat/", {
       method: "POST",
-      body: JSON.stringify({ message }),
+      headers: chatHeaders(),
+      body: JSON.stringify({ message, session_id: getChatSessionId() }),
     });
   },
 
+  // Streams the answer as server-sent events; resolves with the full response
+  streamMessage: async (message: string, handlers: ChatStreamHandlers): Promise<string> => {
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", ...chatHeaders() },
+      body: JSON.stringify({ message, session_id: getChatSessionId() }),
+    });
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({ detail: response.statusText }));
+      throw new Error(errorData.detail || `API error: ${response.statusText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let fullResponse = "";
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf("\n\n");
+
+        let event = "message";
+        let data = "";
+        for (const line of rawEvent.split("\n")) {
+          if (line.startsWith("event: ")) event = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        const payload = data ? JSON.parse(data) : {};
+
+        if (event === "sources") {
+          handlers.onSources?.(payload.sources);
+        } else if (event === "token") {
+          fullResponse += payload.content;
+          handlers.onToken(payload.content);
+        } else if (event === "error") {
+          throw new Error(payload.detail);
+        } else if (event === "done") {
+          return payload.response ?? fullResponse;
+        }
+      }
+    }
+    return fullResponse;
+  },
+
   clearChat: async (): Promise<{ message: string }> => {
-    return fetchAPI<{ message: string }>("/chat/", {
+    const params = new URLSearchParams({ session_id: getChatSessionId() });
+    return fetchAPI<{ message: string }>(`/chat/?${params}`, {
       method: "DELETE",
+      headers: chatHeaders(),
     });
   },
 };
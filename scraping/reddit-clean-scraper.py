@@ -1,158 +1,563 @@
-import requests
-import time
-import os
-import pandas as pd
-import random
-from tqdm import tqdm
-
-# -----------------------------------------
-# CONFIG
-# -----------------------------------------
-RELEVANT_SUBREDDITS = [
-    "Netherlands", "thenetherlands", "dutch", "Nederland",
-    "Netherlands_Memes", "NetherlandsHousing", "StudyInTheNetherlands",
-    "TheHague", "Amsterdam", "Rentbusters", "europe"
-]
-
-KEYWORD = "rijswijk"
-HEADERS = {"User-Agent": "civicpulse-scraper-v1.0 (by u/your_username)"}
-
-OUTPUT_PATH = "datasets/cleaned_reddit_data.csv"
-MAX_PAGES_PER_SUB = 50
-RATE_LIMIT = 100  # requests per minute
-DELAY = 60 / RATE_LIMIT
-MAX_BACKOFF = 120  # max sleep in seconds
-MAX_RETRIES = 5
-
-os.makedirs("datasets", exist_ok=True)
-
-# -----------------------------------------
-# SAFE REQUEST WITH BACKOFF
-# -----------------------------------------
-def safe_request(url, params=None):
-    """GET with exponential backoff, retry, and jitter."""
-    backoff = 5
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            r = requests.get(url, headers=HEADERS, params=params, timeout=15)
-            if r.status_code == 429:
-                tqdm.write(f"⏳ Rate limited — sleeping {backoff}s...")
-                time.sleep(backoff + random.uniform(0, 3))
-                backoff = min(backoff * 2, MAX_BACKOFF)
-                continue
-            r.raise_for_status()
-            time.sleep(DELAY + random.uniform(0, 0.3))
-            return r
-        except requests.exceptions.RequestException as e:
-            tqdm.write(f"⚠️ Attempt {attempt}/{MAX_RETRIES}: {e}")
-            time.sleep(backoff + random.uniform(0, 2))
-            backoff = min(backoff * 2, MAX_BACKOFF)
-    tqdm.write(f"❌ Failed after {MAX_RETRIES} retries → {url}")
-    return None
-
-
-# -----------------------------------------
-# FETCH HELPERS
-# -----------------------------------------
-def fetch_posts(subreddit, after=None):
-    url = f"https://www.reddit.com/r/{subreddit}/search.json"
-    params = {
-        "q": KEYWORD,
-        "restrict_sr": "on",
-        "sort": "new",
-        "after": after,
-        "limit": 100,
-    }
-    resp = safe_request(url, params)
-    return resp.json() if resp else None
-
-
-def fetch_comments(subreddit, post_id):
-    url = f"https://www.reddit.com/r/{subreddit}/comments/{post_id}.json"
-    resp = safe_request(url, {"limit": 500})
-    return resp.json() if resp else None
-
-
-def append_to_master(df: pd.DataFrame, path: str):
-    if not os.path.exists(path):
-        df.to_csv(path, index=False, encoding="utf-8")
-    else:
-        df.to_csv(path, mode="a", header=False, index=False, encoding="utf-8")
-
-
-# -----------------------------------------
-# MAIN SCRAPER LOOP
-# -----------------------------------------
-try:
-    for SUBREDDIT in RELEVANT_SUBREDDITS:
-        tqdm.write(f"\n🔍 Searching for '{KEYWORD}' in r/{SUBREDDIT} …")
-        after = None
-        all_posts = []
-
-        for _ in tqdm(range(MAX_PAGES_PER_SUB), desc=f"{SUBREDDIT:<18}", ncols=100):
-            data = fetch_posts(SUBREDDIT, after)
-            if not data or "data" not in data or not data["data"]["children"]:
-                break
-            posts = data["data"]["children"]
-            all_posts.extend(posts)
-            after = data["data"].get("after")
-            if not after:
-                break
-
-        tqdm.write(f"✅ {len(all_posts)} posts found in r/{SUBREDDIT}")
-
-        # Clean + append posts
-        post_rows = []
-        for p in all_posts:
-            d = p["data"]
-            post_rows.append({
-                "post_id": d["id"],
-                "created_at": d["created_utc"],
-                "content": (d.get("title") or "") + " " + (d.get("selftext") or ""),
-                "content_type": "post",
-                "source": "reddit",
-                "url": d.get("url"),
-                "score": d.get("score", 0),
-                "subreddit": SUBREDDIT
-            })
-
-        posts_df = pd.DataFrame(post_rows)
-        posts_df = posts_df[posts_df["content"].str.strip().astype(bool)]
-        posts_df = posts_df.drop_duplicates(subset=["post_id", "content"])
-        append_to_master(posts_df, OUTPUT_PATH)
-
-        tqdm.write(f"💾 Added {len(posts_df)} posts to {OUTPUT_PATH}")
-
-        # Fetch comments
-        comment_rows = []
-        for p in tqdm(all_posts, desc=f"Comments {SUBREDDIT:<12}", ncols=100):
-            post_id = p["data"]["id"]
-            comments_json = fetch_comments(SUBREDDIT, post_id)
-            if not comments_json or len(comments_json) < 2:
-                continue
-            for c in comments_json[1]["data"]["children"]:
-                if c["kind"] != "t1":
-                    continue
-                cd = c["data"]
-                comment_rows.append({
-                    "post_id": post_id,
-                    "created_at": cd["created_utc"],
-                    "content": (cd.get("body") or "").replace("\n", " ").strip(),
-                    "content_type": "comment",
-                    "source": "reddit",
-                    "url": f"https://www.reddit.com{cd.get('permalink','')}",
-                    "score": cd.get("score", 0),
-                    "subreddit": SUBREDDIT
-                })
-
-        if comment_rows:
-            comments_df = pd.DataFrame(comment_rows)
-            comments_df = comments_df[comments_df["content"].str.strip().astype(bool)]
-            comments_df = comments_df.drop_duplicates(subset=["post_id", "content"])
-            append_to_master(comments_df, OUTPUT_PATH)
-            tqdm.write(f"💾 Added {len(comments_df)} comments to {OUTPUT_PATH}")
-
-    print("\n🎉 All subreddits processed successfully!")
-
-except KeyboardInterrupt:
-    print("\n🛑 Interrupted — progress saved.")
+import asyncio
+import hashlib
+import httpx
+import json
+import sqlite3
+import time
+import os
+import random
+import uuid
+from datetime import datetime, timezone
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+# -----------------------------------------
+# CONFIG
+# -----------------------------------------
+RELEVANT_SUBREDDITS = [
+    "Netherlands", "thenetherlands", "dutch", "Nederland",
+    "Netherlands_Memes", "NetherlandsHousing", "StudyInTheNetherlands",
+    "TheHague", "Amsterdam", "Rentbusters", "europe"
+]
+
+KEYWORD = "rijswijk"
+HEADERS = {"User-Agent": "civicpulse-scraper-v1.0 (by u/your_username)"}
+BASE_URL = os.environ.get("REDDIT_BASE_URL", "https://www.reddit.com")  # point at a mock server for testing
+
+OUTPUT_DIR = "datasets/reddit"  # Parquet dataset, partitioned subreddit=<name>/date=<YYYY-MM-DD>
+DEDUP_INDEX_PATH = "datasets/scrape_dedup_index.sqlite3"
+CHECKPOINT_PATH = "datasets/scrape_checkpoint.json"
+FLUSH_ROWS = 20_000  # buffered rows per Parquet write
+MAX_PAGES_PER_SUB = 50
+RATE_LIMIT = 100  # requests per minute, shared by all concurrent requests
+BURST = 5  # requests that may go out back-to-back after an idle period
+CONCURRENCY = 10  # requests in flight (and pooled keep-alive connections)
+MAX_BACKOFF = 120  # max sleep in seconds
+MAX_RETRIES = 5
+MORECHILDREN_BATCH = 100  # comment IDs per /api/morechildren request (Reddit's maximum)
+
+os.makedirs("datasets", exist_ok=True)
+
+
+# -----------------------------------------
+# GLOBAL RATE LIMITER
+# -----------------------------------------
+class TokenBucket:
+    """
+    Request budget shared by every task: RATE_LIMIT / 60 tokens per second,
+    at most `capacity` saved up. Waiters are served in FIFO order, and a 429
+    (or an exhausted Reddit quota) pauses everyone, not just the request that
+    saw it.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Hold back all requests for `seconds` and start again with an empty bucket."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+
+# -----------------------------------------
+# SAFE REQUEST WITH BACKOFF
+# -----------------------------------------
+async def safe_request(client, limiter, semaphore, url, params=None):
+    """GET with the global rate limit, exponential backoff, retry, and jitter."""
+    params = {key: value for key, value in (params or {}).items() if value is not None}
+    backoff = 5
+    for attempt in range(1, MAX_RETRIES + 1):
+        await limiter.acquire()
+        try:
+            async with semaphore:
+                r = await client.get(url, params=params)
+            if r.status_code == 429:
+                wait = max(backoff, float(r.headers.get("retry-after") or 0))
+                tqdm.write(f"⏳ Rate limited — pausing all requests for {wait:.0f}s...")
+                limiter.pause(wait + random.uniform(0, 3))
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            r.raise_for_status()
+            # Reddit reports the remaining quota; wait for the reset rather than earning a 429
+            remaining = r.headers.get("x-ratelimit-remaining")
+            if remaining is not None and float(remaining) < 1:
+                limiter.pause(float(r.headers.get("x-ratelimit-reset") or backoff))
+            return r
+        except (httpx.HTTPError, ValueError) as e:
+            tqdm.write(f"⚠️ Attempt {attempt}/{MAX_RETRIES}: {e}")
+            await asyncio.sleep(backoff + random.uniform(0, 2))
+            backoff = min(backoff * 2, MAX_BACKOFF)
+    tqdm.write(f"❌ Failed after {MAX_RETRIES} retries → {url}")
+    return None
+
+
+# -----------------------------------------
+# FETCH HELPERS
+# -----------------------------------------
+async def fetch_posts(client, limiter, semaphore, subreddit, after=None):
+    url = f"/r/{subreddit}/search.json"
+    params = {
+        "q": KEYWORD,
+        "restrict_sr": "on",
+        "sort": "new",
+        "after": after,
+        "limit": 100,
+    }
+    resp = await safe_request(client, limiter, semaphore, url, params)
+    return resp.json() if resp else None
+
+
+async def fetch_comments(client, limiter, semaphore, subreddit, post_id, comment_id=None):
+    """The post's comment listing, or with comment_id the subthread below that comment."""
+    url = f"/r/{subreddit}/comments/{post_id}.json"
+    if comment_id:
+        url = f"/r/{subreddit}/comments/{post_id}/_/{comment_id}.json"
+    resp = await safe_request(client, limiter, semaphore, url, {"limit": 500})
+    return resp.json() if resp else None
+
+
+async def fetch_more_children(client, limiter, semaphore, post_id, children):
+    """Comments hidden behind "load more" stubs, as a flat list of things."""
+    params = {
+        "api_type": "json",
+        "link_id": f"t3_{post_id}",
+        "children": ",".join(children),
+        "limit_children": "false",
+    }
+    resp = await safe_request(client, limiter, semaphore, "/api/morechildren.json", params)
+    if not resp:
+        return None
+    body = resp.json().get("json") or {}
+    if "data" not in body:
+        # Reddit's error shape: {"json": {"errors": [...]}}
+        tqdm.write(f"⚠️ morechildren for t3_{post_id} failed: {body.get('errors')}")
+        return None
+    return body["data"].get("things", [])
+
+
+# -----------------------------------------
+# CHECKPOINT
+# -----------------------------------------
+class Checkpoint:
+    """
+    Per-subreddit crawl state in a JSON file, rewritten atomically with
+    every Parquet flush so an interrupted run resumes where it stopped:
+
+    - after: search cursor of the next older page still to fetch (None once
+      the subreddit has been crawled to the end or MAX_PAGES_PER_SUB)
+    - newest_created_utc: newest post seen, where the next run's search for
+      new posts stops
+    - fetched_post_ids: posts whose comments have been written
+    - incomplete_post_ids: fetched posts whose comment tree is missing
+      parts after a failed request, fetched again at the start of a run
+
+    Delete the file (and the dedup index) to crawl everything again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def subreddit(self, subreddit: str) -> dict:
+        state = self.state.setdefault(subreddit, {"after": None, "newest_created_utc": None, "fetched_post_ids": []})
+        state.setdefault("incomplete_post_ids", [])
+        return state
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+# -----------------------------------------
+# PARQUET OUTPUT
+# -----------------------------------------
+SCHEMA = pa.schema([
+    ("post_id", pa.string()),
+    ("comment_id", pa.string()),
+    ("created_at", pa.float64()),
+    ("content", pa.string()),
+    ("content_type", pa.string()),
+    ("source", pa.string()),
+    ("url", pa.string()),
+    ("score", pa.int64()),
+    ("subreddit", pa.string()),
+    ("parent_id", pa.string()),  # fullname of the parent: t3_<post> for top-level comments, else t1_<comment>
+    ("depth", pa.int64()),  # 0 for top-level comments, null for posts
+    ("date", pa.string()),
+])
+
+
+class DedupIndex:
+    """
+    (post_id, comment_id, content hash) of every row ever written, in SQLite,
+    so a row is written once across runs and partitions. The comment id keeps
+    short replies that share a body ("+1", "[deleted]") apart; the hash lets
+    an edited comment through again. Claims are committed only after the
+    Parquet files holding them are on disk: a crash in between writes a row
+    twice on the next run, never drops it.
+    """
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS seen_rows ("
+            "post_id TEXT, comment_id TEXT, content_hash BLOB, PRIMARY KEY (post_id, comment_id, content_hash)"
+            ") WITHOUT ROWID"
+        )
+        self.db.commit()
+        # Earlier runs keyed on (post_id, content_hash) in `seen`; what they wrote still counts as written
+        self.legacy = self.db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'seen'").fetchone() is not None
+
+    def claim(self, rows):
+        """Rows whose key isn't in the index yet, adding their keys (uncommitted)."""
+        unseen = []
+        for row in rows:
+            content_hash = hashlib.sha1(row["content"].encode("utf-8")).digest()
+            key = (row["post_id"], row["comment_id"] or "", content_hash)  # "": the post's own row
+            if self.legacy and self.db.execute(
+                "SELECT 1 FROM seen WHERE post_id = ? AND content_hash = ?", (row["post_id"], content_hash)
+            ).fetchone():
+                continue
+            cursor = self.db.execute("INSERT OR IGNORE INTO seen_rows VALUES (?, ?, ?)", key)
+            if cursor.rowcount:
+                unseen.append(row)
+        return unseen
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class ParquetSink:
+    """
+    Buffers cleaned rows and writes them as one Parquet file per partition
+    touched. A flush claims the rows in the dedup index, writes the files,
+    commits the index, and then saves the checkpoint — so the checkpoint never
+    gets ahead of what's on disk.
+    """
+
+    def __init__(self, output_dir: str, dedup: DedupIndex, checkpoint):
+        self.output_dir = output_dir
+        self.dedup = dedup
+        self.checkpoint = checkpoint
+        self.rows = []
+
+    def add(self, rows):
+        self.rows.extend(row for row in rows if row["content"].strip())
+
+    def maybe_flush(self):
+        if len(self.rows) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        rows, self.rows = self.dedup.claim(self.rows), []
+        if rows:
+            for row in rows:
+                row["date"] = datetime.fromtimestamp(row["created_at"], timezone.utc).strftime("%Y-%m-%d")
+            pq.write_to_dataset(
+                pa.Table.from_pylist(rows, schema=SCHEMA),
+                self.output_dir,
+                partition_cols=["subreddit", "date"],
+                # Time-ordered names: sorting the files by name replays the writes in order
+                basename_template=f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+            )
+        self.dedup.commit()
+        self.checkpoint.save()
+        if rows:
+            tqdm.write(f"💾 Wrote {len(rows)} new rows to {self.output_dir}")
+
+
+# -----------------------------------------
+# CLEAN ROWS
+# -----------------------------------------
+def post_row(d, subreddit):
+    return {
+        "post_id": d["id"],
+        "created_at": float(d["created_utc"]),
+        "content": (d.get("title") or "") + " " + (d.get("selftext") or ""),
+        "content_type": "post",
+        "source": "reddit",
+        "url": d.get("url"),
+        "score": d.get("score", 0),
+        "subreddit": subreddit,
+        "comment_id": None,
+        "parent_id": None,
+        "depth": None
+    }
+
+
+def comment_row(cd, post_id, subreddit, depth):
+    return {
+        "post_id": post_id,
+        "created_at": float(cd["created_utc"]),
+        "content": (cd.get("body") or "").replace("\n", " ").strip(),
+        "content_type": "comment",
+        "source": "reddit",
+        "url": f"https://www.reddit.com{cd.get('permalink','')}",
+        "score": cd.get("score", 0),
+        "subreddit": subreddit,
+        "comment_id": cd["id"],  # upsert key for server/db/bulk_load.py
+        "parent_id": cd.get("parent_id"),
+        "depth": depth
+    }
+
+
+def walk_comments(things, post_id, subreddit, depths, more):
+    """
+    Flatten comments and their nested replies into rows, parents first.
+
+    `depths` maps the fullname of every comment already seen in the thread
+    (seeded with the post at -1) to its depth: it gives comments fetched in
+    a later request their depth and skips the ones a subthread repeats.
+    "more" stubs are collected in `more` for the caller to resolve.
+    """
+    stack = list(reversed(things))
+    while stack:
+        thing = stack.pop()
+        cd = thing["data"]
+        if thing["kind"] == "more":
+            more.append(cd)
+            continue
+        if thing["kind"] != "t1":
+            continue
+        name = f"t1_{cd['id']}"
+        if name not in depths:
+            depths[name] = depths[cd["parent_id"]] + 1 if cd.get("parent_id") in depths else cd.get("depth", 0)
+            yield comment_row(cd, post_id, subreddit, depths[name])
+        if cd.get("replies"):
+            stack.extend(reversed(cd["replies"]["data"]["children"]))
+
+
+async def scrape_thread(client, limiter, semaphore, subreddit, post_id, sink):
+    """
+    Stream the whole comment tree of one post into the sink.
+
+    The first listing is walked as it arrives, then the "more" stubs it
+    left are resolved level by level: hidden siblings through batched
+    /api/morechildren calls, "continue this thread" stubs (no children,
+    just a parent) by fetching the subthread. Each level's requests run
+    concurrently under the shared limiter, and rows go to the sink per
+    response, so a large thread is never held in memory at once.
+
+    Returns False when a request failed and part of the tree is missing.
+    """
+    comments_json = await fetch_comments(client, limiter, semaphore, subreddit, post_id)
+    if not comments_json:
+        return False
+    if len(comments_json) < 2:
+        return True
+    depths = {f"t3_{post_id}": -1}
+    more = []
+    complete = True
+
+    def emit(things):
+        sink.add(walk_comments(things, post_id, subreddit, depths, more))
+        sink.maybe_flush()
+
+    async def listing(children):
+        nonlocal complete
+        things = await fetch_more_children(client, limiter, semaphore, post_id, children)
+        if things is None:
+            complete = False
+        else:
+            emit(things)
+
+    async def subthread(parent_id):
+        nonlocal complete
+        comments_json = await fetch_comments(client, limiter, semaphore, subreddit, post_id, parent_id.split("_", 1)[1])
+        if not comments_json:
+            complete = False
+        elif len(comments_json) > 1:
+            emit(comments_json[1]["data"]["children"])
+
+    emit(comments_json[1]["data"]["children"])
+    while more:
+        stubs, more = more, []
+        children = [child for stub in stubs for child in stub.get("children", [])]
+        await asyncio.gather(*(
+            listing(children[i:i + MORECHILDREN_BATCH]) for i in range(0, len(children), MORECHILDREN_BATCH)
+        ), *(
+            subthread(stub["parent_id"]) for stub in stubs
+            if not stub.get("children") and stub.get("parent_id", "").startswith("t1_")
+        ))
+    return complete
+
+
+# -----------------------------------------
+# PER-SUBREDDIT SCRAPE
+# -----------------------------------------
+async def scrape_threads(client, limiter, semaphore, subreddit, post_ids, sink, progress):
+    """
+    Fetch the comment threads of `post_ids` concurrently (the limiter paces
+    them); returns the ids whose tree came back incomplete or failed.
+    """
+    progress.total += len(post_ids)
+    progress.refresh()
+    incomplete = set()
+
+    async def comments_for(post_id):
+        try:
+            if not await scrape_thread(client, limiter, semaphore, subreddit, post_id, sink):
+                incomplete.add(post_id)
+        except Exception as e:
+            # One malformed response shouldn't cost the page
+            tqdm.write(f"⚠️ Comments of {post_id} in r/{subreddit} failed: {e!r}")
+            incomplete.add(post_id)
+        progress.update(1)
+
+    await asyncio.gather(*(comments_for(post_id) for post_id in post_ids))
+    return incomplete
+
+
+async def scrape_page(client, limiter, semaphore, subreddit, posts, state, fetched, sink, progress):
+    """Buffer the unseen posts of one search page with their comments and mark them fetched."""
+    new_posts = [p["data"] for p in posts if p["data"]["id"] not in fetched]
+    incomplete = await scrape_threads(
+        client, limiter, semaphore, subreddit, [d["id"] for d in new_posts], sink, progress
+    )
+    sink.add(post_row(d, subreddit) for d in new_posts)
+
+    fetched.update(d["id"] for d in new_posts)
+    state["fetched_post_ids"] = sorted(fetched)
+    state["incomplete_post_ids"] = sorted(set(state["incomplete_post_ids"]) | incomplete)
+    return len(new_posts)
+
+
+async def retry_incomplete(client, limiter, semaphore, subreddit, state, sink, progress):
+    """Fetch the threads an earlier run couldn't complete again; the dedup index drops the rows already written."""
+    if not state["incomplete_post_ids"]:
+        return
+    still_incomplete = await scrape_threads(
+        client, limiter, semaphore, subreddit, state["incomplete_post_ids"], sink, progress
+    )
+    state["incomplete_post_ids"] = sorted(still_incomplete)
+    sink.maybe_flush()
+
+
+async def crawl(client, limiter, semaphore, subreddit, sink, fetched, progress, after=None, stop_at=None):
+    """
+    Walk search pages (newest first) from `after`.
+
+    With stop_at, this is the search for posts newer than the last run: it
+    stops at the first already-known post and leaves the resume cursor
+    alone. Otherwise the cursor is checkpointed with the next flush.
+    """
+    state = sink.checkpoint.subreddit(subreddit)
+    found = 0
+    newest = None
+    reached_known = False
+    for _ in range(MAX_PAGES_PER_SUB):
+        data = await fetch_posts(client, limiter, semaphore, subreddit, after)
+        if not data or "data" not in data:
+            break  # Request failed; keep the cursor so the next run retries this page
+        if not data["data"]["children"]:
+            after = None
+            break
+        posts = data["data"]["children"]
+        reached_known = stop_at is not None and any(p["data"]["created_utc"] <= stop_at for p in posts)
+        if stop_at is not None:
+            posts = [p for p in posts if p["data"]["created_utc"] > stop_at]
+        newest = max([newest or 0] + [p["data"]["created_utc"] for p in posts])
+        found += await scrape_page(client, limiter, semaphore, subreddit, posts, state, fetched, sink, progress)
+        after = data["data"].get("after")
+        if stop_at is None:
+            state["after"] = after
+            if state["newest_created_utc"] is None:
+                state["newest_created_utc"] = newest
+        sink.maybe_flush()
+        if not after or reached_known:
+            break
+
+    if stop_at is None:
+        state["after"] = after
+    elif newest and (reached_known or not after):
+        # Only move the stop mark once every newer page has been fetched
+        state["newest_created_utc"] = max(state["newest_created_utc"], newest)
+    sink.maybe_flush()
+    return found
+
+
+async def scrape_subreddit(client, limiter, semaphore, subreddit, sink, progress):
+    state = sink.checkpoint.subreddit(subreddit)
+    fetched = set(state["fetched_post_ids"])
+    tqdm.write(f"\n🔍 Searching for '{KEYWORD}' in r/{subreddit} …")
+
+    found = 0
+    try:
+        await retry_incomplete(client, limiter, semaphore, subreddit, state, sink, progress)
+        if state["newest_created_utc"] is not None:
+            # Posts published since the last run
+            found += await crawl(
+                client, limiter, semaphore, subreddit, sink, fetched, progress,
+                stop_at=state["newest_created_utc"]
+            )
+        if state["newest_created_utc"] is None or state["after"]:
+            # First crawl, or older pages an interrupted run didn't reach
+            found += await crawl(client, limiter, semaphore, subreddit, sink, fetched, progress, after=state["after"])
+    except Exception as e:
+        # Keep the other subreddits going; the checkpoint only covers completed pages
+        tqdm.write(f"❌ r/{subreddit} stopped after {found} new posts: {e!r} — re-run to resume")
+        return
+
+    tqdm.write(f"✅ {found} new posts found in r/{subreddit}")
+
+
+# -----------------------------------------
+# MAIN SCRAPER LOOP
+# -----------------------------------------
+async def main():
+    dedup = DedupIndex(DEDUP_INDEX_PATH)
+    sink = ParquetSink(OUTPUT_DIR, dedup, Checkpoint(CHECKPOINT_PATH))
+    limiter = TokenBucket(RATE_LIMIT / 60, BURST)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(
+        base_url=BASE_URL, headers=HEADERS, limits=limits, timeout=15, follow_redirects=True
+    ) as client:
+        try:
+            with tqdm(total=0, desc="Comment threads", ncols=100) as progress:
+                await asyncio.gather(*(
+                    scrape_subreddit(client, limiter, semaphore, subreddit, sink, progress)
+                    for subreddit in RELEVANT_SUBREDDITS
+                ))
+        finally:
+            # Checkpoint state only ever covers buffered pages, so this is safe on interrupt too
+            sink.flush()
+            dedup.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+        print("\n🎉 All subreddits processed successfully!")
+    except KeyboardInterrupt:
+        print(f"\n🛑 Interrupted — progress saved, re-run to resume from {CHECKPOINT_PATH}.")
@@ -1,7 +1,7 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.user import User, UserCreate, UserRead, Token
 from core.auth import (
     authenticate_user,
@@ -10,9 +10,10 @@ from core.auth import (
     get_password_hash,
     get_user_by_email,
     get_user_by_username,
+    token_claims,
 )
 from core.config import get_settings
-from db import get_session
+from db import get_async_session
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -20,24 +21,25 @@ settings = get_settings()
 
 
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, session: Session = Depends(get_session)):
+async def register(user_data: UserCreate, session: AsyncSession = Depends(get_async_session)):
     """Register a new user"""
     # Check if username already exists
-    if get_user_by_username(session, user_data.username):
+    if await get_user_by_username(session, user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
     # Check if email already exists
-    if get_user_by_email(session, user_data.email):
+    if await get_user_by_email(session, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user (the connection goes back to the pool while bcrypt runs)
+    await session.commit()
+    hashed_password = await get_password_hash(user_data.password)
     user = User(
         email=user_data.email,
         username=user_data.username,
@@ -45,8 +47,8 @@ async def register(user_data: UserCreate, session: Session = Depends(get_session
         full_name=user_data.full_name,
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     
     return user
 
@@ -54,10 +56,10 @@ async def register(user_data: UserCreate, session: Session = Depends(get_session
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Login and get access token"""
-    user = authenticate_user(session, form_data.username, form_data.password)
+    user = await authenticate_user(session, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,7 +74,7 @@ async def login(
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -1,10 +1,15 @@
-from fastapi import APIRouter
-from datetime import datetime, timedelta
-from typing import List
+from fastapi import APIRouter, Depends, Query
+from typing import List, Literal, Optional
 from pydantic import BaseModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db import get_async_session
+from db.dashboard_queries import get_emerging_issues, get_metric_overview, get_sentiment_by_day, get_topic_counts
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
+# The queries in db/dashboard_queries.py are shared with the sync jobs; session.run_sync
+# runs them on the async connection, so their I/O is awaited instead of blocking a thread.
+
 
 # Response models
 class Metric(BaseModel):
@@ -29,73 +34,40 @@ class Topic(BaseModel):
     sentiment: str
 
 
+class EmergingIssue(BaseModel):
+    topic: str
+    mentions: float
+    expected: float
+    negative_share: float
+    baseline_negative_share: float
+    score: float
+    reasons: List[str]
+
+
 @router.get("/metrics", response_model=List[Metric])
-async def get_metrics():
+async def get_metrics(days: int = Query(default=7, ge=1, le=365), session: AsyncSession = Depends(get_async_session)):
     """Get dashboard metrics overview"""
-    return [
-        {
-            "title": "citizenSatisfaction",
-            "value": "72%",
-            "change": "+4.3%",
-            "trend": "up",
-            "icon": "ThumbsUp",
-            "color": "text-chart-1",
-        },
-        {
-            "title": "emergingIssues",
-            "value": "3",
-            "change": "+1 new",
-            "trend": "up",
-            "icon": "AlertTriangle",
-            "color": "text-chart-2",
-        },
-        {
-            "title": "publicResponseImpact",
-            "value": "+18%",
-            "change": "+5.2%",
-            "trend": "up",
-            "icon": "Activity",
-            "color": "text-chart-3",
-        },
-        {
-            "title": "civicEngagement",
-            "value": "4,132",
-            "change": "+9.8%",
-            "trend": "up",
-            "icon": "Users",
-            "color": "text-chart-4",
-        },
-    ]
+    return await session.run_sync(get_metric_overview, days=days)
 
 
 @router.get("/sentiment", response_model=List[SentimentData])
-async def get_sentiment():
+async def get_sentiment(days: int = Query(default=7, ge=1, le=365), session: AsyncSession = Depends(get_async_session)):
     """Get sentiment analysis data by day"""
-    return [
-        {"day": "monday", "positive": 45, "neutral": 30, "negative": 25},
-        {"day": "tuesday", "positive": 52, "neutral": 28, "negative": 20},
-        {"day": "wednesday", "positive": 48, "neutral": 32, "negative": 20},
-        {"day": "thursday", "positive": 61, "neutral": 25, "negative": 14},
-        {"day": "friday", "positive": 55, "neutral": 30, "negative": 15},
-        {"day": "saturday", "positive": 40, "neutral": 35, "negative": 25},
-        {"day": "sunday", "positive": 38, "neutral": 37, "negative": 25},
-    ]
+    return await session.run_sync(get_sentiment_by_day, days=days)
 
 
 @router.get("/topics", response_model=List[Topic])
-async def get_topics():
-    """Get topics word cloud data"""
-    return [
-        {"text": "verkeer", "count": 245, "sentiment": "negative"},
-        {"text": "groenvoorziening", "count": 189, "sentiment": "positive"},
-        {"text": "veiligheid", "count": 167, "sentiment": "neutral"},
-        {"text": "parkeren", "count": 156, "sentiment": "negative"},
-        {"text": "onderwijs", "count": 142, "sentiment": "positive"},
-        {"text": "afval", "count": 128, "sentiment": "neutral"},
-        {"text": "evenementen", "count": 115, "sentiment": "positive"},
-        {"text": "fietspaden", "count": 98, "sentiment": "positive"},
-        {"text": "winkels", "count": 87, "sentiment": "neutral"},
-        {"text": "jeugd", "count": 76, "sentiment": "positive"},
-        {"text": "bereikbaarheid", "count": 72, "sentiment": "negative"},
-        {"text": "speeltuinen", "count": 65, "sentiment": "positive"},
-    ]
\ No newline at end of file
+async def get_topics(
+    days: Optional[int] = Query(default=None, ge=1, le=365),
+    kind: Literal["keyword", "cluster"] = "keyword",
+    limit: int = Query(default=12, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Get topics word cloud data (extracted topics, or fixed topics over the last `days` days)"""
+    return await session.run_sync(get_topic_counts, days=days, limit=limit, kind=kind)
+
+
+@router.get("/emerging", response_model=List[EmergingIssue])
+async def get_emerging(limit: int = Query(default=10, ge=1, le=100), session: AsyncSession = Depends(get_async_session)):
+    """Get topics whose volume or negative sentiment currently spikes"""
+    return await session.run_sync(get_emerging_issues, limit=limit)
@@ -1,16 +1,24 @@
+import asyncio
+import datetime
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Literal, Optional
 from pydantic import BaseModel
-from fastapi import APIRouter, HTTPException
-from core import get_llm_client
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from core import get_async_llm_client
+from core.auth import get_current_active_user, get_optional_username
 from core.config import get_settings
-from .retrieval import retrieve_relevant_chunks, format_context_for_llm
-from api.dashboard import get_metrics, get_sentiment, get_topics
+from db.dashboard_queries import load_dashboard_snapshot
+from models.user import User
+from .history import history_store
+from .response_cache import response_cache, response_cache_key
+from .retrieval import RetrievalFilters, aretrieve_relevant_chunks, format_context_for_llm
 
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-# In-memory chat history storage
-chat_history: list[dict] = []
-
 # System prompt for RAG-enabled chat
 RAG_SYSTEM_PROMPT = """You are a helpful assistant that answers questions about civic engagement, community posts, and public discussions. 
 You have access to a knowledge base of posts and comments from various sources.
@@ -26,9 +34,8 @@ When answering questions:
 async def format_dashboard_data_for_prompt() -> str:
     """Fetch and format dashboard data for inclusion in system prompt."""
     try:
-        metrics = await get_metrics()
-        sentiment = await get_sentiment()
-        topics = await get_topics()
+        # Aggregates come from PostgreSQL; run the queries off the event loop
+        metrics, sentiment, topics = await run_in_threadpool(load_dashboard_snapshot)
         
         dashboard_info = "\n=== DASHBOARD INSIGHTS ===\n\n"
         
@@ -74,6 +81,24 @@ class ChatRequest(BaseModel):
     message: str
     use_rag: bool = True  # Enable RAG by default
     n_results: int = 5  # Number of chunks to retrieve
+    session_id: Optional[str] = None  # Client session for anonymous history
+    # Optional retrieval filters
+    date_from: Optional[datetime.datetime] = None
+    date_to: Optional[datetime.datetime] = None
+    sources: Optional[list[str]] = None
+    subreddits: Optional[list[str]] = None
+    types: Optional[list[Literal["post", "comment"]]] = None
+    min_score: Optional[int] = None
+
+    def retrieval_filters(self) -> RetrievalFilters:
+        return RetrievalFilters(
+            date_from=self.date_from,
+            date_to=self.date_to,
+            sources=self.sources,
+            subreddits=self.subreddits,
+            types=self.types,
+            min_score=self.min_score
+        )
 
 
 class ChatResponse(BaseModel):
@@ -81,53 +106,60 @@ class ChatResponse(BaseModel):
     sources: list[dict] = []  # List of sources used
 
 
-@router.post("/", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Send a message to the LLM with RAG capabilities."""
-    try:
-        groq_client = get_llm_client()
-        settings = get_settings()
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"LLM client not configured: {str(e)}"
-        )
-    
-    # Retrieve relevant context from ChromaDB if RAG is enabled
+async def retrieve_context(request: ChatRequest) -> tuple[str, list[dict]]:
+    """Retrieve RAG context and the list of unique sources for a chat request."""
     context = ""
     sources = []
     
-    if request.use_rag:
-        try:
-            chunks = retrieve_relevant_chunks(
-                query=request.message,
-                collection_name="civicpulse",
-                n_results=request.n_results
-            )
-            
-            if chunks:
-                context = format_context_for_llm(chunks)
-                # Extract unique sources for response
-                seen_sources = set()
-                for chunk in chunks:
-                    metadata = chunk.get("metadata", {})
-                    source_info = {
-                        "url": metadata.get("url"),
-                        "source": metadata.get("source"),
-                        "type": metadata.get("type", "unknown")
-                    }
-                    source_key = (source_info.get("url"), source_info.get("source"))
-                    if source_key not in seen_sources and (source_info.get("url") or source_info.get("source")):
-                        sources.append(source_info)
-                        seen_sources.add(source_key)
-        except Exception as e:
-            # If retrieval fails, continue without context
-            pass
+    if not request.use_rag:
+        return context, sources
     
-    # Fetch dashboard data for system prompt
-    dashboard_data = await format_dashboard_data_for_prompt()
+    try:
+        chunks = await aretrieve_relevant_chunks(
+            query=request.message,
+            collection_name="civicpulse",
+            n_results=request.n_results,
+            filters=request.retrieval_filters()
+        )
+        
+        if chunks:
+            context = format_context_for_llm(chunks)
+            # Extract unique sources for response
+            seen_sources = set()
+            for chunk in chunks:
+                metadata = chunk.get("metadata", {})
+                source_info = {
+                    "url": metadata.get("url"),
+                    "source": metadata.get("source"),
+                    "type": metadata.get("type", "unknown")
+                }
+                source_key = (source_info.get("url"), source_info.get("source"))
+                if source_key not in seen_sources and (source_info.get("url") or source_info.get("source")):
+                    sources.append(source_info)
+                    seen_sources.add(source_key)
+    except Exception as e:
+        # If retrieval fails, continue without context
+        pass
+    
+    return context, sources
+
+
+def history_key(username: Optional[str], session_id: Optional[str]) -> Optional[str]:
+    """
+    Key of the chat history to use for a request.
     
-    # Build messages for the LLM
+    Authenticated users share one history across sessions; anonymous clients
+    get one per session_id, and requests with neither keep no history.
+    """
+    if username:
+        return f"user:{username}"
+    if session_id:
+        return f"session:{session_id}"
+    return None
+
+
+def build_messages(request: ChatRequest, context: str, dashboard_data: str, history: list[dict]) -> list[dict]:
+    """Build the system prompt, conversation history and user message for the LLM."""
     messages = []
     
     # Build system prompt with dashboard data and context
@@ -147,7 +179,7 @@ async def chat(request: ChatRequest):
     })
     
     # Add conversation history (excluding system messages)
-    for msg in chat_history:
+    for msg in history:
         if msg.get("role") != "system":
             messages.append(msg)
     
@@ -157,46 +189,170 @@ async def chat(request: ChatRequest):
         "content": request.message
     })
     
-    # Add user message to history
-    chat_history.append({
-        "role": "user",
-        "content": request.message
-    })
+    return messages
+
+
+@dataclass
+class PreparedChat:
+    """Everything needed to answer a chat request."""
+    groq_client: Any
+    model: str
+    messages: list[dict]
+    sources: list[dict]
+    cache_key: str
+    cached: Optional[dict] = None  # Cached answer; the prompt isn't built then
+
+
+async def prepare_chat(request: ChatRequest, key: Optional[str]) -> PreparedChat:
+    """
+    Resolve the LLM client, retrieve context and look the answer up in the cache.
     
+    The dashboard queries and the prompt are only needed, and only run, when
+    the answer isn't cached.
+    """
     try:
-        # Call Groq API with conversation history and context
-        response = groq_client.chat.completions.create(
+        groq_client = get_async_llm_client()
+        settings = get_settings()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"LLM client not configured: {str(e)}"
+        )
+    
+    context, sources = await retrieve_context(request)
+    cache_key = response_cache_key(request.message, settings.GROQ_MODEL, context)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return PreparedChat(
+            groq_client=groq_client,
             model=settings.GROQ_MODEL,
-            messages=messages,
+            messages=[],
+            sources=cached["sources"],
+            cache_key=cache_key,
+            cached=cached
+        )
+    
+    dashboard_data = await format_dashboard_data_for_prompt()
+    history = history_store.get(key)
+    return PreparedChat(
+        groq_client=groq_client,
+        model=settings.GROQ_MODEL,
+        messages=build_messages(request, context, dashboard_data, history),
+        sources=sources,
+        cache_key=cache_key
+    )
+
+
+@router.post("/", response_model=ChatResponse)
+async def chat(request: ChatRequest, username: Optional[str] = Depends(get_optional_username)):
+    """Send a message to the LLM with RAG capabilities."""
+    key = history_key(username, request.session_id)
+    prepared = await prepare_chat(request, key)
+    
+    if prepared.cached is not None:
+        history_store.append_exchange(key, request.message, prepared.cached["response"])
+        return ChatResponse(**prepared.cached)
+    
+    try:
+        # Call Groq API with conversation history and context
+        response = await prepared.groq_client.chat.completions.create(
+            model=prepared.model,
+            messages=prepared.messages,
             temperature=0.0,
             max_tokens=1024
         )
         
         assistant_message = response.choices[0].message.content
-        
-        # Add assistant response to history
-        chat_history.append({
-            "role": "assistant",
-            "content": assistant_message
-        })
-        
-        return ChatResponse(
-            response=assistant_message,
-            sources=sources
-        )
     
     except Exception as e:
-        # Remove the user message from history if API call failed
-        if chat_history and chat_history[-1].get("role") == "user":
-            chat_history.pop()
         raise HTTPException(
             status_code=500,
             detail=f"Error calling LLM: {str(e)}"
         )
+    
+    # Both turns are recorded together once the answer is complete, so
+    # concurrent requests of the same session can't interleave half-exchanges
+    history_store.append_exchange(key, request.message, assistant_message)
+    response_cache.set(prepared.cache_key, {"response": assistant_message, "sources": prepared.sources})
+    
+    return ChatResponse(
+        response=assistant_message,
+        sources=prepared.sources
+    )
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest, username: Optional[str] = Depends(get_optional_username)):
+    """
+    Stream the LLM answer as server-sent events.
+    
+    Emits one `sources` event as soon as retrieval is done, then a `token`
+    event per piece of generated text, and finally `done` (or `error`).
+    Cached answers are sent as a single `token` event. History is updated
+    once the stream has completed.
+    """
+    key = history_key(username, request.session_id)
+    prepared = await prepare_chat(request, key)
+    
+    async def event_stream() -> AsyncIterator[str]:
+        yield sse_event("sources", {"sources": prepared.sources})
+        
+        if prepared.cached is not None:
+            history_store.append_exchange(key, request.message, prepared.cached["response"])
+            yield sse_event("token", {"content": prepared.cached["response"]})
+            yield sse_event("done", {"response": prepared.cached["response"]})
+            return
+        
+        parts = []
+        try:
+            stream = await prepared.groq_client.chat.completions.create(
+                model=prepared.model,
+                messages=prepared.messages,
+                temperature=0.0,
+                max_tokens=1024,
+                stream=True
+            )
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    parts.append(token)
+                    yield sse_event("token", {"content": token})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error calling LLM: {str(e)}"})
+            return
+        
+        assistant_message = "".join(parts)
+        history_store.append_exchange(key, request.message, assistant_message)
+        response_cache.set(prepared.cache_key, {"response": assistant_message, "sources": prepared.sources})
+        yield sse_event("done", {"response": assistant_message})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/cache")
+async def get_cache_stats(current_user: User = Depends(get_current_active_user)):
+    """Get response cache hit/miss counters."""
+    return response_cache.stats()
+
+
+@router.delete("/cache")
+async def clear_cache(current_user: User = Depends(get_current_active_user)):
+    """Drop every cached chat response."""
+    response_cache.invalidate()
+    return {"message": "Response cache cleared"}
 
 
 @router.delete("/")
-async def clear_chat():
-    """Clear chat history."""
-    chat_history.clear()
+async def clear_chat(session_id: Optional[str] = None, username: Optional[str] = Depends(get_optional_username)):
+    """Clear the chat history of the current user or session."""
+    history_store.clear(history_key(username, session_id))
     return {"message": "Chat history cleared"}
@@ -0,0 +1,95 @@
+"""
+Per-session chat history with a token budget.
+
+Each authenticated user (or anonymous client session) gets its own history.
+Histories are trimmed to a token budget by dropping the oldest exchanges,
+and idle sessions are evicted by TTL and LRU, so both prompt size and memory
+stay bounded.
+"""
+from typing import List, Dict, Optional
+
+from core.cache import TTLCache
+from core.config import get_settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for Llama tokenizers)."""
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """Estimated tokens of a chat message, including per-message overhead."""
+    return estimate_tokens(message.get("content") or "") + 4
+
+
+def trim_to_token_budget(history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """
+    Drop the oldest user/assistant exchanges until the history fits the budget.
+    
+    Args:
+        history: Messages in chronological order
+        budget: Maximum estimated tokens for the whole history
+    
+    Returns:
+        The most recent messages that fit, starting on a user turn
+    """
+    total = sum(message_tokens(message) for message in history)
+    start = 0
+    while start < len(history) and total > budget:
+        total -= message_tokens(history[start])
+        start += 1
+    # Don't start the conversation halfway through an exchange
+    while start < len(history) and history[start].get("role") != "user":
+        start += 1
+    return history[start:]
+
+
+class ChatHistoryStore:
+    """
+    Chat histories keyed by session, bounded in tokens, age and count.
+    
+    Args:
+        token_budget: Maximum estimated tokens kept per session
+        ttl: Seconds of inactivity after which a session is forgotten
+        max_sessions: Maximum number of sessions kept at once
+    """
+
+    def __init__(self, token_budget: int, ttl: float, max_sessions: int):
+        self.token_budget = token_budget
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=ttl)
+
+    def get(self, key: Optional[str]) -> List[Dict[str, str]]:
+        """Get a copy of the history of a session (empty for anonymous requests)."""
+        if key is None:
+            return []
+        return list(self._sessions.get(key, []))
+
+    def append_exchange(self, key: Optional[str], user_message: str, assistant_message: str) -> None:
+        """Append a completed exchange and trim the session to the token budget."""
+        if key is None:
+            return
+        history = self.get(key) + [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": assistant_message},
+        ]
+        self._sessions.set(key, trim_to_token_budget(history, self.token_budget))
+
+    def clear(self, key: Optional[str]) -> None:
+        """Forget the history of a session."""
+        if key is not None:
+            self._sessions.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def _create_history_store() -> ChatHistoryStore:
+    settings = get_settings()
+    return ChatHistoryStore(
+        token_budget=settings.CHAT_HISTORY_TOKEN_BUDGET,
+        ttl=settings.CHAT_HISTORY_TTL_SECONDS,
+        max_sessions=settings.CHAT_HISTORY_MAX_SESSIONS
+    )
+
+
+history_store = _create_history_store()
@@ -0,0 +1,87 @@
+"""
+Cache of LLM answers for repeated chat questions.
+
+Answers are keyed on the normalised question, the model and the retrieved
+context, so a hit is known right after retrieval and skips the dashboard
+queries as well as the LLM call. Re-ingesting data that changes what
+retrieval returns changes the key, so stale answers are never served after
+the collection changes. The dashboard summary and the conversation history
+are left out: an answer may quote dashboard figures up to the TTL old, and
+entries can be dropped explicitly with invalidate().
+"""
+import hashlib
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from core.cache import TTLCache
+from core.config import get_settings
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+
+def response_cache_key(question: str, model: str, context: str) -> str:
+    """Build the cache key of a chat request from its question, model and retrieved context."""
+    digest = hashlib.sha256()
+    for part in (model, normalize_question(question), context):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    TTL/LRU cache of chat answers with hit and miss counters.
+    
+    Args:
+        maxsize: Maximum number of cached answers
+        ttl: Seconds an answer stays valid
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._entries.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._entries.set(key, value)
+
+    def invalidate(self) -> None:
+        """Drop every cached answer."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "size": len(self._entries),
+        }
+
+
+def _create_response_cache() -> ResponseCache:
+    settings = get_settings()
+    return ResponseCache(
+        maxsize=settings.RESPONSE_CACHE_MAX_ENTRIES,
+        ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+    )
+
+
+response_cache = _create_response_cache()
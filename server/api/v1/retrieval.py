@@ -1,26 +1,98 @@
 """
 Retrieval functions for querying ChromaDB to get relevant context for RAG.
 """
+import datetime
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
+from fastapi.concurrency import run_in_threadpool
 from core import get_chroma_client
+from core.config import get_settings
+from core.embeddings import get_embedder
+from core.lexical_index import get_lexical_index, reciprocal_rank_fusion
+
+
+@dataclass
+class RetrievalFilters:
+    """
+    Metadata constraints pushed down to ChromaDB as a `where` filter.
+    
+    Naive datetimes are taken to be UTC, matching how created_at is stored.
+    """
+    date_from: Optional[datetime.datetime] = None
+    date_to: Optional[datetime.datetime] = None
+    sources: Optional[List[str]] = None
+    subreddits: Optional[List[str]] = None
+    types: Optional[List[str]] = None
+    min_score: Optional[int] = None
+
+    def to_where(self) -> Optional[Dict[str, Any]]:
+        """Build the ChromaDB where clause, or None if nothing is filtered."""
+        conditions = []
+        if self.date_from is not None:
+            conditions.append({"created_at": {"$gte": _epoch(self.date_from)}})
+        if self.date_to is not None:
+            conditions.append({"created_at": {"$lte": _epoch(self.date_to)}})
+        for field, values in (("source", self.sources), ("subreddit", self.subreddits), ("type", self.types)):
+            if values:
+                conditions.append({field: {"$in": list(values)}})
+        if self.min_score is not None:
+            conditions.append({"score": {"$gte": self.min_score}})
+        
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+
+def _epoch(value: datetime.datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp())
+
+
+def _format_results(ids: List[str], documents: List[str], metadatas: Optional[List[dict]], distances: Optional[List[float]]) -> Dict[str, Dict[str, Any]]:
+    """Turn parallel ChromaDB result lists into chunk dictionaries keyed by ID."""
+    chunks = {}
+    for i, doc_id in enumerate(ids):
+        chunks[doc_id] = {
+            "text": documents[i] if documents and i < len(documents) else "",
+            "metadata": metadatas[i] if metadatas and i < len(metadatas) and metadatas[i] else {},
+            "id": doc_id,
+            "distance": distances[i] if distances and i < len(distances) else None
+        }
+    return chunks
 
 
 def retrieve_relevant_chunks(
     query: str,
     collection_name: str = "civicpulse",
-    n_results: int = 5
+    n_results: int = 5,
+    hybrid: Optional[bool] = None,
+    filters: Optional[RetrievalFilters] = None
 ) -> List[Dict[str, Any]]:
     """
     Retrieve relevant chunks from ChromaDB based on a query.
     
+    With hybrid retrieval, the vector ranking is fused with a BM25 ranking
+    from the collection's lexical index using reciprocal rank fusion, which
+    recovers exact matches on names the embedding model handles poorly.
+    Filters are applied by ChromaDB on both rankings.
+    
     Args:
         query: The search query
         collection_name: Name of the ChromaDB collection
         n_results: Number of results to return
+        hybrid: Fuse with lexical search (defaults to the HYBRID_RETRIEVAL setting)
+        filters: Metadata constraints (date range, source, subreddit, type, score)
     
     Returns:
         List of dictionaries containing document text and metadata
     """
+    settings = get_settings()
+    if hybrid is None:
+        hybrid = settings.HYBRID_RETRIEVAL
+    
     try:
         client = get_chroma_client()
         
@@ -31,36 +103,75 @@ def retrieve_relevant_chunks(
             # Collection doesn't exist
             return []
         
-        # Query ChromaDB
+        where = filters.to_where() if filters else None
+        lexical_index = get_lexical_index(collection_name) if hybrid else None
+        n_candidates = max(n_results, settings.HYBRID_CANDIDATES) if lexical_index else n_results
+        
+        # Query ChromaDB with a vector from the same embedder used at ingestion
         results = collection.query(
-            query_texts=[query],
-            n_results=n_results
+            query_embeddings=get_embedder().embed([query]),
+            n_results=n_candidates,
+            where=where
         )
         
         # Format results
-        chunks = []
-        if results["documents"] and len(results["documents"]) > 0:
-            documents = results["documents"][0]
-            metadatas = results["metadatas"][0] if results["metadatas"] else [{}] * len(documents)
-            ids = results["ids"][0] if results["ids"] else []
-            distances = results["distances"][0] if results["distances"] else []
-            
-            for i, doc in enumerate(documents):
-                chunk = {
-                    "text": doc,
-                    "metadata": metadatas[i] if i < len(metadatas) else {},
-                    "id": ids[i] if i < len(ids) else None,
-                    "distance": distances[i] if i < len(distances) else None
-                }
-                chunks.append(chunk)
+        dense_ids = results["ids"][0] if results["ids"] else []
+        chunks = _format_results(
+            dense_ids,
+            results["documents"][0] if results["documents"] else [],
+            results["metadatas"][0] if results["metadatas"] else None,
+            results["distances"][0] if results["distances"] else None
+        )
+        if lexical_index is None:
+            return list(chunks.values())[:n_results]
+        
+        lexical_ids = [doc_id for doc_id, _ in lexical_index.search(query, k=n_candidates)]
+        if where is not None and lexical_ids:
+            # Keep only the lexical hits that pass the filter, in BM25 order
+            allowed = collection.get(ids=lexical_ids, where=where, include=["documents", "metadatas"])
+            chunks.update({
+                doc_id: chunk
+                for doc_id, chunk in _format_results(allowed["ids"], allowed["documents"], allowed["metadatas"], None).items()
+                if doc_id not in chunks
+            })
+            allowed_ids = set(allowed["ids"])
+            lexical_ids = [doc_id for doc_id in lexical_ids if doc_id in allowed_ids]
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids], k=settings.RRF_K)[:n_results]
         
-        return chunks
+        # Fetch the lexical-only hits that the vector query didn't return
+        missing = [doc_id for doc_id, _ in fused if doc_id not in chunks]
+        if missing:
+            extra = collection.get(ids=missing, include=["documents", "metadatas"])
+            chunks.update(_format_results(extra["ids"], extra["documents"], extra["metadatas"], None))
+        
+        return [
+            {**chunks[doc_id], "score": score}
+            for doc_id, score in fused
+            if doc_id in chunks
+        ]
     
     except Exception as e:
         # If collection doesn't exist or query fails, return empty list
         return []
 
 
+async def aretrieve_relevant_chunks(
+    query: str,
+    collection_name: str = "civicpulse",
+    n_results: int = 5,
+    filters: Optional[RetrievalFilters] = None
+) -> List[Dict[str, Any]]:
+    """
+    Async version of retrieve_relevant_chunks.
+    
+    The ChromaDB client and the query embedding are synchronous, so the work
+    runs in the threadpool instead of blocking the event loop.
+    """
+    return await run_in_threadpool(
+        retrieve_relevant_chunks, query, collection_name, n_results, filters=filters
+    )
+
+
 def format_context_for_llm(chunks: List[Dict[str, Any]]) -> str:
     """
     Format retrieved chunks into a context string for the LLM.
@@ -1,47 +1,190 @@
-from groq import Groq
-import chromadb
+"""
+Shared Groq and ChromaDB clients.
+
+Clients are built on first use and then reused for the life of the process,
+so importing `core` stays cheap (groq and chromadb are only imported when a
+client is actually needed) and a worker starts even when Chroma is down.
+main.py's lifespan warms them in the background and closes them on shutdown.
+
+ChromaDB is reached over HTTP at CHROMA_HOST, or opened from CHROMA_PERSIST_DIR
+when CHROMA_HOST is empty. While a configured server is down, the local store
+only stands in with CHROMA_LOCAL_FALLBACK, and the server is probed again
+every CHROMA_RETRY_SECONDS until it is back.
+"""
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
 from .config import get_settings
 
+if TYPE_CHECKING:
+    from groq import AsyncGroq, Groq
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+groq_client: Optional["Groq"] = None
+async_groq_client: Optional["AsyncGroq"] = None
+chroma_client: Optional[Any] = None
+# "http", "local" (no CHROMA_HOST) or "fallback" (server down, CHROMA_LOCAL_FALLBACK) once chroma_client is built
+chroma_backend: Optional[str] = None
+_chroma_lock = threading.Lock()  # probing can take CHROMA_CONNECT_TIMEOUT; don't hold up the Groq clients
+_chroma_retry_at = 0.0  # time.monotonic() before which a down server isn't probed again
+
 
 def _init_groq_client():
     """Initialize Groq client from settings."""
     settings = get_settings()
     if not settings.GROQ_API_KEY:
         return None
+    from groq import Groq
     return Groq(api_key=settings.GROQ_API_KEY)
 
 
+def _init_async_groq_client():
+    """Initialize async Groq client from settings."""
+    settings = get_settings()
+    if not settings.GROQ_API_KEY:
+        return None
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=settings.GROQ_API_KEY)
+
+
+def _chroma_heartbeat_url() -> str:
+    settings = get_settings()
+    return f"http://{settings.CHROMA_HOST}:{settings.CHROMA_PORT}/api/v2/heartbeat"
+
+
+def chroma_server_reachable() -> bool:
+    """Whether the Chroma server answers its heartbeat within CHROMA_CONNECT_TIMEOUT."""
+    import httpx
+    try:
+        response = httpx.get(_chroma_heartbeat_url(), timeout=get_settings().CHROMA_CONNECT_TIMEOUT)
+    except httpx.HTTPError:
+        return False
+    return response.is_success
+
+
 def _init_chroma_client():
-    """Initialize ChromaDB client from settings."""
+    """Initialize the ChromaDB HTTP client from settings, or None while the server is unreachable."""
+    import chromadb
     settings = get_settings()
+    # chromadb's HTTP client has no request timeout, so probe first rather than let it hang on a dead host
+    if not chroma_server_reachable():
+        return None
     try:
         return chromadb.HttpClient(host=settings.CHROMA_HOST, port=settings.CHROMA_PORT)
     except Exception:
-        # Fallback to persistent client if HTTP client fails
-        return chromadb.PersistentClient(path="./chroma-data")
+        logger.exception("ChromaDB HTTP client initialization failed")
+        return None
+
 
+def _init_local_chroma_client():
+    """Open the ChromaDB store in CHROMA_PERSIST_DIR."""
+    import chromadb
+    return chromadb.PersistentClient(path=os.path.expanduser(get_settings().CHROMA_PERSIST_DIR))
 
-groq_client = _init_groq_client()
-chroma_client = _init_chroma_client()
 
+def _groq_not_configured() -> RuntimeError:
+    """Build the error raised when no Groq API key is configured."""
+    settings = get_settings()
+    from pathlib import Path
+    env_file_path = Path(__file__).parent.parent / ".env"
+    is_set = "set" if settings.GROQ_API_KEY else "not set"
+    return RuntimeError(
+        f"GROQ_API_KEY not configured. "
+        f"Please set GROQ_API_KEY in your .env file at: {env_file_path}. "
+        f"Current status: {is_set}"
+    )
 
-def get_llm_client() -> Groq:
+
+def get_llm_client() -> "Groq":
     """Get the Groq LLM client instance."""
+    global groq_client
     if groq_client is None:
-        settings = get_settings()
-        from pathlib import Path
-        env_file_path = Path(__file__).parent.parent / ".env"
-        is_set = "set" if settings.GROQ_API_KEY else "not set"
-        raise RuntimeError(
-            f"GROQ_API_KEY not configured. "
-            f"Please set GROQ_API_KEY in your .env file at: {env_file_path}. "
-            f"Current status: {is_set}"
-        )
+        with _lock:
+            if groq_client is None:
+                groq_client = _init_groq_client()
+    if groq_client is None:
+        raise _groq_not_configured()
     return groq_client
 
 
-def get_chroma_client():
-    """Get the ChromaDB client instance."""
-    if chroma_client is None:
-        raise RuntimeError("ChromaDB client not initialized")
-    return chroma_client
\ No newline at end of file
+def get_async_llm_client() -> "AsyncGroq":
+    """Get the async Groq LLM client instance."""
+    global async_groq_client
+    if async_groq_client is None:
+        with _lock:
+            if async_groq_client is None:
+                async_groq_client = _init_async_groq_client()
+    if async_groq_client is None:
+        raise _groq_not_configured()
+    return async_groq_client
+
+
+def _connect_chroma() -> None:
+    """(Re)build chroma_client from settings; called with _chroma_lock held."""
+    global chroma_client, chroma_backend, _chroma_retry_at
+    settings = get_settings()
+    if not settings.CHROMA_HOST:
+        chroma_client, chroma_backend = _init_local_chroma_client(), "local"
+        return
+    http_client = _init_chroma_client()
+    if http_client is not None:
+        if chroma_backend == "fallback":
+            logger.info("ChromaDB server at %s:%s is back", settings.CHROMA_HOST, settings.CHROMA_PORT)
+        chroma_client, chroma_backend = http_client, "http"
+        return
+    _chroma_retry_at = time.monotonic() + settings.CHROMA_RETRY_SECONDS
+    if settings.CHROMA_LOCAL_FALLBACK and chroma_backend is None:
+        logger.warning(
+            "ChromaDB server at %s:%s unavailable, using %s until it is back",
+            settings.CHROMA_HOST, settings.CHROMA_PORT, settings.CHROMA_PERSIST_DIR
+        )
+        chroma_client, chroma_backend = _init_local_chroma_client(), "fallback"
+
+
+def get_chroma_client(allow_fallback: bool = True):
+    """
+    Get the ChromaDB client instance.
+    
+    Args:
+        allow_fallback: Accept the local fallback store while the server is
+            down; writers pass False so nothing lands in a store the server
+            never sees
+    
+    Raises:
+        RuntimeError: The server is unreachable and no fallback may be used
+    """
+    if chroma_backend not in ("http", "local"):
+        with _chroma_lock:
+            if chroma_backend not in ("http", "local") and time.monotonic() >= _chroma_retry_at:
+                _connect_chroma()
+            if chroma_client is None or (chroma_backend == "fallback" and not allow_fallback):
+                settings = get_settings()
+                raise RuntimeError(f"ChromaDB server at {settings.CHROMA_HOST}:{settings.CHROMA_PORT} unavailable")
+    return chroma_client
+
+
+def warm_clients() -> None:
+    """Build the clients ahead of the first request; failures are logged and retried on first use."""
+    try:
+        get_chroma_client()
+    except Exception:
+        logger.exception("ChromaDB client initialization failed")
+    if get_settings().GROQ_API_KEY:
+        get_async_llm_client()
+
+
+async def close_clients() -> None:
+    """Close the clients' connection pools (application shutdown)."""
+    global groq_client, async_groq_client
+    with _lock:
+        sync_client, async_client = groq_client, async_groq_client
+        groq_client = async_groq_client = None
+    if async_client is not None:
+        await async_client.close()
+    if sync_client is not None:
+        sync_client.close()
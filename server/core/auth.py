@@ -1,27 +1,75 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple, TypeVar
+import bcrypt
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from core.cache import TTLCache
 from core.config import get_settings
 from models.user import User, TokenData
-from db import get_session
+from db import get_async_session
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
+# Users seen by get_current_user, keyed by username. An entry only serves tokens of the
+# same token_version; other workers' caches go stale for at most USER_CACHE_TTL_SECONDS.
+_user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_ENTRIES, ttl=settings.USER_CACHE_TTL_SECONDS)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+
+T = TypeVar("T")
+
+# bcrypt burns ~250 ms of CPU per call (it releases the GIL meanwhile), so it runs on a
+# small thread pool instead of the event loop. Callers queue on the semaphore rather
+# than in the executor, so a request that is cancelled while waiting never hashes. By
+# default one core is left for the event loop.
+_hash_workers = settings.PASSWORD_HASH_WORKERS or max(1, (os.cpu_count() or 1) - 1)
+_hash_executor = ThreadPoolExecutor(max_workers=_hash_workers, thread_name_prefix="bcrypt")
+_hash_slots = asyncio.Semaphore(_hash_workers)
+
+
+async def _run_hashing(fn: Callable[..., T], *args) -> T:
+    """Run a bcrypt call on the hashing pool, PASSWORD_HASH_WORKERS at a time"""
+    async with _hash_slots:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+
+
+def _secret(password: str) -> bytes:
+    # bcrypt only uses the first 72 bytes (and bcrypt>=5 refuses longer input)
+    return password.encode("utf-8")[:72]
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode("ascii")
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Check a password; on success also return a new hash if the stored one uses another cost factor"""
+    try:
+        valid = bcrypt.checkpw(_secret(password), hashed_password.encode("ascii"))
+    except ValueError:  # not a bcrypt hash
+        return False, None
+    if not valid:
+        return False, None
+    rounds = int(hashed_password.split("$")[2])
+    return True, _hash(password) if rounds != settings.BCRYPT_ROUNDS else None
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    valid, _ = await _run_hashing(_verify_and_update, plain_password, hashed_password)
+    return valid
 
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return await _run_hashing(_hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -36,52 +84,131 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_user_by_username(session: Session, username: str) -> Optional[User]:
+def token_claims(user: User) -> dict:
+    """JWT claims for a user: who it is, plus what get_current_user checks without the database"""
+    return {"sub": user.username, "uid": user.id, "ver": user.token_version}
+
+
+def decode_token(token: str) -> Optional[TokenData]:
+    """Claims of a valid, unexpired token, or None"""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("sub") is None:
+        return None
+    return TokenData(
+        username=payload["sub"],
+        user_id=payload.get("uid"),
+        token_version=payload.get("ver", 0),  # tokens issued before versioning match the initial 0
+    )
+
+
+def invalidate_user_cache(username: str) -> None:
+    """
+    Drop a user from this process's cache.
+
+    Call after changing anything get_current_user hands out: deactivation,
+    a password change, a new token_version. Other workers pick the change
+    up within USER_CACHE_TTL_SECONDS.
+    """
+    _user_cache.pop(username)
+
+
+async def revoke_user_tokens(session: AsyncSession, user: User) -> None:
+    """Invalidate every token issued to a user so far (e.g. on deactivation or a password change)"""
+    user.token_version += 1
+    session.add(user)
+    await session.commit()
+    invalidate_user_cache(user.username)
+
+
+async def get_user_by_username(session: AsyncSession, username: str) -> Optional[User]:
     """Get a user by username"""
     statement = select(User).where(User.username == username)
-    return session.exec(statement).first()
+    return (await session.exec(statement)).first()
 
 
-def get_user_by_email(session: Session, email: str) -> Optional[User]:
+async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
     """Get a user by email"""
     statement = select(User).where(User.email == email)
-    return session.exec(statement).first()
+    return (await session.exec(statement)).first()
 
 
-def authenticate_user(session: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(session: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate a user by username and password"""
-    user = get_user_by_username(session, username)
+    user = await get_user_by_username(session, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    # Hand the connection back to the pool while bcrypt runs; a login storm would hold them all
+    await session.commit()
+    valid, new_hash = await _run_hashing(_verify_and_update, password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was stored
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+        invalidate_user_cache(user.username)
+    return user
+
+
+async def _user_for_token(session: AsyncSession, token_data: TokenData) -> Optional[User]:
+    """
+    The user a token was issued to, or None when it was revoked since.
+
+    Served from the user cache when possible; the session is only used (and a
+    connection only checked out) on a miss.
+    """
+    user = _user_cache.get(token_data.username)
+    if user is None or user.token_version != token_data.token_version:
+        if token_data.user_id is not None:
+            user = await session.get(User, token_data.user_id)
+        else:
+            user = await get_user_by_username(session, username=token_data.username)
+        if user is None or user.username != token_data.username:
+            return None
+        _user_cache.set(user.username, user)  # detached once the session closes; treat as read-only
+    if user.token_version != token_data.token_version:
+        return None  # revoked
     return user
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> User:
-    """Get the current authenticated user from JWT token"""
+    """Get the current authenticated user from JWT token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+    token_data = decode_token(token)
+    if token_data is None:
         raise credentials_exception
-    user = get_user_by_username(session, username=token_data.username)
+    user = await _user_for_token(session, token_data)
     if user is None:
         raise credentials_exception
     return user
 
 
+async def get_optional_username(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[str]:
+    """Get the username from a valid, unrevoked JWT token of an active user, or None for anonymous requests"""
+    if not token or not settings.SECRET_KEY:
+        return None
+    token_data = decode_token(token)
+    if token_data is None:
+        return None
+    # Anonymous requests never open a session; this one only uses it on a cache miss
+    async for session in get_async_session():
+        user = await _user_for_token(session, token_data)
+    if user is None or not user.is_active:
+        return None
+    return token_data.username
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
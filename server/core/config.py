@@ -14,6 +14,23 @@ class Settings(BaseSettings):
     POSTGRES_PORT: Optional[int] = Field(default=5432)
     POSTGRES_NAME: Optional[str] = Field(default=None)
 
+    # Connection pool settings, applied to the sync and the async engine alike
+    DB_POOL_SIZE: int = Field(default=10)
+    DB_MAX_OVERFLOW: int = Field(default=20)
+    DB_POOL_TIMEOUT: int = Field(default=30)  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = Field(default=1800)  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = Field(default=True)  # test connections on checkout (a few round trips per request)
+    DB_ECHO: bool = Field(default=False)  # log every SQL statement
+
+    # Auth settings
+    SECRET_KEY: Optional[str] = Field(default=None)
+    ALGORITHM: str = Field(default="HS256")
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30)
+    BCRYPT_ROUNDS: int = Field(default=12)  # stored hashes with another cost are rehashed at login
+    PASSWORD_HASH_WORKERS: int = Field(default=0)  # concurrent bcrypt calls; 0 uses all CPU cores but one
+    USER_CACHE_TTL_SECONDS: int = Field(default=60)  # how long a token keeps working after revocation in another worker
+    USER_CACHE_MAX_ENTRIES: int = Field(default=10_000)
+
     # Groq LLM settings
     GROQ_API_KEY: Optional[str] = Field(default=None)
     GROQ_MODEL: str = Field(default="llama-3.1-70b-versatile")
@@ -21,6 +38,42 @@ class Settings(BaseSettings):
     # ChromaDB settings
     CHROMA_HOST: str = Field(default="localhost")
     CHROMA_PORT: int = Field(default=8000)
+    CHROMA_CONNECT_TIMEOUT: float = Field(default=2.0)  # heartbeat probe before connecting and in /health
+    CHROMA_PERSIST_DIR: str = Field(default="~/.local/share/civicpulse/chroma")  # local store, used when CHROMA_HOST is empty
+    CHROMA_LOCAL_FALLBACK: bool = Field(default=False)  # serve searches from CHROMA_PERSIST_DIR while the server is down
+    CHROMA_RETRY_SECONDS: float = Field(default=30.0)  # how often a down server is probed again
+
+    # Retrieval settings
+    HYBRID_RETRIEVAL: bool = Field(default=True)  # fuse BM25 with vector search
+    HYBRID_CANDIDATES: int = Field(default=20)  # candidates taken from each ranking
+    RRF_K: int = Field(default=60)
+    LEXICAL_INDEX_DIR: str = Field(default="./lexical-index")
+
+    # Sentiment classification settings
+    SENTIMENT_WORKERS: int = Field(default=1)  # 1 runs in-process (right for the lexicon model); 0 uses every core
+    SENTIMENT_BATCH_SIZE: int = Field(default=500)
+
+    # Emerging issue detection (run `python -m db.rollups backfill` after changing the half-lives)
+    EMERGING_FAST_HALF_LIFE_HOURS: float = Field(default=24.0)
+    EMERGING_SLOW_HALF_LIFE_HOURS: float = Field(default=24.0 * 14)
+    EMERGING_CACHE_TTL_SECONDS: int = Field(default=300)  # how long the metrics reuse a replayed emerging-issue count
+
+    # Chat history settings
+    CHAT_HISTORY_TOKEN_BUDGET: int = Field(default=2000)
+    CHAT_HISTORY_TTL_SECONDS: int = Field(default=3600)
+    CHAT_HISTORY_MAX_SESSIONS: int = Field(default=1000)
+
+    # Chat response cache settings
+    RESPONSE_CACHE_TTL_SECONDS: int = Field(default=900)
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(default=512)
+
+    # Embedding settings
+    # "chroma-default" (ONNX all-MiniLM-L6-v2) or "hashing" (deterministic, offline)
+    EMBEDDING_MODEL: str = Field(default="chroma-default")
+    EMBEDDING_WORKERS: int = Field(default=0)  # 0 uses every CPU core
+    EMBEDDING_BATCH_SIZE: int = Field(default=64)
+    EMBEDDING_CACHE_PATH: str = Field(default="./embedding-cache.sqlite3")  # empty disables the cache
+    EMBEDDING_CACHE_MAX_ENTRIES: int = Field(default=500_000)
 
     class Config:
         # Look for .env file in the server directory
@@ -31,6 +84,10 @@ class Settings(BaseSettings):
     def db_url(self) -> str:
         return f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASS}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_NAME}"
 
+    @property
+    def async_db_url(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASS}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_NAME}"
+
 
 @lru_cache()
 def get_settings():
@@ -0,0 +1,182 @@
+"""
+Disk-backed cache of text embeddings.
+
+Reddit threads repeat a lot of text (quoted replies, one-word comments, bot
+messages, cross-posts), so vectors are stored in SQLite keyed by a SHA-256 of
+the model name and the text. Both ingestion and query embedding go through
+the cache, so identical text is only ever embedded once per model. The
+least recently used entries are evicted once the cache grows past its limit.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .config import get_settings
+from .embeddings import Embedder
+
+# A hit only refreshes last_used once it is older than this; LRU eviction
+# doesn't need better than minute resolution, and most hits then write nothing
+TOUCH_INTERVAL = 60.0
+# Pending last_used refreshes are written together once there are this many
+TOUCH_BATCH = 1000
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Cache key for a text embedded by a given model."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite store of float32 vectors with LRU eviction.
+    
+    Safe to share between threads; several processes can use the same file
+    thanks to WAL mode. The entry count is tracked in memory and only
+    recounted when it passes max_entries, and hits refresh last_used in
+    batches, so neither lookups nor inserts scan or rewrite the table.
+    
+    Args:
+        path: SQLite database file
+        max_entries: Number of vectors kept before the least recently used are evicted
+    """
+
+    def __init__(self, path: str, max_entries: int = 500_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._connection.commit()
+        (self._count,) = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        self._touched: Dict[str, float] = {}
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Look up vectors by key and mark the hits as recently used."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._connection.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, blob, last_used in rows:
+                    found[key] = array("f", blob).tolist()
+                    if last_used < now - TOUCH_INTERVAL:
+                        self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                self._write_touched()
+                self._connection.commit()
+        return found
+
+    def _write_touched(self) -> None:
+        """Write the pending last_used refreshes (the caller holds the lock and commits)."""
+        if self._touched:
+            self._connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()]
+            )
+            self._touched = {}
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        """Store vectors and evict the least recently used entries if over the limit."""
+        if not vectors:
+            return
+        now = time.time()
+        with self._lock:
+            # Eviction below should see which entries were used lately
+            self._write_touched()
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in vectors.items()]
+            )
+            # An upper bound (replaced keys count too); recounted once it passes the limit, which
+            # also picks up what other processes sharing the file added or evicted
+            self._count += len(vectors)
+            if self._count > self.max_entries:
+                (self._count,) = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if self._count > self.max_entries:
+                # Evict a little extra so we don't do this on every insert
+                excess = self._count - self.max_entries + self.max_entries // 20
+                deleted = self._connection.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                ).rowcount
+                self._count -= deleted
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touched()
+            self._connection.commit()
+            self._connection.close()
+
+
+class CachedEmbedder:
+    """
+    Embedder that serves repeated texts from an EmbeddingCache.
+    
+    Duplicates within a batch are embedded once, and only texts missing from
+    the cache reach the wrapped embedder.
+    """
+
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+        self.name = embedder.name
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys = [embedding_key(self.name, text) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+        
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            computed = dict(zip(missing, self.embedder.embed(list(missing.values()))))
+            self.cache.put_many(computed)
+            vectors.update(computed)
+        
+        return [vectors[key] for key in keys]
+
+    def close(self) -> None:
+        """Close the wrapped embedder (the cache is shared and stays open)."""
+        close = getattr(self.embedder, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@lru_cache()
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the shared embedding cache, or None if EMBEDDING_CACHE_PATH is empty."""
+    settings = get_settings()
+    if not settings.EMBEDDING_CACHE_PATH:
+        return None
+    return EmbeddingCache(settings.EMBEDDING_CACHE_PATH, max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES)
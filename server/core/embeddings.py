@@ -0,0 +1,158 @@
+"""
+Embedding functions used for ingestion and retrieval.
+
+Embeddings are computed outside of ChromaDB so that ingestion can spread the
+work over a process pool and pass ready vectors to collection.upsert. The
+same embedder is used for queries, so stored and query vectors always come
+from the same model.
+"""
+import hashlib
+import math
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Protocol
+
+from .config import get_settings
+from .worker_pool import WorkerPool
+
+
+class Embedder(Protocol):
+    """Anything that turns a batch of texts into vectors."""
+    name: str
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+
+class ChromaDefaultEmbedder:
+    """ChromaDB's default ONNX all-MiniLM-L6-v2 model, loaded on first use."""
+    name = "chroma-default/all-MiniLM-L6-v2"
+
+    def __init__(self):
+        self._function = None
+
+    def __getstate__(self):
+        # Each worker process loads its own copy of the model
+        return {"_function": None}
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self._function is None:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            self._function = DefaultEmbeddingFunction()
+        return [[float(value) for value in vector] for vector in self._function(texts)]
+
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder.
+    
+    Needs no model download or network access, which makes it a stand-in for
+    tests and offline runs. Vectors are L2-normalised bags of hashed tokens.
+    """
+
+    _token_pattern = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dimensions
+            for token in self._token_pattern.findall(text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+                vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(value * value for value in vector))
+            vectors.append([value / norm for value in vector] if norm else vector)
+        return vectors
+
+
+class ParallelEmbedder:
+    """
+    Spread embedding of large batches over a pool of worker processes.
+    
+    Each worker holds its own copy of the wrapped embedder. Small inputs, or a
+    pool of a single worker, are embedded in-process.
+    
+    Args:
+        embedder: Embedder to run in the workers (must be picklable)
+        workers: Number of worker processes (None or 0 for one per CPU core)
+        batch_size: Maximum number of texts sent to a worker at once
+    """
+
+    def __init__(self, embedder: Embedder, workers: Optional[int] = None, batch_size: int = 64):
+        self.embedder = embedder
+        self.name = embedder.name
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._pool: Optional[WorkerPool] = None
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if self.workers <= 1 or len(texts) <= self.batch_size:
+            return self.embedder.embed(texts)
+        
+        if self._pool is None:
+            self._pool = WorkerPool(self.embedder, self.workers)
+        # Spread the texts evenly so every worker gets a share
+        size = min(self.batch_size, math.ceil(len(texts) / self.workers))
+        batches = [texts[start:start + size] for start in range(0, len(texts), size)]
+        
+        vectors = []
+        for batch_vectors in self._pool.map("embed", batches):
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def create_embedder(model: str) -> Embedder:
+    """Build an embedder by its settings name."""
+    if model == "chroma-default":
+        return ChromaDefaultEmbedder()
+    if model == "hashing":
+        return HashingEmbedder()
+    raise ValueError(f"Unknown embedding model: {model}")
+
+
+def _with_cache(embedder: Embedder) -> Embedder:
+    """Wrap an embedder with the shared embedding cache, if one is configured."""
+    from .embedding_cache import CachedEmbedder, get_embedding_cache
+    
+    cache = get_embedding_cache()
+    return CachedEmbedder(embedder, cache) if cache is not None else embedder
+
+
+@lru_cache()
+def get_base_embedder() -> Embedder:
+    """Get the uncached embedder configured by EMBEDDING_MODEL."""
+    return create_embedder(get_settings().EMBEDDING_MODEL)
+
+
+@lru_cache()
+def get_embedder() -> Embedder:
+    """Get the configured embedder, backed by the embedding cache."""
+    return _with_cache(get_base_embedder())
+
+
+def get_parallel_embedder(workers: Optional[int] = None) -> Embedder:
+    """Get a cached, process-pool embedder configured from settings; close it when done."""
+    settings = get_settings()
+    return _with_cache(ParallelEmbedder(
+        get_base_embedder(),
+        workers=workers if workers is not None else settings.EMBEDDING_WORKERS,
+        batch_size=settings.EMBEDDING_BATCH_SIZE
+    ))
@@ -0,0 +1,225 @@
+"""
+In-process BM25 inverted index kept next to a ChromaDB collection.
+
+Dense embeddings handle exact Dutch street and place names ("Haagweg",
+"Rijswijk") poorly, so retrieval fuses the vector ranking with a lexical
+BM25 ranking. The index is updated incrementally at ingestion time, written
+atomically to LEXICAL_INDEX_DIR and reloaded by the API when the file
+changes.
+"""
+import heapq
+import math
+import os
+import pickle
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import get_settings
+from .text import tokenize
+
+
+class LexicalIndex:
+    """
+    BM25 index over chunk texts, keyed by ChromaDB chunk ID.
+    
+    Documents are stored under small integer slots, and posting lists map
+    each term to {slot: term frequency}. Removing a document frees its slot
+    for reuse.
+    
+    Args:
+        k1: BM25 term-frequency saturation
+        b: BM25 document-length normalisation
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._slots: Dict[str, int] = {}
+        self._doc_ids: List[Optional[str]] = []
+        self._doc_terms: List[Tuple[str, ...]] = []
+        self._doc_lengths: List[int] = []
+        self._free_slots: List[int] = []
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index a document, replacing any previous version with the same ID."""
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        with self._lock:
+            self.remove(doc_id)
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._doc_ids[slot] = doc_id
+                self._doc_terms[slot] = tuple(counts)
+                self._doc_lengths[slot] = length
+            else:
+                slot = len(self._doc_ids)
+                self._doc_ids.append(doc_id)
+                self._doc_terms.append(tuple(counts))
+                self._doc_lengths.append(length)
+            self._slots[doc_id] = slot
+            self._total_length += length
+            for term, frequency in counts.items():
+                self._postings.setdefault(term, {})[slot] = frequency
+
+    def add_many(self, doc_ids: Sequence[str], texts: Sequence[str]) -> None:
+        for doc_id, text in zip(doc_ids, texts):
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document from the index if present."""
+        with self._lock:
+            slot = self._slots.pop(doc_id, None)
+            if slot is None:
+                return
+            for term in self._doc_terms[slot]:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(slot, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._doc_lengths[slot]
+            self._doc_ids[slot] = None
+            self._doc_terms[slot] = ()
+            self._doc_lengths[slot] = 0
+            self._free_slots.append(slot)
+
+    def remove_many(self, doc_ids: Sequence[str]) -> None:
+        for doc_id in doc_ids:
+            self.remove(doc_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings = {}
+            self._slots = {}
+            self._doc_ids = []
+            self._doc_terms = []
+            self._doc_lengths = []
+            self._free_slots = []
+            self._total_length = 0
+
+    def search(self, query: str, k: int = 10, allowed_ids: Optional[set] = None) -> List[Tuple[str, float]]:
+        """
+        Rank documents against a query with BM25.
+        
+        Args:
+            query: Search query
+            k: Number of results
+            allowed_ids: Optional set of document IDs to restrict the search to
+        
+        Returns:
+            (doc_id, score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._slots)
+            if not terms or not n_docs:
+                return []
+            average_length = self._total_length / n_docs or 1.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for slot, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[slot] / average_length)
+                    scores[slot] = scores.get(slot, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+            ranked = ((self._doc_ids[slot], score) for slot, score in scores.items())
+            if allowed_ids is not None:
+                ranked = (item for item in ranked if item[0] in allowed_ids)
+            return heapq.nlargest(k, ranked, key=lambda item: item[1])
+
+    def save(self, path: str) -> None:
+        """Write the index atomically, so readers never see a partial file."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with self._lock, open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """Load an index written by save(), or return an empty one if there is none."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse several rankings of IDs with reciprocal rank fusion.
+    
+    Each ID scores sum(1 / (k + rank)) over the rankings it appears in.
+    
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def lexical_index_path(collection_name: str) -> str:
+    """File the lexical index of a collection is stored in."""
+    return str(Path(get_settings().LEXICAL_INDEX_DIR) / f"{collection_name}.pkl")
+
+
+# Indexes loaded by this process: collection name -> (file mtime, index)
+_loaded_indexes: Dict[str, Tuple[float, LexicalIndex]] = {}
+_loaded_lock = threading.Lock()
+
+
+def get_lexical_index(collection_name: str) -> Optional[LexicalIndex]:
+    """
+    Get the lexical index of a collection, reloading it if ingestion rewrote it.
+    
+    Returns:
+        The index, or None if no index has been built for the collection yet
+    """
+    path = lexical_index_path(collection_name)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    with _loaded_lock:
+        loaded = _loaded_indexes.get(collection_name)
+        if loaded is None or loaded[0] != mtime:
+            loaded = (mtime, LexicalIndex.load(path))
+            _loaded_indexes[collection_name] = loaded
+    return loaded[1]
+
+
+def build_lexical_index(collection, page_size: int = 1000) -> LexicalIndex:
+    """Build a lexical index from every document already stored in a ChromaDB collection."""
+    index = LexicalIndex()
+    offset = 0
+    while True:
+        page = collection.get(include=["documents"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        index.add_many(page["ids"], page["documents"])
+        offset += len(page["ids"])
+    return index
@@ -0,0 +1,51 @@
+"""
+Text normalisation shared by lexical search and topic extraction.
+
+The corpus is mostly Dutch with some English, so tokenisation keeps
+accented letters and street/place names intact and only drops stopwords of
+both languages.
+"""
+import re
+from typing import List
+
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*|\d+", re.UNICODE)
+
+DUTCH_STOPWORDS = frozenset("""
+aan al alle alles als altijd andere ben bij daar dan dat de der deze die dit doch doen door dus
+een eens en er ge geen geweest haar had heb hebben heeft hem het hier hij hoe hun iemand iets ik
+in is ja je jij jou jouw jullie kan kon kunnen maar me meer men met mij mijn moet na naar niet
+niets nog nu of om omdat onder ons ook op over reeds te tegen toch toen tot u uit uw van veel
+voor want waren was wat we wel werd wezen wie wij wil worden wordt zal ze zei zelf zich zij zijn
+zo zonder zou gaat gaan ga heel echt even wel dan weer wordt wat waar hebt hadden zoals steeds
+""".split())
+
+ENGLISH_STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has
+have having he her here hers him his how i if in into is it its just me more most my no nor not
+now of off on once only or other our out over own same she should so some such than that the
+their them then there these they this those through to too under until up very was we were what
+when where which while who whom why will with would you your yours also get got like one really
+""".split())
+
+STOPWORDS = DUTCH_STOPWORDS | ENGLISH_STOPWORDS
+
+
+def tokenize(text: str, min_length: int = 2) -> List[str]:
+    """
+    Split text into lowercase word tokens without stopwords.
+    
+    Args:
+        text: Text to tokenise
+        min_length: Shortest token kept
+    
+    Returns:
+        List of tokens in order of appearance
+    """
+    if not text:
+        return []
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) >= min_length and token not in STOPWORDS
+    ]
@@ -0,0 +1,41 @@
+"""
+Process pools whose workers each hold their own copy of one object.
+
+The object (an embedder, a sentiment model) is pickled once per worker by
+the pool initializer instead of once per task; tasks only carry their batch.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Iterable, Iterator, List
+
+# Object owned by the current worker process (set by the pool initializer)
+_worker_target: Any = None
+
+
+def _init_worker(target: Any) -> None:
+    global _worker_target
+    _worker_target = target
+
+
+def _call_in_worker(method: str, batch: List[Any]) -> Any:
+    return getattr(_worker_target, method)(batch)
+
+
+class WorkerPool:
+    """
+    Pool of worker processes that call one method of a shared object.
+    
+    Args:
+        target: Object copied to every worker (must be picklable)
+        workers: Number of worker processes
+    """
+
+    def __init__(self, target: Any, workers: int):
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(target,))
+
+    def map(self, method: str, batches: Iterable[List[Any]]) -> Iterator[Any]:
+        """Call target.<method>(batch) in the workers; results come back in order."""
+        return self._pool.map(partial(_call_in_worker, method), batches)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown()
@@ -1,24 +1,80 @@
-from sqlmodel import SQLModel, Session, create_engine
+from pathlib import Path
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from core.config import get_settings
 from models import User  # Import models to register them with SQLModel
+from .models import (  # noqa: F401
+    Post, Comment, IngestedDocument, IngestWatermark, DailySentimentRollup, DailyTopicRollup, TopicTrend, TopicSummary
+)
 
 settings = get_settings()
-# Only create engine if DB settings are provided
+pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    echo=settings.DB_ECHO,
+)
+# Only create engines if DB settings are provided
 if all([settings.POSTGRES_USER, settings.POSTGRES_PASS, settings.POSTGRES_HOST, settings.POSTGRES_NAME]):
-    engine = create_engine(settings.db_url, echo=(not settings.PROD))
+    # Sync engine for scripts and jobs; API routes use async_engine so queries don't block the event loop
+    engine = create_engine(settings.db_url, **pool_options)
+    async_engine = create_async_engine(settings.async_db_url, **pool_options)
 else:
     engine = None
+    async_engine = None
+
+def _alembic_config():
+    from alembic.config import Config
+
+    return Config(str(Path(__file__).resolve().parent.parent / "alembic.ini"))
+
 
 def init_db():
+    """
+    Bring the schema up to date with the Alembic migrations in migrations/.
+    
+    Databases that SQLModel.metadata.create_all built before the schema was
+    migration-managed need no stamp: 0001/0002 only create what is missing.
+    That doesn't hold for create_all of later models (0003 drops a constraint
+    and 0005 adds columns such models already have): stamp such a database
+    with `alembic stamp head` instead of upgrading it.
+    """
     if engine is None:
         # Skip DB initialization if no DB settings provided
         return
-    # SQLModel.metadata.drop_all(engine)
-    SQLModel.metadata.create_all(engine)
+    from alembic import command
+
+    config = _alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+def schema_is_current() -> bool:
+    """Whether the database is at the newest migration; raises when it can't be reached."""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    if engine is None:
+        raise RuntimeError("Database not configured")
+    head = ScriptDirectory.from_config(_alembic_config()).get_current_head()
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision() == head
 
 
 def get_session():
     if engine is None:
         raise RuntimeError("Database not configured")
     with Session(engine) as session:
+        yield session
+
+
+async def get_async_session():
+    if async_engine is None:
+        raise RuntimeError("Database not configured")
+    # Loaded attributes stay readable after commit (no implicit refresh I/O outside an await)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
\ No newline at end of file
@@ -0,0 +1,406 @@
+"""
+Bulk loader from the scraper's output into the Post and Comment tables.
+
+The scraper writes a Parquet dataset partitioned by subreddit and date;
+only the columns the loader needs are read, and --since skips the date
+partitions of earlier loads. CSV files from older scraper runs load too.
+
+Rows are streamed from the input files into temporary staging tables with
+COPY, then merged with one INSERT ... SELECT ... ON CONFLICT per table,
+keyed on the Reddit ID (Post.external_id; Comment.external_id together
+with created_at, see migrations/versions/0003). Comments are attached to
+their parent Post.id with a join on the parent's Reddit ID.
+Python only ever touches each row once on its way into COPY, so a million
+rows load in seconds.
+
+Upserts only rewrite rows whose fields changed. Changed rows are retracted
+from the dashboard rollups before the update and recorded after it, and a
+changed text resets the sentiment label so db/sentiment.py relabels it.
+Everything happens in one transaction, after which incremental ChromaDB
+ingestion picks up every row written since its watermark (inserted rows,
+and updated rows whose text changed, take a new write_seq, see
+db/models.py).
+
+Usage:
+    python -m db.bulk_load datasets/reddit [--since 2025-01-01] [--no-ingest]
+    python -m db.bulk_load datasets/cleaned_reddit_data.csv [more.csv ...]
+"""
+import csv
+import hashlib
+import io
+import logging
+import os
+import time
+from datetime import date
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from sqlalchemy import BigInteger, Column, Float, Integer, MetaData, Table, Text, Uuid, case, func, null, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+
+from db.chroma_ingest import ingest_posts_to_chromadb
+from db.models import Post, Comment
+from db.partitions import ensure_monthly_partitions
+from db.rollups import record_documents, retract_documents
+from db import get_session
+
+logger = logging.getLogger(__name__)
+
+_staging = MetaData()
+
+# Scraped rows as they are in the CSV; `line` orders duplicates (the last one wins)
+_staged_posts = Table(
+    "staged_post", _staging,
+    Column("line", BigInteger),
+    Column("external_id", Text),
+    Column("created_utc", Float),
+    Column("content", Text),
+    Column("source", Text),
+    Column("subreddit", Text),
+    Column("url", Text),
+    Column("score", Integer),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+_staged_comments = Table(
+    "staged_comment", _staging,
+    Column("line", BigInteger),
+    Column("external_id", Text),
+    Column("post_external_id", Text),
+    Column("created_utc", Float),
+    Column("content", Text),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+# IDs written by this load, for the rollups and ChromaDB
+_loaded_posts = Table("loaded_post", _staging, Column("id", Uuid), prefixes=["TEMPORARY"], postgresql_on_commit="DROP")
+_loaded_comments = Table(
+    "loaded_comment", _staging, Column("id", Uuid), Column("post_id", Uuid),
+    prefixes=["TEMPORARY"], postgresql_on_commit="DROP"
+)
+
+
+_SCRAPED_COLUMNS = [
+    "post_id", "comment_id", "created_at", "content", "content_type", "source", "subreddit", "url", "score"
+]
+
+
+def comment_external_id(row: Dict[str, str]) -> str:
+    """Reddit comment ID, or a content hash for CSVs written before comment_id was scraped."""
+    if row.get("comment_id"):
+        return row["comment_id"]
+    key = f"{row['post_id']}\x1f{row['created_at']}\x1f{row['content']}"
+    return "sha1:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _read_csv(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _read_parquet(path: str, since: Optional[date]) -> Iterator[Dict[str, Any]]:
+    """Rows of a scraper Parquet dataset (or a single file), reading only the loaded columns."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partitioning = ds.partitioning(pa.schema([("subreddit", pa.string()), ("date", pa.string())]), flavor="hive")
+    dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+    columns = [name for name in _SCRAPED_COLUMNS if name in dataset.schema.names]
+    where = ds.field("date") >= since.isoformat() if since and "date" in dataset.schema.names else None
+    # The scraper names files by write time; replay them in that order so later versions of a row win
+    fragments = sorted(dataset.get_fragments(filter=where), key=lambda fragment: os.path.basename(fragment.path))
+    for fragment in fragments:
+        for batch in fragment.to_batches(schema=dataset.schema, columns=columns, filter=where):
+            yield from batch.to_pylist()
+
+
+def read_scraped_rows(paths: Iterable[str], since: Optional[date] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Rows of the scraper's output, skipping rows without content.
+
+    Args:
+        paths: Parquet dataset directories, .parquet files, or CSV files
+        since: Only read Parquet date partitions on or after this day
+
+    Yields:
+        One dict per scraped post or comment
+    """
+    for path in paths:
+        rows = _read_parquet(path, since) if os.path.isdir(path) or path.endswith(".parquet") else _read_csv(path)
+        for row in rows:
+            if (row.get("content") or "").strip():
+                yield row
+
+
+def _copy(session: Session, table: Table, rows: Iterable[List[Any]], batch_size: int) -> int:
+    """COPY rows into a staging table in CSV batches of batch_size; returns the row count."""
+    cursor = session.connection().connection.cursor()
+    columns = ", ".join(column.name for column in table.columns)
+    copied = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        buffer: TextIO = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table.name} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        copied += len(batch)
+    return copied
+
+
+def _stage(session: Session, rows: Iterable[Dict[str, str]], batch_size: int) -> Dict[str, int]:
+    """Split scraped rows into the post and comment staging tables."""
+    connection = session.connection()
+    for table in (_staged_posts, _staged_comments, _loaded_posts, _loaded_comments):
+        table.create(connection)
+
+    posts: List[List[Any]] = []
+    comments: List[List[Any]] = []
+    staged = {"posts": 0, "comments": 0}
+
+    def flush() -> None:
+        staged["posts"] += _copy(session, _staged_posts, posts, batch_size)
+        staged["comments"] += _copy(session, _staged_comments, comments, batch_size)
+        posts.clear()
+        comments.clear()
+
+    for line, row in enumerate(rows):
+        created_utc = float(row["created_at"])
+        if row.get("content_type") == "comment":
+            comments.append([line, comment_external_id(row), row["post_id"], created_utc, row["content"]])
+        else:
+            posts.append([
+                line, row["post_id"], created_utc, row["content"], row.get("source") or "reddit",
+                row.get("subreddit") or None, row.get("url") or "", int(float(row.get("score") or 0)),
+            ])
+        if len(posts) + len(comments) >= batch_size:
+            flush()
+    flush()
+
+    connection.exec_driver_sql("ANALYZE staged_post; ANALYZE staged_comment")
+    return staged
+
+
+def _latest(table: Table):
+    """One staged row per external ID, the last one in the input."""
+    return (
+        select(table)
+        .distinct(table.c.external_id)
+        .order_by(table.c.external_id, table.c.line.desc())
+        .subquery()
+    )
+
+
+def _timestamp(created_utc):
+    """Unix seconds to a naive UTC timestamp, like the ORM stores created_at."""
+    return func.timezone("UTC", func.to_timestamp(created_utc))
+
+
+def _merge_posts(session: Session) -> None:
+    staged = _latest(_staged_posts)
+    values = select(
+        func.gen_random_uuid(),
+        staged.c.external_id,
+        _timestamp(staged.c.created_utc),
+        staged.c.content,
+        staged.c.source,
+        staged.c.subreddit,
+        staged.c.url,
+        staged.c.score,
+    )
+    fields = ["created_at", "content", "source", "subreddit", "url", "score"]
+    statement = insert(Post).from_select(["id", "external_id", *fields], values)
+    excluded = statement.excluded
+    changed = tuple_(*(getattr(Post, field) for field in fields)).is_distinct_from(
+        tuple_(*(getattr(excluded, field) for field in fields))
+    )
+
+    # Take rows that are about to change out of the rollups first
+    retract_documents(session, post_ids=(
+        select(Post.id)
+        .join(staged, Post.external_id == staged.c.external_id)
+        .where(tuple_(*(getattr(Post, field) for field in fields)).is_distinct_from(tuple_(
+            _timestamp(staged.c.created_utc), staged.c.content, staged.c.source,
+            staged.c.subreddit, staged.c.url, staged.c.score,
+        )))
+    ))
+
+    text_changed = Post.content != excluded.content
+    statement = statement.on_conflict_do_update(
+        index_elements=["external_id"],
+        set_={
+            **{field: getattr(excluded, field) for field in fields},
+            "sentiment": case((text_changed, null()), else_=Post.sentiment),
+            "sentiment_score": case((text_changed, null()), else_=Post.sentiment_score),
+        },
+        where=changed,
+    )
+    upserted = statement.returning(Post.id).cte("upserted_posts")
+    session.execute(
+        insert(_loaded_posts).from_select(["id"], select(upserted.c.id))
+    )
+
+
+def _merge_comments(session: Session) -> int:
+    """Upsert staged comments whose parent post exists; returns the number of orphans skipped."""
+    # No-op unless Comment is partitioned by month (python -m db.partitions)
+    created_at = _timestamp(_staged_comments.c.created_utc)
+    ensure_monthly_partitions(
+        session.connection(), "comment", *session.execute(select(func.min(created_at), func.max(created_at))).one()
+    )
+
+    staged = _latest(_staged_comments)
+    parent = select(Post.id, Post.external_id).subquery()
+    values = (
+        select(
+            func.gen_random_uuid(),
+            staged.c.external_id,
+            _timestamp(staged.c.created_utc),
+            staged.c.content,
+            parent.c.id,
+        )
+        .join(parent, parent.c.external_id == staged.c.post_external_id)
+    )
+    fields = ["content", "post_id"]
+    statement = insert(Comment).from_select(["id", "external_id", "created_at", *fields], values)
+    excluded = statement.excluded
+
+    retract_documents(session, comment_ids=(
+        select(Comment.id)
+        .join(staged, (Comment.external_id == staged.c.external_id)
+              & (Comment.created_at == _timestamp(staged.c.created_utc)))
+        .join(parent, parent.c.external_id == staged.c.post_external_id)
+        .where(tuple_(Comment.content, Comment.post_id).is_distinct_from(tuple_(staged.c.content, parent.c.id)))
+    ))
+
+    text_changed = Comment.content != excluded.content
+    statement = statement.on_conflict_do_update(
+        index_elements=["external_id", "created_at"],  # Comment's natural key, see migrations/versions/0003
+        set_={
+            **{field: getattr(excluded, field) for field in fields},
+            "sentiment": case((text_changed, null()), else_=Comment.sentiment),
+            "sentiment_score": case((text_changed, null()), else_=Comment.sentiment_score),
+        },
+        where=tuple_(*(getattr(Comment, field) for field in fields)).is_distinct_from(
+            tuple_(*(getattr(excluded, field) for field in fields))
+        ),
+    )
+    upserted = statement.returning(Comment.id, Comment.post_id).cte("upserted_comments")
+    session.execute(
+        insert(_loaded_comments).from_select(["id", "post_id"], select(upserted.c.id, upserted.c.post_id))
+    )
+
+    return session.execute(
+        select(func.count())
+        .select_from(staged)
+        .where(~select(Post.id).where(Post.external_id == staged.c.post_external_id).exists())
+    ).scalar_one()
+
+
+def load_rows(
+    session: Session,
+    rows: Iterable[Dict[str, str]],
+    batch_size: int = 50_000
+) -> Dict[str, Any]:
+    """
+    Upsert scraped rows and update the rollups in the session's transaction.
+
+    Args:
+        session: Database session (the caller commits)
+        rows: Scraper CSV rows (post_id, created_at, content, content_type,
+            source, url, score and optionally subreddit and comment_id)
+        batch_size: Rows per COPY
+
+    Returns:
+        Statistics, including the number of posts that were written or got
+        new or changed comments
+    """
+    started = time.perf_counter()
+    staged = _stage(session, rows, batch_size)
+    _merge_posts(session)
+    orphans = _merge_comments(session)
+
+    session.connection().exec_driver_sql("ANALYZE loaded_post; ANALYZE loaded_comment")
+    record_documents(session, post_ids=select(_loaded_posts.c.id), comment_ids=select(_loaded_comments.c.id))
+
+    posts_written = session.execute(select(func.count()).select_from(_loaded_posts)).scalar_one()
+    comments_written = session.execute(select(func.count()).select_from(_loaded_comments)).scalar_one()
+    touched_ids = select(_loaded_posts.c.id).union(select(_loaded_comments.c.post_id)).subquery()
+    touched = session.execute(select(func.count()).select_from(touched_ids)).scalar_one()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Staged %d posts and %d comments, wrote %d posts and %d comments in %.1fs (%.0f rows/s)",
+        staged["posts"], staged["comments"], posts_written, comments_written, elapsed,
+        (staged["posts"] + staged["comments"]) / elapsed if elapsed else 0.0
+    )
+    if orphans:
+        logger.warning("Skipped %d comments whose post is not loaded", orphans)
+
+    return {
+        "posts_staged": staged["posts"],
+        "comments_staged": staged["comments"],
+        "posts_written": posts_written,
+        "comments_written": comments_written,
+        "comments_orphaned": orphans,
+        "posts_touched": touched,
+        "elapsed_seconds": round(elapsed, 3),
+    }
+
+
+def load_scraped_files(
+    paths: List[str],
+    ingest: bool = True,
+    collection_name: str = "civicpulse",
+    batch_size: int = 50_000,
+    since: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Load scraper output into Postgres, then ingest what changed into ChromaDB.
+
+    Args:
+        paths: Parquet datasets or CSV files written by scraping/reddit-clean-scraper.py
+        ingest: Run incremental ChromaDB ingestion afterwards
+        collection_name: ChromaDB collection to ingest into
+        batch_size: Rows per COPY
+        since: Only load Parquet date partitions on or after this day
+
+    Returns:
+        Load (and ingestion) statistics
+    """
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        stats = load_rows(session, read_scraped_rows(paths, since=since), batch_size=batch_size)
+        session.commit()
+    finally:
+        session.close()
+
+    if ingest:
+        # Scans everything written since the collection's watermark: this load, plus earlier
+        # --no-ingest loads or ones whose ingestion failed
+        stats["ingestion"] = ingest_posts_to_chromadb(collection_name=collection_name, incremental=True)
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk load scraped Reddit data into Postgres")
+    parser.add_argument("paths", nargs="+", help="Parquet datasets or CSV files written by the scraper")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="Skip Parquet partitions before this day (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Rows per COPY")
+    parser.add_argument("--collection", type=str, default="civicpulse")
+    parser.add_argument("--no-ingest", action="store_true", help="Skip ChromaDB ingestion")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    stats = load_scraped_files(
+        args.paths, ingest=not args.no_ingest, collection_name=args.collection, batch_size=args.batch_size,
+        since=args.since
+    )
+    logger.info("Bulk load finished: %s", stats)
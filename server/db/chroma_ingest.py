@@ -5,15 +5,43 @@ This module provides functionality to:
 - Retrieve Posts and Comments from PostgreSQL
 - Chunk the content for vector storage
 - Store chunks in ChromaDB with appropriate metadata
+
+Ingestion is streamed: posts are read in keyset-paginated pages, chunked
+lazily and flushed to ChromaDB in fixed-size batches, so memory usage does
+not grow with the size of the corpus.
 """
+import datetime
+import hashlib
+import logging
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 from sqlmodel import Session, select
+from sqlalchemy import tuple_, or_, delete, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 
-from db.models import Post, Comment
+from db.models import Post, Comment, IngestedDocument, IngestWatermark, WRITE_SEQ
 from db import get_session
 from core import get_chroma_client
+from core.embeddings import Embedder, get_embedder, get_parallel_embedder
+from core.lexical_index import LexicalIndex, build_lexical_index, lexical_index_path
+
+logger = logging.getLogger(__name__)
+
+# Bump when the chunk layout or chunk metadata changes so that incremental
+# ingestion rescans every post and rewrites every document.
+CHUNK_SCHEMA_VERSION = 2
+
+# How long a full scan waits for writes already in flight before it gives up on
+# moving the watermark (see _settled_write_seq)
+IN_FLIGHT_TIMEOUT = 30.0
+
+
+def chunk_layout(chunk_size: int = 1000, chunk_overlap: int = 200) -> str:
+    """Everything besides a document's content that decides how its chunks come out."""
+    return f"{CHUNK_SCHEMA_VERSION}:{chunk_size}:{chunk_overlap}"
 
 
 def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
@@ -91,6 +119,102 @@ def retrieve_all_posts(session: Session) -> List[Post]:
     return retrieve_posts_with_comments(session, limit=None)
 
 
+def iter_post_pages(
+    session: Session,
+    page_size: int = 100,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    where=None
+) -> Iterator[List[Post]]:
+    """
+    Yield pages of posts (with comments loaded) using keyset pagination.
+    
+    Posts are ordered by (created_at, id) and each page starts right after the
+    last row of the previous one, so the cost of a page does not depend on how
+    far into the table we are. Loaded objects are expunged from the session
+    once the consumer is done with a page to keep memory flat.
+    
+    Args:
+        session: SQLModel database session
+        page_size: Number of posts per page
+        limit: Maximum number of posts to yield in total (None for all)
+        offset: Number of posts to skip before the first page
+        where: Optional extra filter clause applied to every page
+    
+    Yields:
+        Lists of Post objects with loaded comments
+    """
+    cursor = None
+    remaining = limit
+    
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        statement = (
+            select(Post)
+            .options(selectinload(Post.comments))
+            .order_by(Post.created_at, Post.id)
+            .limit(size)
+        )
+        if where is not None:
+            statement = statement.where(where)
+        if cursor is None:
+            statement = statement.offset(offset)
+        else:
+            statement = statement.where(tuple_(Post.created_at, Post.id) > cursor)
+        
+        page = list(session.exec(statement).all())
+        if not page:
+            break
+        
+        # Read the cursor before handing the page out: the consumer may commit
+        # and expire the loaded objects.
+        cursor = (page[-1].created_at, page[-1].id)
+        yield page
+        
+        if remaining is not None:
+            remaining -= len(page)
+        session.expunge_all()
+        if len(page) < size:
+            break
+
+
+def batched(iterable: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """
+    Split an iterable into lists of at most batch_size items.
+    
+    Args:
+        iterable: Items to group
+        batch_size: Maximum number of items per batch
+    
+    Yields:
+        Lists of consecutive items
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def to_epoch(value: Optional[datetime.datetime]) -> Optional[int]:
+    """
+    Convert a datetime to integer Unix seconds for ChromaDB metadata.
+    
+    Numeric timestamps let date ranges be pushed down as $gte/$lte filters.
+    Naive datetimes are taken to be UTC.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp())
+
+
+def drop_empty_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove None values, which ChromaDB metadata doesn't accept."""
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
 def create_post_chunks(post: Post, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Dict[str, Any]]:
     """
     Create chunks from a Post object with metadata.
@@ -106,9 +230,9 @@ def create_post_chunks(post: Post, chunk_size: int = 1000, chunk_overlap: int =
     chunks = []
     post_chunks = chunk_text(post.content, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     
-    for idx, chunk_text in enumerate(post_chunks):
+    for idx, text_chunk in enumerate(post_chunks):
         chunk_data = {
-            "text": chunk_text,
+            "text": text_chunk,
             "metadata": {
                 "type": "post",
                 "post_id": str(post.id),
@@ -116,10 +240,12 @@ def create_post_chunks(post: Post, chunk_size: int = 1000, chunk_overlap: int =
                 "source": post.source,
                 "url": post.url,
                 "score": post.score,
-                "created_at": post.created_at.isoformat() if post.created_at else None,
+                "subreddit": post.subreddit,
+                "created_at": to_epoch(post.created_at),
                 "total_chunks": len(post_chunks),
             }
         }
+        chunk_data["metadata"] = drop_empty_metadata(chunk_data["metadata"])
         chunks.append(chunk_data)
     
     return chunks
@@ -141,9 +267,9 @@ def create_comment_chunks(comment: Comment, post: Post, chunk_size: int = 1000,
     chunks = []
     comment_chunks = chunk_text(comment.content, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     
-    for idx, chunk_text in enumerate(comment_chunks):
+    for idx, text_chunk in enumerate(comment_chunks):
         chunk_data = {
-            "text": chunk_text,
+            "text": text_chunk,
             "metadata": {
                 "type": "comment",
                 "comment_id": str(comment.id),
@@ -152,70 +278,286 @@ def create_comment_chunks(comment: Comment, post: Post, chunk_size: int = 1000,
                 "source": post.source,
                 "url": post.url,
                 "score": post.score,
-                "created_at": comment.created_at.isoformat() if comment.created_at else None,
+                "subreddit": post.subreddit,
+                "created_at": to_epoch(comment.created_at),
                 "total_chunks": len(comment_chunks),
             }
         }
+        chunk_data["metadata"] = drop_empty_metadata(chunk_data["metadata"])
         chunks.append(chunk_data)
     
     return chunks
 
 
-def store_chunks_in_chromadb(
-    collection_name: str,
-    chunks: List[Dict[str, Any]],
-    reset_collection: bool = False
-) -> None:
+def iter_post_chunks(post: Post, chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[Dict[str, Any]]:
     """
-    Store text chunks in ChromaDB collection.
+    Lazily yield the chunks of a post followed by the chunks of its comments.
+    
+    Args:
+        post: Post object with loaded comments
+        chunk_size: Maximum size of each chunk in characters
+        chunk_overlap: Number of characters to overlap between chunks
+    
+    Yields:
+        Dictionaries containing chunk text and metadata
+    """
+    yield from create_post_chunks(post, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for comment in post.comments:
+        yield from create_comment_chunks(comment, post, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def chunk_id_for(metadata: Dict[str, Any]) -> str:
+    """
+    Build the ChromaDB ID of a chunk from its metadata.
+    
+    IDs have the form post_<post_id>_<chunk_index> or
+    comment_<post_id>_<comment_id>_<chunk_index>.
+    """
+    post_id = metadata.get("post_id", "unknown")
+    chunk_idx = metadata["chunk_index"]
+    if metadata["type"] == "post":
+        return f"post_{post_id}_{chunk_idx}"
+    return f"comment_{post_id}_{metadata.get('comment_id', '')}_{chunk_idx}"
+
+
+def get_chroma_collection(collection_name: str, reset_collection: bool = False):
+    """
+    Get or create a ChromaDB collection.
     
     Args:
         collection_name: Name of the ChromaDB collection
-        chunks: List of dictionaries with 'text' and 'metadata' keys
-        reset_collection: If True, delete existing collection before adding chunks
+        reset_collection: If True, delete the existing collection first
+    
+    Returns:
+        ChromaDB collection
+    
+    Raises:
+        RuntimeError: The ChromaDB server is down; the local fallback store
+            (CHROMA_LOCAL_FALLBACK) is never written to, since PostgreSQL
+            would record hashes and watermarks for chunks the server lacks
     """
-    client = get_chroma_client()
+    client = get_chroma_client(allow_fallback=False)
     
-    # Get or create collection
     if reset_collection:
         try:
             client.delete_collection(collection_name)
         except Exception:
             pass  # Collection might not exist
     
-    collection = client.get_or_create_collection(
+    return client.get_or_create_collection(
         name=collection_name,
         metadata={"description": "CivicPulse posts and comments"}
     )
+
+
+def store_chunks_in_chromadb(
+    collection_name: str,
+    chunks: List[Dict[str, Any]],
+    reset_collection: bool = False,
+    collection=None,
+    embedder: Optional[Embedder] = None,
+    lexical_index: Optional[LexicalIndex] = None
+) -> None:
+    """
+    Store text chunks in ChromaDB collection.
+    
+    Args:
+        collection_name: Name of the ChromaDB collection
+        chunks: List of dictionaries with 'text' and 'metadata' keys
+        reset_collection: If True, delete existing collection before adding chunks
+        collection: Already opened collection to write to (skips the lookup)
+        embedder: Embedder used to compute the chunk vectors (defaults to the configured one)
+        lexical_index: BM25 index to keep in sync with the collection
+    """
+    if collection is None:
+        collection = get_chroma_collection(collection_name, reset_collection=reset_collection)
     
     if not chunks:
         return
     
-    # Prepare data for ChromaDB
     documents = [chunk["text"] for chunk in chunks]
-    metadatas = [chunk["metadata"] for chunk in chunks]
-    # Generate unique IDs: type_postid_commentid_chunkindex
-    ids = []
-    for chunk in chunks:
-        meta = chunk["metadata"]
-        chunk_type = meta["type"]
-        post_id = meta.get("post_id", "unknown")
-        comment_id = meta.get("comment_id", "")
-        chunk_idx = meta["chunk_index"]
-        
-        if chunk_type == "post":
-            chunk_id = f"post_{post_id}_{chunk_idx}"
-        else:
-            chunk_id = f"comment_{post_id}_{comment_id}_{chunk_idx}"
-        
-        ids.append(chunk_id)
+    embeddings = (embedder or get_embedder()).embed(documents)
+    
+    ids = [chunk_id_for(chunk["metadata"]) for chunk in chunks]
     
-    # Add chunks to collection
-    collection.add(
+    # Upsert so that re-ingesting a document overwrites its previous chunks
+    collection.upsert(
         documents=documents,
-        metadatas=metadatas,
+        embeddings=embeddings,
+        metadatas=[chunk["metadata"] for chunk in chunks],
         ids=ids
     )
+    if lexical_index is not None:
+        lexical_index.add_many(ids, documents)
+
+
+def content_hash(content: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> str:
+    """
+    Hash a document's content together with the chunking parameters.
+    
+    Changing the chunk layout changes the hash, so incremental ingestion
+    re-chunks documents whenever their chunks would come out differently.
+    """
+    digest = hashlib.sha256(f"{chunk_layout(chunk_size, chunk_overlap)}\0".encode("utf-8"))
+    digest.update((content or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _stale_chunk_ids(post: Post, comment: Optional[Comment], start: int, stop: int) -> List[str]:
+    """IDs of chunks start..stop-1 of a post or comment, left over from a longer previous version."""
+    metadata = {"type": "post" if comment is None else "comment", "post_id": str(post.id)}
+    if comment is not None:
+        metadata["comment_id"] = str(comment.id)
+    return [chunk_id_for({**metadata, "chunk_index": idx}) for idx in range(start, stop)]
+
+
+def _page_changes(
+    session: Session,
+    collection_name: str,
+    page: List[Post],
+    chunk_size: int,
+    chunk_overlap: int,
+    force: bool = False
+) -> Dict[str, Any]:
+    """
+    Work out which documents of a page are new or changed since the last run.
+    
+    With force=True every document is treated as changed.
+    
+    Returns:
+        Dictionary with the chunks to upsert, the stale chunk IDs to delete,
+        the document state rows to save and the number of unchanged documents
+    """
+    documents = []
+    for post in page:
+        documents.append((f"post:{post.id}", post, None))
+        for comment in post.comments:
+            documents.append((f"comment:{comment.id}", post, comment))
+    
+    statement = select(IngestedDocument).where(
+        IngestedDocument.collection_name == collection_name,
+        IngestedDocument.doc_id.in_([doc_id for doc_id, _, _ in documents])
+    )
+    previous = {state.doc_id: state for state in session.exec(statement).all()}
+    
+    chunks = []
+    stale_ids = []
+    states = []
+    unchanged = 0
+    now = datetime.datetime.utcnow()
+    for doc_id, post, comment in documents:
+        content = post.content if comment is None else comment.content
+        digest = content_hash(content, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        state = previous.get(doc_id)
+        if not force and state is not None and state.content_hash == digest:
+            unchanged += 1
+            continue
+        
+        if comment is None:
+            doc_chunks = create_post_chunks(post, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        else:
+            doc_chunks = create_comment_chunks(comment, post, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        chunks.extend(doc_chunks)
+        if state is not None:
+            stale_ids.extend(_stale_chunk_ids(post, comment, len(doc_chunks), state.chunk_count))
+        states.append({
+            "collection_name": collection_name,
+            "doc_id": doc_id,
+            "content_hash": digest,
+            "chunk_count": len(doc_chunks),
+            "updated_at": now,
+        })
+    
+    return {"chunks": chunks, "stale_ids": stale_ids, "states": states, "unchanged": unchanged}
+
+
+def _save_document_states(session: Session, states: List[Dict[str, Any]]) -> None:
+    """Insert or update document state rows in a single statement."""
+    if not states:
+        return
+    statement = insert(IngestedDocument).values(states)
+    statement = statement.on_conflict_do_update(
+        index_elements=["collection_name", "doc_id"],
+        set_={
+            "content_hash": statement.excluded.content_hash,
+            "chunk_count": statement.excluded.chunk_count,
+            "updated_at": statement.excluded.updated_at,
+        }
+    )
+    session.execute(statement)
+
+
+def _reset_ingest_state(session: Session, collection_name: str) -> None:
+    """Forget every document hash and the watermark of a collection."""
+    session.execute(delete(IngestedDocument).where(IngestedDocument.collection_name == collection_name))
+    session.execute(delete(IngestWatermark).where(IngestWatermark.collection_name == collection_name))
+    session.commit()
+
+
+def load_lexical_index(collection, reset_collection: bool = False) -> LexicalIndex:
+    """
+    Load the BM25 index kept next to a collection for incremental updates.
+    
+    If the collection has documents but no index was saved yet, the index is
+    bootstrapped from the documents already in ChromaDB.
+    """
+    if reset_collection:
+        return LexicalIndex()
+    index = LexicalIndex.load(lexical_index_path(collection.name))
+    if not len(index) and collection.count():
+        index = build_lexical_index(collection)
+    return index
+
+
+def _written_since(write_seq: int):
+    """Filter for posts written, or with a comment written, after the given write_seq."""
+    return or_(
+        Post.write_seq > write_seq,
+        Post.id.in_(select(Comment.post_id).where(Comment.write_seq > write_seq))
+    )
+
+
+def _settled_write_seq(session: Session, timeout: float = IN_FLIGHT_TIMEOUT) -> Optional[int]:
+    """
+    The last write_seq handed out, once no transaction can still commit a lower one.
+    
+    nextval() isn't transactional: a load still in flight may hold values
+    below the sequence's last_value that no scan can see yet, and a watermark
+    set to last_value would skip its rows for good. So, like CREATE INDEX
+    CONCURRENTLY, wait for the client transactions running when last_value
+    was read: anything that drew a value up to it is one of them. Statements
+    after this see what they committed (the session ends its own transaction
+    here).
+    
+    Returns:
+        The write_seq (0 before the first write), or None when those
+        transactions didn't finish within `timeout` seconds
+    """
+    row = session.execute(text(
+        f"SELECT last_value, is_called, ARRAY("
+        "SELECT l.virtualxid FROM pg_locks l JOIN pg_stat_activity a ON a.pid = l.pid "
+        "WHERE l.locktype = 'virtualxid' AND l.mode = 'ExclusiveLock' AND l.granted "
+        "AND l.pid <> pg_backend_pid() AND a.backend_type = 'client backend'"
+        f") FROM {WRITE_SEQ.name}"
+    )).one()
+    last_value, is_called, in_flight = row
+    session.commit()
+    deadline = time.monotonic() + timeout
+    while in_flight:
+        if time.monotonic() > deadline:
+            logger.warning(
+                "%d transaction(s) still running after %.0fs; the watermark stays where it was",
+                len(in_flight), timeout
+            )
+            return None
+        time.sleep(0.2)
+        # A virtualxid is never reused, so its lock disappearing means that transaction ended
+        in_flight = session.execute(
+            text("SELECT virtualxid FROM pg_locks WHERE locktype = 'virtualxid' AND virtualxid = ANY(:ids)"),
+            {"ids": in_flight}
+        ).scalars().all()
+        session.commit()
+    return last_value if is_called else 0
 
 
 def ingest_posts_to_chromadb(
@@ -224,11 +566,36 @@ def ingest_posts_to_chromadb(
     offset: int = 0,
     reset_collection: bool = False,
     chunk_size: int = 1000,
-    chunk_overlap: int = 200
+    chunk_overlap: int = 200,
+    batch_size: int = 256,
+    page_size: int = 100,
+    incremental: bool = False,
+    full_rescan: bool = False,
+    embedding_workers: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Main function to retrieve posts from PostgreSQL, chunk them, and store in ChromaDB.
     
+    Posts are streamed page by page and chunks are flushed to ChromaDB in
+    batches of batch_size, so a failure only loses the page in flight and
+    memory stays bounded by page_size and batch_size.
+    
+    Every run records a content hash per post/comment. A run that scans
+    everything (no limit or offset) also records
+    the last write_seq handed out before it started as the collection's
+    watermark, after waiting for the transactions that might still commit
+    lower values (a run that can't wait them out keeps the old watermark). With incremental=True only posts written, or with a comment
+    written, after that watermark are scanned, whatever their created_at,
+    and only documents whose hash changed are re-chunked and upserted;
+    chunks left over from a longer previous version are deleted. A
+    watermark recorded with another chunk_layout (a CHUNK_SCHEMA_VERSION
+    bump, or different chunk_size/chunk_overlap) is ignored, so such a
+    change rewrites the whole collection.
+    full_rescan=True keeps the hash comparison but scans every post.
+    
+    Embeddings are computed by a pool of embedding_workers processes and
+    passed to ChromaDB with the chunks.
+    
     Args:
         collection_name: Name of the ChromaDB collection
         limit: Maximum number of posts to process (None for all)
@@ -236,54 +603,109 @@ def ingest_posts_to_chromadb(
         reset_collection: If True, delete existing collection before adding chunks
         chunk_size: Maximum size of each chunk in characters
         chunk_overlap: Number of characters to overlap between chunks
+        batch_size: Number of chunks sent to ChromaDB per request
+        page_size: Number of posts read from PostgreSQL per query
+        incremental: Only write new or changed documents
+        full_rescan: With incremental, ignore the watermark and scan all posts
+        embedding_workers: Number of embedding processes (defaults to EMBEDDING_WORKERS)
     
     Returns:
         Dictionary with statistics about the ingestion process
     """
-    # Update chunk_text function parameters via closure or make it configurable
-    # For now, we'll use the default chunk_text function
-    
-    all_chunks = []
     posts_processed = 0
     comments_processed = 0
+    documents_unchanged = 0
+    chunks_deleted = 0
+    total_chunks = 0
+    batches = 0
+    started = time.perf_counter()
+    
+    collection = get_chroma_collection(collection_name, reset_collection=reset_collection)
+    
+    embedder = get_parallel_embedder(embedding_workers)
+    lexical_index = load_lexical_index(collection, reset_collection=reset_collection)
     
     # Get database session
     session_gen = get_session()
     session = next(session_gen)
     
     try:
-        # Retrieve posts with comments
-        posts = retrieve_posts_with_comments(session, limit=limit, offset=offset)
+        if reset_collection:
+            _reset_ingest_state(session, collection_name)
         
-        for post in posts:
-            # Create chunks from post content
-            post_chunks = create_post_chunks(post, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-            all_chunks.extend(post_chunks)
-            posts_processed += 1
-            
-            # Create chunks from comment content
-            for comment in post.comments:
-                comment_chunks = create_comment_chunks(comment, post, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-                all_chunks.extend(comment_chunks)
-                comments_processed += 1
+        layout = chunk_layout(chunk_size, chunk_overlap)
+        watermark = session.get(IngestWatermark, collection_name)
+        # Documents older than the mark were chunked differently: scan them all again
+        ingested_through = watermark.write_seq if watermark and watermark.chunk_layout == layout else None
+        where = None
+        if incremental and not full_rescan and ingested_through is not None:
+            where = _written_since(ingested_through)
+        # Only a scan of everything written so far may move the watermark, and only up to a
+        # write_seq every lower value of which was committed before the scan started
+        covers_everything = limit is None and offset == 0
+        scan_start = _settled_write_seq(session) if covers_everything else None
         
-        # Store all chunks in ChromaDB
-        if all_chunks:
-            store_chunks_in_chromadb(
-                collection_name=collection_name,
-                chunks=all_chunks,
-                reset_collection=reset_collection
+        for page in iter_post_pages(session, page_size=page_size, limit=limit, offset=offset, where=where):
+            posts_processed += len(page)
+            comments_processed += sum(len(post.comments) for post in page)
+            
+            changes = _page_changes(
+                session, collection_name, page, chunk_size, chunk_overlap, force=not incremental
             )
+            documents_unchanged += changes["unchanged"]
+            
+            for batch in batched(changes["chunks"], batch_size):
+                batch_started = time.perf_counter()
+                store_chunks_in_chromadb(
+                    collection_name=collection_name,
+                    chunks=batch,
+                    collection=collection,
+                    embedder=embedder,
+                    lexical_index=lexical_index
+                )
+                elapsed = time.perf_counter() - batch_started
+                batches += 1
+                total_chunks += len(batch)
+                logger.info(
+                    "Batch %d: stored %d chunks in %.2fs (%.1f chunks/s, %d total)",
+                    batches, len(batch), elapsed, len(batch) / elapsed if elapsed else 0.0, total_chunks
+                )
+            
+            if changes["stale_ids"]:
+                collection.delete(ids=changes["stale_ids"])
+                lexical_index.remove_many(changes["stale_ids"])
+                chunks_deleted += len(changes["stale_ids"])
+            
+            # Only record hashes once the page's chunks are safely in ChromaDB
+            _save_document_states(session, changes["states"])
+            session.commit()
         
+        if scan_start is not None and scan_start != ingested_through:
+            session.merge(IngestWatermark(collection_name=collection_name, write_seq=scan_start, chunk_layout=layout))
+            session.commit()
+        else:
+            scan_start = ingested_through
+        
+        elapsed_total = time.perf_counter() - started
         return {
             "status": "success",
+            "mode": "incremental" if incremental else "full",
             "posts_processed": posts_processed,
             "comments_processed": comments_processed,
-            "total_chunks": len(all_chunks),
+            "documents_unchanged": documents_unchanged,
+            "total_chunks": total_chunks,
+            "chunks_deleted": chunks_deleted,
+            "batches": batches,
+            "elapsed_seconds": round(elapsed_total, 3),
+            "chunks_per_second": round(total_chunks / elapsed_total, 1) if elapsed_total else 0.0,
+            "write_seq_watermark": scan_start,
             "collection_name": collection_name
         }
     
     finally:
+        # Save whatever made it into ChromaDB, even if the run failed midway
+        lexical_index.save(lexical_index_path(collection_name))
+        embedder.close()
         session.close()
 
 
@@ -322,22 +744,20 @@ def ingest_single_post_to_chromadb(
                 "message": f"Post with id {post_id} not found"
             }
         
-        # Create chunks from post content
-        post_chunks = create_post_chunks(post, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        all_chunks.extend(post_chunks)
+        # Create chunks from post and comment content
+        all_chunks.extend(iter_post_chunks(post, chunk_size=chunk_size, chunk_overlap=chunk_overlap))
         
-        # Create chunks from comment content
-        for comment in post.comments:
-            comment_chunks = create_comment_chunks(comment, post, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-            all_chunks.extend(comment_chunks)
-        
-        # Store chunks in ChromaDB
+        # Store chunks in ChromaDB and keep the lexical index in sync
         if all_chunks:
+            collection = get_chroma_collection(collection_name)
+            lexical_index = load_lexical_index(collection)
             store_chunks_in_chromadb(
                 collection_name=collection_name,
                 chunks=all_chunks,
-                reset_collection=False
+                collection=collection,
+                lexical_index=lexical_index
             )
+            lexical_index.save(lexical_index_path(collection_name))
         
         return {
             "status": "success",
@@ -350,3 +770,32 @@ def ingest_single_post_to_chromadb(
     finally:
         session.close()
 
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Ingest posts and comments from PostgreSQL into ChromaDB")
+    parser.add_argument("--collection", default="civicpulse")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="Delete the collection before ingesting")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--incremental", action="store_true", help="Only write new or changed documents")
+    parser.add_argument("--full-rescan", action="store_true", help="With --incremental, hash-check every post")
+    parser.add_argument("--workers", type=int, default=None, help="Embedding worker processes")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    stats = ingest_posts_to_chromadb(
+        collection_name=args.collection,
+        limit=args.limit,
+        offset=args.offset,
+        reset_collection=args.reset,
+        batch_size=args.batch_size,
+        page_size=args.page_size,
+        incremental=args.incremental,
+        full_rescan=args.full_rescan,
+        embedding_workers=args.workers
+    )
+    logger.info("Ingestion finished: %s", stats)
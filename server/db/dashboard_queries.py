@@ -0,0 +1,383 @@
+"""
+Dashboard aggregates read from the daily rollup tables.
+
+Posts and comments are pre-aggregated per day by db/rollups.py, so every
+query here only scans (days x sources x sentiments [x topics]) rows of the
+requested window and its latency doesn't grow with the corpus. Posts and
+comments that have not been classified yet count as neutral.
+"""
+import datetime
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlmodel import Session
+
+from core.cache import TTLCache
+from core.config import get_settings
+from db.models import DailySentimentRollup, DailyTopicRollup, TopicTrend, TopicSummary
+from db import get_session
+
+SENTIMENTS = ("positive", "neutral", "negative")
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Civic topics shown in the word cloud and the substrings (Dutch and English)
+# that count as a mention
+TOPIC_KEYWORDS: Dict[str, List[str]] = {
+    "verkeer": ["verkeer", "traffic", "snelweg", "drukte"],
+    "parkeren": ["parkeer", "parkeren", "parking"],
+    "groenvoorziening": ["groenvoorziening", "groen ", "bomen", "plantsoen", "greenery"],
+    "veiligheid": ["veiligheid", "onveilig", "politie", "inbraak", "police", "crime", "safety"],
+    "onderwijs": ["onderwijs", "school", "education", "university"],
+    "afval": ["afval", "vuilnis", "container", "garbage", "trash", "waste"],
+    "evenementen": ["evenement", "festival", "concert", "event"],
+    "fietspaden": ["fietspad", "fiets", "bike", "cycling"],
+    "winkels": ["winkel", "supermarkt", "shop", "store"],
+    "jeugd": ["jeugd", "jongeren", "kinderen", "youth", "kids"],
+    "bereikbaarheid": ["bereikbaar", "tram", "station", "trein", "train", "bus "],
+    "speeltuinen": ["speeltuin", "playground"],
+    "wonen": ["woning", "huur", "wonen", "housing", "rent", "apartment"],
+}
+
+
+def topic_condition(column, topic: str, lowered: bool = False):
+    """
+    SQL condition matching any keyword of a topic (case-insensitive).
+    
+    Pass lowered=True for a column that is already lowercase, which lets
+    Postgres use plain LIKE, a few times cheaper than ILIKE.
+    """
+    if lowered:
+        return or_(*(column.like(f"%{keyword}%") for keyword in TOPIC_KEYWORDS[topic]))
+    return or_(*(column.ilike(f"%{keyword}%") for keyword in TOPIC_KEYWORDS[topic]))
+
+
+def overall_sentiment(positive: int, neutral: int, negative: int) -> str:
+    """Summarise sentiment counts as a single label."""
+    if max(positive, negative) == 0:
+        return "neutral"
+    if positive > negative * 1.2:
+        return "positive"
+    if negative > positive * 1.2:
+        return "negative"
+    return "neutral"
+
+
+def _window(days: int, now: Optional[datetime.datetime] = None) -> Tuple[datetime.datetime, datetime.datetime, datetime.datetime]:
+    """Start of the previous window, start of the current window and its end (tomorrow 00:00 UTC)."""
+    now = now or datetime.datetime.utcnow()
+    end = datetime.datetime.combine(now.date(), datetime.time()) + datetime.timedelta(days=1)
+    current_start = end - datetime.timedelta(days=days)
+    return current_start - datetime.timedelta(days=days), current_start, end
+
+
+def _percent_change(current: float, previous: float) -> float:
+    if not previous:
+        return 100.0 if current else 0.0
+    return (current - previous) / previous * 100
+
+
+def _trend(change: float) -> str:
+    return "up" if change >= 0 else "down"
+
+
+def get_sentiment_by_day(session: Session, days: int = 7) -> List[Dict[str, Any]]:
+    """
+    Positive/neutral/negative mention counts per day.
+    
+    Returns:
+        One row per day of the window, oldest first, with days without
+        mentions filled with zeros
+    """
+    _, start, end = _window(days)
+    rollup = DailySentimentRollup
+    statement = select(
+        rollup.day,
+        *(func.sum(rollup.mentions).filter(rollup.sentiment == sentiment).label(sentiment) for sentiment in SENTIMENTS)
+    ).where(rollup.day >= start.date(), rollup.day < end.date()).group_by(rollup.day)
+    
+    counts = {row.day: row for row in session.execute(statement)}
+    rows = []
+    for offset in range(days):
+        date = (start + datetime.timedelta(days=offset)).date()
+        row = counts.get(date)
+        rows.append({
+            "day": WEEKDAYS[date.weekday()],
+            **{sentiment: int(getattr(row, sentiment) or 0) if row else 0 for sentiment in SENTIMENTS}
+        })
+    return rows
+
+
+def _topic_sentiment_counts(session: Session, start: datetime.date, end: datetime.date) -> Dict[str, Dict[str, int]]:
+    """Topic -> sentiment -> mentions between two days."""
+    rollup = DailyTopicRollup
+    statement = select(
+        rollup.topic, rollup.sentiment, func.sum(rollup.mentions).label("mentions")
+    ).where(rollup.day >= start, rollup.day < end).group_by(rollup.topic, rollup.sentiment)
+    
+    counts: Dict[str, Dict[str, int]] = {}
+    for row in session.execute(statement):
+        counts.setdefault(row.topic, dict.fromkeys(SENTIMENTS, 0))[row.sentiment] = int(row.mentions or 0)
+    return counts
+
+
+def get_topic_counts(session: Session, days: Optional[int] = None, limit: int = 12, kind: str = "keyword") -> List[Dict[str, Any]]:
+    """
+    Mentions and overall sentiment per topic.
+    
+    Without a window the topics found by the extraction job (db/topics.py)
+    are read from TopicSummary. With a window, or while the job has not run
+    yet, the fixed civic topics are counted from the daily rollups.
+    
+    Args:
+        session: Database session
+        days: Window in days, or None for the extracted topics
+        limit: Maximum number of topics
+        kind: "keyword" or "cluster" (extracted topics only)
+    """
+    if days is None:
+        statement = (
+            select(TopicSummary.topic, TopicSummary.mentions, TopicSummary.sentiment)
+            .where(TopicSummary.kind == kind, TopicSummary.mentions > 0)
+            .order_by(TopicSummary.mentions.desc())
+            .limit(limit)
+        )
+        topics = [
+            {"text": row.topic, "count": row.mentions, "sentiment": row.sentiment}
+            for row in session.execute(statement)
+        ]
+        if topics:
+            return topics
+        days = 30
+    
+    _, start, end = _window(days)
+    topics = []
+    for topic, counts in _topic_sentiment_counts(session, start.date(), end.date()).items():
+        values = [counts.get(sentiment, 0) for sentiment in SENTIMENTS]
+        if sum(values):
+            topics.append({"text": topic, "count": sum(values), "sentiment": overall_sentiment(*values)})
+    topics.sort(key=lambda topic: topic["count"], reverse=True)
+    return topics[:limit]
+
+
+def _rollup_trend_counters(session: Session, now: datetime.datetime, fast_rate: float, slow_rate: float):
+    """
+    TopicTrend-like (topic, fast, fast negative, slow, slow negative) counters
+    as of `now`, replayed from DailyTopicRollup.
+    
+    TopicTrend only holds the current state, but the daily topic rollup counts
+    the same documents, so an earlier state can be rebuilt at day resolution:
+    each day's mentions count as if they happened at noon. Days older than ten
+    slow half-lives weigh under 0.1% and are skipped.
+    """
+    rollup = DailyTopicRollup
+    horizon = now - datetime.timedelta(seconds=10 * math.log(2) / slow_rate)
+    rows = session.execute(
+        select(
+            rollup.topic,
+            rollup.day,
+            func.sum(rollup.mentions),
+            func.coalesce(func.sum(rollup.mentions).filter(rollup.sentiment == "negative"), 0),
+        )
+        .where(rollup.day >= horizon.date(), rollup.day < now.date())
+        .group_by(rollup.topic, rollup.day)
+    ).all()
+    
+    counters: Dict[str, List[float]] = {}
+    for topic, day, mentions, negative in rows:
+        age = (now - datetime.datetime.combine(day, datetime.time(12))).total_seconds()
+        fast_decay, slow_decay = math.exp(-fast_rate * age), math.exp(-slow_rate * age)
+        topic_counters = counters.setdefault(topic, [0.0, 0.0, 0.0, 0.0])
+        topic_counters[0] += mentions * fast_decay
+        topic_counters[1] += negative * fast_decay
+        topic_counters[2] += mentions * slow_decay
+        topic_counters[3] += negative * slow_decay
+    return [(topic, *values) for topic, values in counters.items()]
+
+
+def get_emerging_issues(
+    session: Session,
+    min_mentions: float = 5.0,
+    volume_ratio: float = 2.0,
+    negative_shift: float = 0.2,
+    limit: Optional[int] = None,
+    now: Optional[datetime.datetime] = None,
+    from_rollups: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Topics whose recent volume or negativity spikes against their baseline.
+    
+    For a steady mention rate, a counter with decay rate lambda settles at
+    rate / lambda, so the slow (baseline) counter predicts the fast one as
+    slow * lambda_slow / lambda_fast. A topic is flagged when its fast
+    counter is volume_ratio times that prediction, or when the negative
+    share of its recent mentions is negative_shift above the baseline share.
+    
+    Args:
+        session: Database session
+        min_mentions: Minimum recent (decayed) mentions to flag a topic
+        volume_ratio: Recent / expected mentions that counts as a spike
+        negative_shift: Rise in negative share that counts as a spike
+        limit: Maximum number of issues
+        now: Time to evaluate the counters at (defaults to now)
+        from_rollups: Replay the counters from DailyTopicRollup instead of
+            reading TopicTrend, which can only be decayed forward; use it
+            to evaluate a past `now`
+    
+    Returns:
+        Flagged topics, highest Poisson z-score of the volume first
+    """
+    settings = get_settings()
+    now = now or datetime.datetime.utcnow()
+    fast_rate = math.log(2) / (settings.EMERGING_FAST_HALF_LIFE_HOURS * 3600)
+    slow_rate = math.log(2) / (settings.EMERGING_SLOW_HALF_LIFE_HOURS * 3600)
+    
+    if from_rollups:
+        counters = _rollup_trend_counters(session, now, fast_rate, slow_rate)
+    else:
+        counters = []
+        for trend in session.execute(select(TopicTrend)).scalars():
+            elapsed = max((now - trend.as_of).total_seconds(), 0.0)
+            fast_decay, slow_decay = math.exp(-fast_rate * elapsed), math.exp(-slow_rate * elapsed)
+            counters.append((
+                trend.topic,
+                trend.fast_mentions * fast_decay,
+                trend.fast_negative * fast_decay,
+                trend.slow_mentions * slow_decay,
+                trend.slow_negative * slow_decay,
+            ))
+    
+    issues = []
+    for topic, mentions, negative, slow_mentions, slow_negative in counters:
+        mentions, negative = max(mentions, 0.0), max(negative, 0.0)
+        slow_mentions, slow_negative = max(slow_mentions, 0.0), max(slow_negative, 0.0)
+        
+        expected = slow_mentions * slow_rate / fast_rate
+        negative_share = negative / mentions if mentions else 0.0
+        baseline_negative_share = slow_negative / slow_mentions if slow_mentions else 0.0
+        
+        reasons = []
+        if mentions >= min_mentions and mentions >= expected * volume_ratio:
+            reasons.append("volume")
+        if negative >= min_mentions and negative_share - baseline_negative_share >= negative_shift:
+            reasons.append("negative")
+        if reasons:
+            issues.append({
+                "topic": topic,
+                "mentions": round(mentions, 1),
+                "expected": round(expected, 1),
+                "negative_share": round(negative_share, 3),
+                "baseline_negative_share": round(baseline_negative_share, 3),
+                "score": round((mentions - expected) / math.sqrt(expected + 1), 2),
+                "reasons": reasons,
+            })
+    
+    issues.sort(key=lambda issue: issue["score"], reverse=True)
+    return issues[:limit] if limit else issues
+
+
+# Emerging-issue counts replayed from the rollups, keyed on the time they were evaluated at
+_emerging_counts = TTLCache(maxsize=64, ttl=get_settings().EMERGING_CACHE_TTL_SECONDS)
+
+
+def _emerging_count(session: Session, at: datetime.datetime) -> int:
+    """Number of emerging issues at `at`, replayed from DailyTopicRollup (cached)."""
+    count = _emerging_counts.get(at)
+    if count is None:
+        count = len(get_emerging_issues(session, now=at, from_rollups=True))
+        _emerging_counts.set(at, count)
+    return count
+
+
+def get_metric_overview(session: Session, days: int = 7) -> List[Dict[str, Any]]:
+    """
+    Headline metrics for the current window compared with the previous one.
+    
+    - citizenSatisfaction: share of positive among opinionated mentions
+    - emergingIssues: topics flagged by get_emerging_issues() at the end of
+      the window compared with the number flagged at its start, both
+      replayed from the daily topic rollup so the two sides are estimated
+      the same way (and cached for EMERGING_CACHE_TTL_SECONDS)
+    - publicResponseImpact: change in average post score
+    - civicEngagement: number of posts and comments
+    """
+    previous_start, current_start, end = _window(days)
+    rollup = DailySentimentRollup
+    is_post = rollup.kind == "post"
+    
+    def totals(window):
+        return [
+            func.coalesce(func.sum(rollup.mentions).filter(window), 0),
+            func.coalesce(func.sum(rollup.mentions).filter(window, is_post), 0),
+            func.coalesce(func.sum(rollup.mentions).filter(window, rollup.sentiment == "positive"), 0),
+            func.coalesce(func.sum(rollup.mentions).filter(window, rollup.sentiment == "negative"), 0),
+            func.coalesce(func.sum(rollup.score_sum).filter(window, is_post), 0),
+        ]
+    
+    current = rollup.day >= current_start.date()
+    previous = rollup.day < current_start.date()
+    row = session.execute(
+        select(*totals(current), *totals(previous))
+        .where(rollup.day >= previous_start.date(), rollup.day < end.date())
+    ).one()
+    (docs_now, posts_now, positive_now, negative_now, score_now,
+     docs_prev, posts_prev, positive_prev, negative_prev, score_prev) = (int(value) for value in row)
+    
+    satisfaction_now = positive_now / (positive_now + negative_now) * 100 if positive_now + negative_now else 0.0
+    satisfaction_prev = positive_prev / (positive_prev + negative_prev) * 100 if positive_prev + negative_prev else 0.0
+    satisfaction_change = satisfaction_now - satisfaction_prev
+    
+    emerging = _emerging_count(session, end)
+    emerging_prev = _emerging_count(session, current_start)
+    emerging_change = emerging - emerging_prev
+    
+    impact = _percent_change(score_now / posts_now if posts_now else 0.0, score_prev / posts_prev if posts_prev else 0.0)
+    comments_per_post_now = (docs_now - posts_now) / posts_now if posts_now else 0.0
+    comments_per_post_prev = (docs_prev - posts_prev) / posts_prev if posts_prev else 0.0
+    comments_change = _percent_change(comments_per_post_now, comments_per_post_prev)
+    engagement_change = _percent_change(docs_now, docs_prev)
+    
+    return [
+        {
+            "title": "citizenSatisfaction",
+            "value": f"{satisfaction_now:.0f}%",
+            "change": f"{satisfaction_change:+.1f}%",
+            "trend": _trend(satisfaction_change),
+            "icon": "ThumbsUp",
+            "color": "text-chart-1",
+        },
+        {
+            "title": "emergingIssues",
+            "value": str(emerging),
+            "change": f"{emerging_change:+d}",
+            "trend": _trend(emerging_change),
+            "icon": "AlertTriangle",
+            "color": "text-chart-2",
+        },
+        {
+            "title": "publicResponseImpact",
+            "value": f"{impact:+.0f}%",
+            "change": f"{comments_change:+.1f}%",
+            "trend": _trend(impact),
+            "icon": "Activity",
+            "color": "text-chart-3",
+        },
+        {
+            "title": "civicEngagement",
+            "value": f"{docs_now:,}",
+            "change": f"{engagement_change:+.1f}%",
+            "trend": _trend(engagement_change),
+            "icon": "Users",
+            "color": "text-chart-4",
+        },
+    ]
+
+
+def load_dashboard_snapshot() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Compute metrics, sentiment and topics in one session (used for the chat system prompt)."""
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        return get_metric_overview(session), get_sentiment_by_day(session), get_topic_counts(session)
+    finally:
+        session.close()
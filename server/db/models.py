@@ -1,22 +1,119 @@
 import datetime
-from typing import Literal
+from typing import Literal, Optional
+from sqlalchemy import BigInteger, Column, Index, Sequence, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 from uuid import UUID, uuid4
 
+# Shared by post and comment: every insert, and every update that changes content (a trigger,
+# see migrations/versions/0007), takes the next value, so ingestion can find what was written
+# since its last run whatever the rows' created_at
+WRITE_SEQ = Sequence("write_seq")
+
+
+def _write_seq_column() -> Column:
+    return Column(
+        "write_seq", BigInteger, WRITE_SEQ, server_default=WRITE_SEQ.next_value(), nullable=False, index=True
+    )
+
 
 class Post(SQLModel, table=True):
+    # Schema changes go through Alembic (migrations/); keep these in sync with the latest revision
+    __table_args__ = (
+        Index("ix_post_created_at_id", "created_at", "id"),  # time windows and ingestion's keyset pagination
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
+    external_id: Optional[str] = Field(default=None, unique=True)  # Reddit post ID, the bulk loader's upsert key
     created_at: datetime.datetime
     content: str
-    source: str
+    source: str = Field(index=True)
+    subreddit: Optional[str] = None
     url: str
     score: int
+    sentiment: Optional[str] = None  # positive / neutral / negative, None until classified
+    sentiment_score: Optional[float] = None  # -1 (negative) .. 1 (positive)
+    write_seq: Optional[int] = Field(default=None, sa_column=_write_seq_column())
     comments: list["Comment"] = Relationship(back_populates="post")
 
 
 class Comment(SQLModel, table=True):
+    # Unique with created_at (which Reddit never changes) so the table can be partitioned by it
+    __table_args__ = (
+        UniqueConstraint("external_id", "created_at", name="comment_external_id_created_at_key"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
-    created_at: datetime.datetime
+    external_id: Optional[str] = Field(default=None)  # Reddit comment ID (or content hash)
+    created_at: datetime.datetime = Field(index=True)
     content: str
-    post_id: UUID = Field(foreign_key="post.id")
-    post: Post = Relationship(back_populates="comments")
\ No newline at end of file
+    post_id: UUID = Field(foreign_key="post.id", index=True)
+    sentiment: Optional[str] = None  # positive / neutral / negative, None until classified
+    sentiment_score: Optional[float] = None  # -1 (negative) .. 1 (positive)
+    write_seq: Optional[int] = Field(default=None, sa_column=_write_seq_column())
+    post: Post = Relationship(back_populates="comments")
+
+
+class IngestedDocument(SQLModel, table=True):
+    """Content hash of a post or comment as last written to a ChromaDB collection."""
+    collection_name: str = Field(primary_key=True)
+    doc_id: str = Field(primary_key=True)
+    content_hash: str
+    chunk_count: int
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+
+
+class IngestWatermark(SQLModel, table=True):
+    """
+    Newest write_seq whose posts and comments have all been ingested into a
+    ChromaDB collection, and the chunk layout they were ingested with.
+    """
+    collection_name: str = Field(primary_key=True)
+    write_seq: int = Field(sa_type=BigInteger)
+    chunk_layout: str = ""
+
+
+class DailySentimentRollup(SQLModel, table=True):
+    """Posts or comments per day, source and sentiment, kept up to date at ingestion."""
+    day: datetime.date = Field(primary_key=True)
+    source: str = Field(primary_key=True)
+    kind: str = Field(primary_key=True)  # post / comment
+    sentiment: str = Field(primary_key=True)
+    mentions: int = 0
+    score_sum: int = 0
+
+
+class DailyTopicRollup(SQLModel, table=True):
+    """Topic mentions per day, source and sentiment, kept up to date at ingestion."""
+    day: datetime.date = Field(primary_key=True)
+    source: str = Field(primary_key=True)
+    sentiment: str = Field(primary_key=True)
+    topic: str = Field(primary_key=True)
+    mentions: int = 0
+
+
+class TopicTrend(SQLModel, table=True):
+    """
+    Exponentially decayed mention counters per topic, as of as_of.
+    
+    The fast counters follow the last day or so, the slow ones the baseline
+    of the last weeks (see EMERGING_*_HALF_LIFE_HOURS).
+    """
+    topic: str = Field(primary_key=True)
+    as_of: datetime.datetime
+    fast_mentions: float = 0.0
+    fast_negative: float = 0.0
+    slow_mentions: float = 0.0
+    slow_negative: float = 0.0
+
+
+class TopicSummary(SQLModel, table=True):
+    """Topic (keyword or embedding cluster) found by the topic extraction job."""
+    topic: str = Field(primary_key=True)
+    kind: str = Field(primary_key=True)  # keyword / cluster
+    mentions: int = Field(index=True)
+    positive: int = 0
+    neutral: int = 0
+    negative: int = 0
+    sentiment: str = "neutral"
+    keywords: str = ""  # comma-separated top terms
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
@@ -0,0 +1,179 @@
+"""
+Monthly range partitions for tables partitioned by created_at.
+
+Comment is partitioned only on request, outside the migration chain:
+
+    python -m db.partitions            # partition comment by month
+    python -m db.partitions --undo     # back to a plain table
+
+Both directions are idempotent and copy the data in one transaction, so
+expect the table to be locked for a while on large corpora. Run them after
+`alembic upgrade head`; Postgres requires the partition key in every unique
+constraint, hence the (id, created_at) primary key and the
+(external_id, created_at) natural key from migration 0003.
+
+There is no default partition, so a row outside every month fails loudly
+instead of piling up in a catch-all; writers create the months they need
+first (db/bulk_load.py does so for every load).
+"""
+import datetime
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import Connection, inspect, text
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_NAME = re.compile(r"\w+_y\d{4}m\d{2}")
+
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    """Whether `table` is a partitioned (parent) table."""
+    return connection.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": table},
+    ).scalar_one()
+
+
+def _month(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def _next_month(month: datetime.date) -> datetime.date:
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def partition_name(table: str, month: datetime.date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def is_partition_name(name: str) -> bool:
+    """Whether `name` looks like a table created by ensure_monthly_partitions."""
+    return _PARTITION_NAME.fullmatch(name) is not None
+
+
+def ensure_monthly_partitions(
+    connection: Connection,
+    table: str,
+    start: Optional[datetime.datetime],
+    end: Optional[datetime.datetime],
+) -> int:
+    """
+    Create the missing monthly partitions of `table` covering start..end.
+
+    Args:
+        connection: Connection, inside the transaction that will write the rows
+        table: Table partitioned by range on created_at
+        start: Oldest created_at to cover (None: nothing to do)
+        end: Newest created_at to cover
+
+    Returns:
+        Number of partitions created (0 as well when `table` isn't partitioned)
+    """
+    if start is None or end is None or not is_partitioned(connection, table):
+        return 0
+    created = 0
+    month = _month(start.date())
+    while month <= end.date():
+        name = partition_name(table, month)
+        if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar_one() is None:
+            connection.exec_driver_sql(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+            )
+            created += 1
+        month = _next_month(month)
+    return created
+
+
+def _add_comment_constraints(connection: Connection, primary_key: List[str]) -> None:
+    # Built after the copy: one index build per partition instead of per-row index maintenance
+    for statement in (
+        f"ALTER TABLE comment ADD CONSTRAINT comment_pkey PRIMARY KEY ({', '.join(primary_key)})",
+        "ALTER TABLE comment ADD CONSTRAINT comment_external_id_created_at_key UNIQUE (external_id, created_at)",
+        "ALTER TABLE comment ADD CONSTRAINT comment_post_id_fkey FOREIGN KEY (post_id) REFERENCES post (id)",
+        "CREATE INDEX ix_comment_created_at ON comment (created_at)",
+        "CREATE INDEX ix_comment_post_id ON comment (post_id)",
+        "CREATE INDEX ix_comment_write_seq ON comment (write_seq)",
+        # LIKE doesn't copy triggers; see migrations/versions/0007
+        "CREATE TRIGGER comment_bump_write_seq BEFORE UPDATE ON comment FOR EACH ROW "
+        "WHEN (OLD.content IS DISTINCT FROM NEW.content) EXECUTE FUNCTION bump_write_seq()",
+        "ANALYZE comment",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+def _replace_comment_table(connection: Connection, partition_by: str = "") -> None:
+    """Copy comment into a new table (partitioned when `partition_by` is given) and swap it in."""
+    connection.exec_driver_sql(f"CREATE TABLE comment_new (LIKE comment INCLUDING DEFAULTS) {partition_by}")
+    if partition_by:
+        start, end = connection.execute(text("SELECT min(created_at), max(created_at) FROM comment")).one()
+        ensure_monthly_partitions(connection, "comment_new", start, end)
+    connection.exec_driver_sql("INSERT INTO comment_new SELECT * FROM comment")
+    connection.exec_driver_sql("DROP TABLE comment")  # drops the old partitions and constraint names with it
+    connection.exec_driver_sql("ALTER TABLE comment_new RENAME TO comment")
+    if partition_by:
+        # Partitions keep their comment_new_* names otherwise; bulk_load looks them up by name
+        for (name,) in connection.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'comment'::regclass"
+        )).all():
+            connection.exec_driver_sql(f"ALTER TABLE {name} RENAME TO {name.replace('comment_new_', 'comment_', 1)}")
+
+
+def partition_comments(connection: Connection) -> bool:
+    """
+    Turn comment into a table range-partitioned by month on created_at.
+
+    Args:
+        connection: Connection, inside a transaction
+
+    Returns:
+        False when comment was already partitioned
+    """
+    if is_partitioned(connection, "comment"):
+        return False
+    unique = {tuple(c["column_names"]) for c in inspect(connection).get_unique_constraints("comment")}
+    if ("external_id", "created_at") not in unique:
+        raise RuntimeError("comment has no (external_id, created_at) key yet; run `alembic upgrade head` first")
+    _replace_comment_table(connection, partition_by="PARTITION BY RANGE (created_at)")
+    _add_comment_constraints(connection, ["id", "created_at"])
+    return True
+
+
+def unpartition_comments(connection: Connection) -> bool:
+    """
+    Turn a partitioned comment table back into a plain one.
+
+    Args:
+        connection: Connection, inside a transaction
+
+    Returns:
+        False when comment wasn't partitioned
+    """
+    if not is_partitioned(connection, "comment"):
+        return False
+    _replace_comment_table(connection)
+    _add_comment_constraints(connection, ["id"])
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Partition the comment table by month")
+    parser.add_argument("--undo", action="store_true", help="Convert a partitioned comment table back to a plain one")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if engine is None:
+        raise SystemExit("Database not configured")
+    with engine.begin() as connection:
+        changed = (unpartition_comments if args.undo else partition_comments)(connection)
+    if changed:
+        logger.info("comment is now %s", "a plain table" if args.undo else "partitioned by month")
+    else:
+        logger.info("Nothing to do: comment is already %s", "a plain table" if args.undo else "partitioned")
@@ -0,0 +1,249 @@
+"""
+Pre-aggregated daily rollups of posts and comments for the dashboard.
+
+Three tables hold the aggregates the dashboard reads:
+
+- DailySentimentRollup: mentions and score per day x source x kind x sentiment
+- DailyTopicRollup: topic mentions per day x source x sentiment x topic
+- TopicTrend: exponentially decayed (fast and slow) mention and negative
+  counters per topic, one row per topic, used to detect emerging issues
+
+Rollups are maintained incrementally: whoever inserts posts/comments calls
+record_documents() with the new row IDs, and anything that changes a row's
+sentiment or content calls retract_documents() before and
+record_documents() after the change. Both run one INSERT ... SELECT ...
+GROUP BY per table with ON CONFLICT increments, so Python never sees raw
+rows.
+backfill_rollups() rebuilds everything from history.
+
+Usage:
+    python -m db.rollups backfill
+"""
+import datetime
+import logging
+import math
+from typing import Iterable, Optional, Union
+from uuid import UUID
+
+from sqlalchemy import Float, Integer, Select, case, cast, delete, func, literal, null, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+
+from core.config import get_settings
+from db.models import Post, Comment, DailySentimentRollup, DailyTopicRollup, TopicTrend
+from db.dashboard_queries import TOPIC_KEYWORDS, topic_condition
+from db import get_session
+
+logger = logging.getLogger(__name__)
+
+
+# A list of IDs, or a SELECT of one ID column for sets too large to pass around
+IDs = Union[Iterable[UUID], Select]
+
+
+def _ids(ids: Optional[IDs]):
+    return ids if isinstance(ids, Select) else list(ids or [])
+
+
+def _any(ids) -> bool:
+    return isinstance(ids, Select) or bool(ids)
+
+
+def _documents(post_ids: Optional[IDs] = None, comment_ids: Optional[IDs] = None):
+    """
+    Posts and comments as (kind, day, created_at, source, sentiment, score, lowercased content) rows.
+    
+    With IDs, only those rows are included (an empty list selects none);
+    without, every row is.
+    """
+    posts = select(
+        literal("post").label("kind"),
+        func.date(Post.created_at).label("day"),
+        Post.created_at.label("created_at"),
+        Post.source.label("source"),
+        func.coalesce(Post.sentiment, "neutral").label("sentiment"),
+        Post.score.label("score"),
+        func.lower(Post.content).label("content"),
+    )
+    comments = select(
+        literal("comment").label("kind"),
+        func.date(Comment.created_at).label("day"),
+        Comment.created_at.label("created_at"),
+        Post.source.label("source"),
+        func.coalesce(Comment.sentiment, "neutral").label("sentiment"),
+        cast(null(), Integer).label("score"),
+        func.lower(Comment.content).label("content"),
+    ).join(Post, Comment.post_id == Post.id)
+    
+    if post_ids is not None or comment_ids is not None:
+        posts = posts.where(Post.id.in_(_ids(post_ids)))
+        comments = comments.where(Comment.id.in_(_ids(comment_ids)))
+    # A CTE, so that Postgres materialises it once for all the topic branches reading it
+    return union_all(posts, comments).cte("documents")
+
+
+def _decay(seconds, half_life_hours: float):
+    """SQL weight exp(-lambda * seconds) of something that happened `seconds` ago, clamped to [e^-50, 1]."""
+    rate = math.log(2) / (half_life_hours * 3600)
+    # extract(epoch ...) is numeric, and exp() on numeric is several times slower than on float8
+    return func.exp(func.least(func.greatest(-cast(seconds, Float) * rate, -50.0), 0.0))
+
+
+def _apply_trends(session: Session, documents, sign: int) -> None:
+    """
+    Add or subtract the decayed weight of some documents to the topic trend counters.
+    
+    Every document counts with weight exp(-lambda * age) as of now, and a
+    stored counter is decayed to the newer of its own and the incoming as_of
+    before the two are added, so one row per topic is all the state there is.
+    """
+    settings = get_settings()
+    half_lives = {
+        "fast": settings.EMERGING_FAST_HALF_LIFE_HOURS,
+        "slow": settings.EMERGING_SLOW_HALF_LIFE_HOURS,
+    }
+    now = datetime.datetime.utcnow()
+    age = func.extract("epoch", literal(now) - documents.c.created_at)
+    is_negative = documents.c.sentiment == "negative"
+    
+    trend_rows = union_all(*(
+        select(
+            literal(topic).label("topic"),
+            literal(now).label("as_of"),
+            *(
+                column
+                for speed, half_life in half_lives.items()
+                for column in (
+                    (func.sum(_decay(age, half_life)) * sign).label(f"{speed}_mentions"),
+                    (func.coalesce(func.sum(case((is_negative, _decay(age, half_life)))), 0.0) * sign).label(f"{speed}_negative"),
+                )
+            )
+        )
+        .where(topic_condition(documents.c.content, topic, lowered=True))
+        .having(func.count() > 0)
+        for topic in TOPIC_KEYWORDS
+    ))
+    statement = insert(TopicTrend).from_select(
+        ["topic", "as_of", "fast_mentions", "fast_negative", "slow_mentions", "slow_negative"], trend_rows
+    )
+    as_of = func.greatest(TopicTrend.as_of, statement.excluded.as_of)
+    
+    def merged(counter: str):
+        half_life = half_lives[counter.split("_")[0]]
+        stored, incoming = getattr(TopicTrend, counter), getattr(statement.excluded, counter)
+        return (
+            stored * _decay(func.extract("epoch", as_of - TopicTrend.as_of), half_life)
+            + incoming * _decay(func.extract("epoch", as_of - statement.excluded.as_of), half_life)
+        )
+    
+    statement = statement.on_conflict_do_update(
+        index_elements=["topic"],
+        set_={
+            "as_of": as_of,
+            **{
+                counter: merged(counter)
+                for counter in ("fast_mentions", "fast_negative", "slow_mentions", "slow_negative")
+            },
+        }
+    )
+    session.execute(statement)
+
+
+def _apply(session: Session, documents, sign: int) -> None:
+    """Add (sign=1) or subtract (sign=-1) the aggregates of some documents to the rollups."""
+    sentiment_rows = select(
+        documents.c.day,
+        documents.c.source,
+        documents.c.kind,
+        documents.c.sentiment,
+        (func.count() * sign).label("mentions"),
+        (func.coalesce(func.sum(documents.c.score), 0) * sign).label("score_sum"),
+    ).group_by(documents.c.day, documents.c.source, documents.c.kind, documents.c.sentiment)
+    
+    statement = insert(DailySentimentRollup).from_select(
+        ["day", "source", "kind", "sentiment", "mentions", "score_sum"], sentiment_rows
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["day", "source", "kind", "sentiment"],
+        set_={
+            "mentions": DailySentimentRollup.mentions + statement.excluded.mentions,
+            "score_sum": DailySentimentRollup.score_sum + statement.excluded.score_sum,
+        }
+    )
+    session.execute(statement)
+    
+    topic_rows = union_all(*(
+        select(
+            documents.c.day,
+            documents.c.source,
+            documents.c.sentiment,
+            literal(topic).label("topic"),
+            (func.count() * sign).label("mentions"),
+        )
+        .where(topic_condition(documents.c.content, topic, lowered=True))
+        .group_by(documents.c.day, documents.c.source, documents.c.sentiment)
+        for topic in TOPIC_KEYWORDS
+    ))
+    statement = insert(DailyTopicRollup).from_select(
+        ["day", "source", "sentiment", "topic", "mentions"], topic_rows
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["day", "source", "sentiment", "topic"],
+        set_={"mentions": DailyTopicRollup.mentions + statement.excluded.mentions}
+    )
+    session.execute(statement)
+    
+    _apply_trends(session, documents, sign)
+
+
+def record_documents(
+    session: Session,
+    post_ids: Optional[IDs] = None,
+    comment_ids: Optional[IDs] = None
+) -> None:
+    """
+    Add newly inserted (or just updated) posts and comments to the rollups.
+    
+    The caller commits; call it in the same transaction as the insert so the
+    rollups never drift from the raw tables.
+    """
+    post_ids, comment_ids = _ids(post_ids), _ids(comment_ids)
+    if _any(post_ids) or _any(comment_ids):
+        _apply(session, _documents(post_ids, comment_ids), sign=1)
+
+
+def retract_documents(
+    session: Session,
+    post_ids: Optional[IDs] = None,
+    comment_ids: Optional[IDs] = None
+) -> None:
+    """Remove posts and comments from the rollups before their sentiment or content changes."""
+    post_ids, comment_ids = _ids(post_ids), _ids(comment_ids)
+    if _any(post_ids) or _any(comment_ids):
+        _apply(session, _documents(post_ids, comment_ids), sign=-1)
+
+
+def backfill_rollups(session: Session) -> None:
+    """Rebuild the rollup tables from the full Post/Comment history."""
+    session.execute(delete(DailySentimentRollup))
+    session.execute(delete(DailyTopicRollup))
+    session.execute(delete(TopicTrend))
+    _apply(session, _documents(), sign=1)
+    session.commit()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Maintain the dashboard rollup tables")
+    parser.add_argument("command", choices=["backfill"])
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        backfill_rollups(session)
+        logger.info("Rollups rebuilt")
+    finally:
+        session.close()
@@ -0,0 +1,230 @@
+"""
+Offline sentiment classification of posts and comments.
+
+Unlabelled rows (sentiment IS NULL) are read in keyset-paginated pages,
+classified in batches (in-process by default, or across a process pool for
+heavier models) and written back with one bulk UPDATE per page. Every page is committed on its own, so the job can be
+interrupted and resumed at any time and re-runs only touch new rows. The
+dashboard rollups are moved from "neutral" (how unlabelled rows are counted)
+to the new labels in the same transaction.
+
+The default model is a Dutch/English lexicon that needs no network access;
+any object with a name and a predict(texts) method can be plugged in.
+
+Usage:
+    python -m db.sentiment [--workers N] [--batch-size N]
+"""
+import logging
+import math
+import os
+import re
+import time
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from core.config import get_settings
+from core.worker_pool import WorkerPool
+from db.models import Post, Comment
+from db.rollups import record_documents, retract_documents
+from db import get_session
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentModel(Protocol):
+    """Anything that labels a batch of texts as (label, score in [-1, 1])."""
+    name: str
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float]]:
+        ...
+
+
+POSITIVE_WORDS: Dict[str, float] = {
+    # Dutch
+    "goed": 1.0, "goede": 1.0, "prima": 1.0, "mooi": 1.0, "mooie": 1.0, "fijn": 1.0, "fijne": 1.0,
+    "leuk": 1.0, "leuke": 1.0, "gezellig": 1.0, "schoon": 0.8, "veilig": 0.8, "rustig": 0.6,
+    "blij": 1.0, "tevreden": 1.0, "top": 1.0, "geweldig": 1.5, "prachtig": 1.5, "uitstekend": 1.5,
+    "handig": 0.8, "aanrader": 1.2, "bedankt": 0.8, "dank": 0.8, "super": 1.2,
+    "verbeterd": 1.0, "verbetering": 0.8, "vriendelijk": 1.0, "behulpzaam": 1.0,
+    # English
+    "good": 1.0, "great": 1.2, "nice": 1.0, "lovely": 1.2, "love": 1.2, "clean": 0.8, "safe": 0.8,
+    "quiet": 0.5, "happy": 1.0, "excellent": 1.5, "amazing": 1.5, "beautiful": 1.2, "helpful": 1.0,
+    "friendly": 1.0, "recommend": 1.0, "thanks": 0.8, "improved": 1.0, "cozy": 1.0, "convenient": 0.8,
+}
+
+NEGATIVE_WORDS: Dict[str, float] = {
+    # Dutch
+    "slecht": 1.0, "slechte": 1.0, "vies": 1.0, "vieze": 1.0, "onveilig": 1.2, "druk": 0.5,
+    "lawaai": 0.8, "overlast": 1.2, "file": 0.6, "files": 0.6, "duur": 0.6, "dure": 0.6,
+    "klacht": 0.8, "klachten": 0.8, "probleem": 0.8, "problemen": 0.8, "boos": 1.0, "irritant": 1.0,
+    "vervelend": 1.0, "jammer": 0.6, "verschrikkelijk": 1.5, "waardeloos": 1.5, "kapot": 1.0,
+    "gevaarlijk": 1.2, "inbraak": 1.0, "criminaliteit": 1.0, "zwerfafval": 1.0,
+    "stank": 1.0, "lelijk": 1.0, "teleurgesteld": 1.0, "helaas": 0.6, "vertraging": 0.8,
+    # English
+    "bad": 1.0, "terrible": 1.5, "awful": 1.5, "horrible": 1.5, "dirty": 1.0, "unsafe": 1.2,
+    "dangerous": 1.2, "noise": 0.8, "noisy": 0.8, "expensive": 0.6, "problem": 0.8, "problems": 0.8,
+    "complaint": 0.8, "annoying": 1.0, "hate": 1.2, "worst": 1.5, "broken": 1.0, "crime": 1.0,
+    "delay": 0.8, "delayed": 0.8, "disappointed": 1.0, "unfortunately": 0.6, "ugly": 1.0, "scam": 1.2,
+}
+
+NEGATIONS = frozenset({"niet", "geen", "nooit", "not", "no", "never", "don't", "isn't", "wasn't"})
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?", re.UNICODE)
+
+
+class LexiconSentimentModel:
+    """
+    Dutch/English word-list classifier.
+    
+    Sums the weights of positive and negative words (flipping words within
+    three tokens after a negation), squashes the sum into [-1, 1] and labels
+    anything within threshold of zero as neutral.
+    
+    Args:
+        threshold: Minimum absolute score for a positive/negative label
+    """
+    name = "lexicon-nl-en-v1"
+
+    def __init__(self, threshold: float = 0.2):
+        self.threshold = threshold
+
+    def score(self, text: str) -> float:
+        total = 0.0
+        negated_until = -1
+        tokens = _WORD_PATTERN.findall((text or "").lower())
+        for position, token in enumerate(tokens):
+            if token in NEGATIONS:
+                negated_until = position + 3
+                continue
+            weight = POSITIVE_WORDS.get(token, 0.0) - NEGATIVE_WORDS.get(token, 0.0)
+            if weight and position <= negated_until:
+                weight = -weight
+            total += weight
+        if not total:
+            return 0.0
+        # Longer texts need more evidence for the same score
+        return math.tanh(total / math.sqrt(max(len(tokens), 1)) * 2)
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float]]:
+        results = []
+        for text in texts:
+            score = self.score(text)
+            if score >= self.threshold:
+                label = "positive"
+            elif score <= -self.threshold:
+                label = "negative"
+            else:
+                label = "neutral"
+            results.append((label, round(score, 4)))
+        return results
+
+
+def _classify_table(
+    session: Session,
+    table,
+    model: SentimentModel,
+    pool: Optional[WorkerPool],
+    workers: int,
+    batch_size: int,
+    limit: Optional[int]
+) -> int:
+    """Label the unlabelled rows of Post or Comment, one committed page at a time."""
+    labelled = 0
+    last_id = None
+    page_size = batch_size * max(workers, 1)
+    
+    while limit is None or labelled < limit:
+        statement = select(table.id, table.content).where(table.sentiment.is_(None)).order_by(table.id)
+        if last_id is not None:
+            statement = statement.where(table.id > last_id)
+        size = page_size if limit is None else min(page_size, limit - labelled)
+        rows = session.exec(statement.limit(size)).all()
+        if not rows:
+            break
+        
+        started = time.perf_counter()
+        ids = [row[0] for row in rows]
+        texts = [row[1] or "" for row in rows]
+        if pool is None:
+            predictions = model.predict(texts)
+        else:
+            batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+            predictions = [prediction for batch in pool.map("predict", batches) for prediction in batch]
+        
+        # Move the rows out of the "neutral" rollup bucket, label them, and
+        # count them again under their new label, all in one transaction
+        kind = "post_ids" if table is Post else "comment_ids"
+        retract_documents(session, **{kind: ids})
+        session.execute(update(table), [
+            {"id": row_id, "sentiment": label, "sentiment_score": score}
+            for row_id, (label, score) in zip(ids, predictions)
+        ])
+        record_documents(session, **{kind: ids})
+        session.commit()
+        
+        labelled += len(ids)
+        last_id = ids[-1]
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "%s: labelled %d rows in %.2fs (%.0f rows/s, %d total)",
+            table.__name__, len(ids), elapsed, len(ids) / elapsed if elapsed else 0.0, labelled
+        )
+    
+    return labelled
+
+
+def classify_unlabeled(
+    model: Optional[SentimentModel] = None,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    limit: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Label every post and comment that has no sentiment yet.
+    
+    Args:
+        model: Sentiment model (defaults to LexiconSentimentModel)
+        workers: Worker processes (defaults to SENTIMENT_WORKERS; 1 classifies in-process, 0 uses all cores)
+        batch_size: Texts per worker batch (defaults to SENTIMENT_BATCH_SIZE)
+        limit: Maximum number of rows to label per table
+    
+    Returns:
+        Number of posts and comments labelled
+    """
+    settings = get_settings()
+    model = model or LexiconSentimentModel()
+    workers = workers if workers is not None else settings.SENTIMENT_WORKERS
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or settings.SENTIMENT_BATCH_SIZE
+    
+    pool = None
+    if workers > 1:
+        pool = WorkerPool(model, workers)
+    
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        return {
+            "posts_labelled": _classify_table(session, Post, model, pool, workers, batch_size, limit),
+            "comments_labelled": _classify_table(session, Comment, model, pool, workers, batch_size, limit),
+        }
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        session.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Classify the sentiment of unlabelled posts and comments")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    stats = classify_unlabeled(workers=args.workers, batch_size=args.batch_size, limit=args.limit)
+    logger.info("Sentiment classification finished: %s", stats)
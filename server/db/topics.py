@@ -0,0 +1,363 @@
+"""
+Offline topic and keyword extraction over all posts and comments.
+
+The corpus is streamed from the database once, tokenised (Dutch/English
+stopwords removed) and turned into a sparse document-term matrix. Every
+further step is a vectorised SciPy/NumPy operation on that matrix:
+
+- keywords are the terms with the highest summed TF-IDF weight, with
+  mentions (document frequency) and sentiment counts per term computed as
+  one sparse product of the binary matrix and a one-hot sentiment matrix
+- optionally, the embeddings already stored in ChromaDB are clustered with
+  mini-batch k-means and every cluster is labelled by its c-TF-IDF top terms
+
+The results replace the TopicSummary table in one transaction, so
+/api/dashboard/topics only has to read a handful of indexed rows.
+
+Usage:
+    python -m db.topics [--top N] [--clusters K] [--collection NAME]
+"""
+import datetime
+import logging
+import time
+from array import array
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import delete, select
+from sqlmodel import Session
+
+from core.text import tokenize
+from db.chroma_ingest import get_chroma_collection
+from db.dashboard_queries import SENTIMENTS, overall_sentiment
+from db.models import Post, Comment, TopicSummary
+from db import get_session
+
+logger = logging.getLogger(__name__)
+
+_SENTIMENT_INDEX = {sentiment: idx for idx, sentiment in enumerate(SENTIMENTS)}
+_NEUTRAL = _SENTIMENT_INDEX["neutral"]
+
+
+class Corpus:
+    """
+    Sparse document-term counts of the whole corpus.
+    
+    Attributes:
+        counts: CSR matrix (documents x terms) of raw term counts
+        terms: Term of every column
+        sentiments: Sentiment index (into SENTIMENTS) of every document
+        doc_index: "post:<id>" / "comment:<id>" -> row
+    """
+
+    def __init__(self, counts: sp.csr_matrix, terms: np.ndarray, sentiments: np.ndarray, doc_index: Dict[str, int]):
+        self.counts = counts
+        self.terms = terms
+        self.sentiments = sentiments
+        self.doc_index = doc_index
+
+    @property
+    def n_documents(self) -> int:
+        return self.counts.shape[0]
+
+
+def build_corpus(session: Session, min_df: int = 5, max_df: float = 0.5, page_size: int = 10_000) -> Corpus:
+    """
+    Stream all posts and comments into a document-term matrix.
+    
+    Args:
+        session: Database session
+        min_df: Drop terms occurring in fewer documents
+        max_df: Drop terms occurring in more than this share of documents
+        page_size: Rows fetched per round trip
+    
+    Returns:
+        Corpus with the pruned vocabulary
+    """
+    vocabulary: Dict[str, int] = {}
+    indices = array("i")
+    indptr = array("q", [0])
+    sentiments = array("b")
+    doc_index: Dict[str, int] = {}
+    
+    for kind, table in (("post", Post), ("comment", Comment)):
+        statement = select(table.id, table.content, table.sentiment).execution_options(yield_per=page_size)
+        for row_id, content, sentiment in session.execute(statement):
+            doc_index[f"{kind}:{row_id}"] = len(sentiments)
+            indices.extend(
+                vocabulary.setdefault(token, len(vocabulary))
+                for token in tokenize(content or "")
+                if not token.isdigit()
+            )
+            indptr.append(len(indices))
+            sentiments.append(_SENTIMENT_INDEX.get(sentiment, _NEUTRAL))
+    
+    n_documents = len(sentiments)
+    counts = sp.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), np.frombuffer(indices, dtype=np.int32), np.frombuffer(indptr, dtype=np.int64)),
+        shape=(n_documents, len(vocabulary))
+    )
+    counts.sum_duplicates()
+    
+    document_frequency = np.diff(counts.tocsc().indptr)
+    keep = (document_frequency >= min_df) & (document_frequency <= max(max_df * n_documents, min_df))
+    terms = np.empty(len(vocabulary), dtype=object)
+    terms[list(vocabulary.values())] = list(vocabulary.keys())
+    
+    return Corpus(counts[:, keep].tocsr(), terms[keep], np.frombuffer(sentiments, dtype=np.int8).copy(), doc_index)
+
+
+def tfidf(counts: sp.csr_matrix) -> sp.csr_matrix:
+    """Sublinear TF-IDF with smoothed IDF and L2-normalised rows."""
+    n_documents = counts.shape[0]
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+    
+    weights = counts.copy()
+    weights.data = 1 + np.log(weights.data)
+    weights = weights @ sp.diags(idf.astype(np.float32))
+    norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sp.diags(1 / norms) @ weights
+
+
+def _sentiment_matrix(labels: np.ndarray) -> sp.csr_matrix:
+    """One-hot (documents x sentiments) matrix."""
+    return sp.csr_matrix(
+        (np.ones(len(labels), dtype=np.float32), (np.arange(len(labels)), labels)),
+        shape=(len(labels), len(SENTIMENTS))
+    )
+
+
+def extract_keywords(corpus: Corpus, top: int = 50) -> List[Dict[str, Any]]:
+    """
+    Top keywords by summed TF-IDF weight.
+    
+    Returns:
+        One dictionary per keyword with its mentions (documents containing it)
+        and sentiment counts, highest weight first
+    """
+    if not corpus.counts.nnz:
+        return []
+    
+    scores = np.asarray(tfidf(corpus.counts).sum(axis=0)).ravel()
+    order = np.argsort(-scores)[:top]
+    
+    present = corpus.counts[:, order].tocsc()
+    present.data[:] = 1
+    by_sentiment = np.asarray((present.T @ _sentiment_matrix(corpus.sentiments)).todense(), dtype=np.int64)
+    
+    return [
+        {"topic": str(corpus.terms[term]), "keywords": [str(corpus.terms[term])], **dict(zip(SENTIMENTS, map(int, counts)))}
+        for term, counts in zip(order, by_sentiment)
+    ]
+
+
+def minibatch_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    batch_size: int = 4096,
+    iterations: int = 100,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Spherical mini-batch k-means.
+    
+    Args:
+        vectors: (n x d) embeddings
+        n_clusters: Number of clusters
+        batch_size: Vectors sampled per iteration
+        iterations: Number of mini-batches
+        seed: Random seed
+    
+    Returns:
+        Cluster label of every vector
+    """
+    rng = np.random.default_rng(seed)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    n_clusters = min(n_clusters, len(vectors))
+    centers = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    seen = np.zeros(n_clusters)
+    
+    for _ in range(iterations):
+        batch = vectors[rng.choice(len(vectors), min(batch_size, len(vectors)), replace=False)]
+        labels = np.argmax(batch @ centers.T, axis=1)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, batch)
+        batch_counts = np.bincount(labels, minlength=n_clusters)
+        seen += batch_counts
+        
+        # Per-center learning rate 1/seen, as in Sculley's mini-batch k-means
+        updated = batch_counts > 0
+        rate = (batch_counts[updated] / seen[updated])[:, None]
+        centers[updated] += rate * (sums[updated] / batch_counts[updated, None] - centers[updated])
+        centers /= np.maximum(np.linalg.norm(centers, axis=1, keepdims=True), 1e-12)
+    
+    return np.concatenate([
+        np.argmax(vectors[start:start + batch_size] @ centers.T, axis=1)
+        for start in range(0, len(vectors), batch_size)
+    ])
+
+
+def _load_document_embeddings(collection_name: str, corpus: Corpus, page_size: int = 5000) -> Tuple[np.ndarray, np.ndarray]:
+    """Embeddings of the first chunk of every document, with the matching corpus rows."""
+    collection = get_chroma_collection(collection_name)
+    rows: List[int] = []
+    embeddings: List[np.ndarray] = []
+    offset = 0
+    while True:
+        page = collection.get(
+            where={"chunk_index": 0}, include=["embeddings", "metadatas"], limit=page_size, offset=offset
+        )
+        if not page["ids"]:
+            break
+        for embedding, metadata in zip(page["embeddings"], page["metadatas"]):
+            if metadata["type"] == "post":
+                key = f"post:{metadata.get('post_id')}"
+            else:
+                key = f"comment:{metadata.get('comment_id')}"
+            row = corpus.doc_index.get(key)
+            if row is not None:
+                rows.append(row)
+                embeddings.append(np.asarray(embedding, dtype=np.float32))
+        offset += len(page["ids"])
+    
+    if not embeddings:
+        return np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.int64)
+    return np.vstack(embeddings), np.asarray(rows, dtype=np.int64)
+
+
+def extract_clusters(corpus: Corpus, collection_name: str, n_clusters: int, top_terms: int = 5) -> List[Dict[str, Any]]:
+    """
+    Cluster the stored document embeddings and label clusters with c-TF-IDF.
+    
+    Every cluster is treated as one big document; a term's weight in a
+    cluster is its frequency there times log(1 + average cluster size /
+    its frequency over all clusters).
+    
+    Returns:
+        One dictionary per non-empty cluster, named after its top terms
+    """
+    embeddings, rows = _load_document_embeddings(collection_name, corpus)
+    if not len(rows) or not corpus.counts.shape[1]:
+        logger.warning("No embeddings in collection %s match the corpus, skipping clustering", collection_name)
+        return []
+    
+    labels = minibatch_kmeans(embeddings, n_clusters)
+    n_clusters = int(labels.max()) + 1
+    membership = sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (labels, rows)), shape=(n_clusters, corpus.n_documents)
+    )
+    class_counts = (membership @ corpus.counts).toarray()
+    term_frequency = class_counts / np.maximum(class_counts.sum(axis=1, keepdims=True), 1)
+    average_words = class_counts.sum() / n_clusters
+    weights = term_frequency * np.log(1 + average_words / np.maximum(class_counts.sum(axis=0), 1))
+    
+    by_sentiment = np.zeros((n_clusters, len(SENTIMENTS)), dtype=np.int64)
+    np.add.at(by_sentiment, (labels, corpus.sentiments[rows]), 1)
+    
+    clusters = []
+    for cluster in range(n_clusters):
+        if not by_sentiment[cluster].sum():
+            continue
+        keywords = [str(corpus.terms[term]) for term in np.argsort(-weights[cluster])[:top_terms] if weights[cluster, term] > 0]
+        if not keywords:
+            continue
+        clusters.append({
+            "topic": " / ".join(keywords[:3]),
+            "keywords": keywords,
+            **dict(zip(SENTIMENTS, map(int, by_sentiment[cluster]))),
+        })
+    return clusters
+
+
+def _save_topics(session: Session, topics: List[Dict[str, Any]], kinds: List[str]) -> None:
+    """Replace the stored topics of the given kinds in one transaction."""
+    now = datetime.datetime.utcnow()
+    session.execute(delete(TopicSummary).where(TopicSummary.kind.in_(kinds)))
+    merged: Dict[Tuple[str, str], TopicSummary] = {}
+    for topic in topics:
+        counts = [topic[sentiment] for sentiment in SENTIMENTS]
+        key = (topic["topic"], topic["kind"])
+        if key in merged:
+            continue  # Two clusters can share a label; keep the first one
+        merged[key] = TopicSummary(
+            topic=topic["topic"],
+            kind=topic["kind"],
+            mentions=sum(counts),
+            **dict(zip(SENTIMENTS, counts)),
+            sentiment=overall_sentiment(*counts),
+            keywords=",".join(topic["keywords"]),
+            updated_at=now,
+        )
+    session.add_all(merged.values())
+    session.commit()
+
+
+def extract_topics(
+    top: int = 50,
+    n_clusters: int = 0,
+    collection_name: str = "civicpulse",
+    min_df: int = 5,
+    max_df: float = 0.5
+) -> Dict[str, Any]:
+    """
+    Run the topic extraction job and persist the results.
+    
+    Args:
+        top: Number of keywords to keep
+        n_clusters: Number of embedding clusters (0 to skip clustering)
+        collection_name: ChromaDB collection holding the embeddings
+        min_df: Minimum document frequency of a term
+        max_df: Maximum share of documents containing a term
+    
+    Returns:
+        Statistics of the run
+    """
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        started = time.perf_counter()
+        corpus = build_corpus(session, min_df=min_df, max_df=max_df)
+        logger.info(
+            "Built %d x %d document-term matrix (%d non-zeros) in %.1fs",
+            corpus.n_documents, len(corpus.terms), corpus.counts.nnz, time.perf_counter() - started
+        )
+        
+        topics = [{**keyword, "kind": "keyword"} for keyword in extract_keywords(corpus, top=top)]
+        kinds = ["keyword"]
+        if n_clusters:
+            topics += [{**cluster, "kind": "cluster"} for cluster in extract_clusters(corpus, collection_name, n_clusters)]
+            kinds.append("cluster")
+        
+        _save_topics(session, topics, kinds)
+        elapsed = time.perf_counter() - started
+        logger.info("Stored %d topics in %.1fs", len(topics), elapsed)
+        return {
+            "documents": corpus.n_documents,
+            "terms": len(corpus.terms),
+            "topics": len(topics),
+            "seconds": round(elapsed, 1),
+        }
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Extract keywords and topics from posts and comments")
+    parser.add_argument("--top", type=int, default=50, help="Number of keywords to store")
+    parser.add_argument("--clusters", type=int, default=0, help="Cluster the stored embeddings into K topics")
+    parser.add_argument("--collection", type=str, default="civicpulse")
+    parser.add_argument("--min-df", type=int, default=5)
+    parser.add_argument("--max-df", type=float, default=0.5)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    stats = extract_topics(
+        top=args.top, n_clusters=args.clusters, collection_name=args.collection,
+        min_df=args.min_df, max_df=args.max_df
+    )
+    logger.info("Topic extraction finished: %s", stats)
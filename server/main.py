@@ -1,15 +1,51 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 
+import core
+from core import chroma_server_reachable, close_clients, warm_clients
 from core.config import get_settings
-from db import init_db
+from db import async_engine, engine, schema_is_current
 from api.dashboard import router as dashboard_router
 from api.v1 import chat
 from api.auth import router as auth_router
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
-app = FastAPI(title=settings.APP_NAME)
+HEALTH_CHECK_TIMEOUT = 2.0  # seconds
+
+
+def check_schema() -> None:
+    """Warn when the database is behind the migrations; applying them is a deploy step (`alembic upgrade head`)."""
+    try:
+        if not schema_is_current():
+            logger.warning("Database schema is behind the migrations; run `alembic upgrade head`")
+    except Exception:
+        logger.warning("Could not check the database schema version", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Off the startup path: the worker serves requests (and /health) while these run
+    background = [
+        asyncio.create_task(run_in_threadpool(check_schema)),
+        asyncio.create_task(run_in_threadpool(warm_clients)),
+    ]
+    yield
+    for task in background:
+        task.cancel()
+    await close_clients()
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,13 +55,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    init_db()
-    yield
-
-
 app.include_router(auth_router)
 app.include_router(dashboard_router)
 app.include_router(chat.router)
@@ -34,3 +63,39 @@ app.include_router(chat.router)
 @app.get("/")
 def read_root():
     return {"message": "Hello, World!"}
+
+
+async def _database_status() -> str:
+    if async_engine is None:
+        return "not configured"
+    try:
+        async with asyncio.timeout(HEALTH_CHECK_TIMEOUT):
+            async with async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+    except Exception:
+        return "unavailable"
+    return "ok"
+
+
+async def _chroma_status() -> str:
+    if not settings.CHROMA_HOST:
+        return "local"  # CHROMA_PERSIST_DIR by configuration, nothing to reach
+    if not await run_in_threadpool(chroma_server_reachable):
+        # Searches may be served from CHROMA_PERSIST_DIR meanwhile, but ingestion is refused
+        return "fallback" if core.chroma_backend == "fallback" else "unavailable"
+    return "ok" if core.chroma_backend == "http" else "not connected"
+
+
+@app.get("/health")
+async def health(response: Response):
+    """Dependency status; 503 while the database or the ChromaDB server is down"""
+    database, chroma = await asyncio.gather(_database_status(), _chroma_status())
+    checks = {
+        "database": database,
+        "chroma": chroma,
+        "llm": "configured" if settings.GROQ_API_KEY else "not configured",
+    }
+    if database != "ok" or chroma in ("unavailable", "fallback"):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    healthy = database == "ok" and chroma in ("ok", "local")
+    return {"status": "ok" if healthy else "degraded", "checks": checks}
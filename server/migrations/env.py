@@ -0,0 +1,69 @@
+"""
+Alembic environment for the CivicPulse schema.
+
+The database URL comes from the POSTGRES_* settings and the target metadata
+from the SQLModel models, so `alembic revision --autogenerate` diffs the
+database against db/models.py and models/user.py. Partitioning comment by
+month is not a migration; see db/partitions.py.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+from sqlmodel import SQLModel
+
+from core.config import get_settings
+from db.partitions import is_partition_name
+import db.models  # noqa: F401  (registers the tables with SQLModel.metadata)
+import models  # noqa: F401
+
+config = context.config
+# Leave logging alone when run from the app (db.init_db), which has its own setup
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # Monthly partitions belong to their parent table, not to the models
+    return not (type_ == "table" and is_partition_name(name))
+
+
+def _url() -> str:
+    return config.get_main_option("sqlalchemy.url") or get_settings().db_url
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL to stdout (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=_url(),
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run the migrations against the database, or on the connection handed in by db.init_db()."""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    connectable = create_engine(_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
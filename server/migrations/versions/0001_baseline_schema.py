@@ -0,0 +1,71 @@
+"""baseline schema
+
+The user, post and comment tables as the original models created them
+with SQLModel.metadata.create_all, before the schema was migration-managed.
+A database created that way already has them, so they are only created
+when missing and `alembic upgrade head` works on it without a stamp; 0002
+then adds whatever the later models introduced.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 06:16:55.538827
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'user' not in existing:
+        op.create_table('user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('hashed_password', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('full_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_user_email'), 'user', ['email'], unique=True)
+        op.create_index(op.f('ix_user_username'), 'user', ['username'], unique=True)
+    if 'post' not in existing:
+        op.create_table('post',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('source', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('url', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'comment' not in existing:
+        op.create_table('comment',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('post_id', sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('comment')
+    op.drop_index(op.f('ix_user_username'), table_name='user')
+    op.drop_index(op.f('ix_user_email'), table_name='user')
+    op.drop_table('user')
+    op.drop_table('post')
@@ -0,0 +1,129 @@
+"""ingestion and dashboard schema
+
+Source ids, subreddit and sentiment on post and comment, plus the tables
+behind incremental ChromaDB ingestion and the dashboard rollups. Databases
+created with SQLModel.metadata.create_all before the schema was
+migration-managed may have any of these tables already (create_all never
+added columns to existing ones), so every table and column is only
+created when missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 06:16:58.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEW_COLUMNS = {
+    'post': [
+        sa.Column('external_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('subreddit', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('sentiment', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('sentiment_score', sa.Float(), nullable=True),
+    ],
+    'comment': [
+        sa.Column('external_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('sentiment', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('sentiment_score', sa.Float(), nullable=True),
+    ],
+}
+
+
+def _create_tables(existing: set) -> None:
+    if 'dailysentimentrollup' not in existing:
+        op.create_table('dailysentimentrollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('source', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('sentiment', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('mentions', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'source', 'kind', 'sentiment')
+        )
+    if 'dailytopicrollup' not in existing:
+        op.create_table('dailytopicrollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('source', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('sentiment', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('topic', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('mentions', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'source', 'sentiment', 'topic')
+        )
+    if 'ingesteddocument' not in existing:
+        op.create_table('ingesteddocument',
+        sa.Column('collection_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('doc_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('chunk_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('collection_name', 'doc_id')
+        )
+    if 'ingestwatermark' not in existing:
+        op.create_table('ingestwatermark',
+        sa.Column('collection_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('high_water_mark', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('collection_name')
+        )
+    if 'topicsummary' not in existing:
+        op.create_table('topicsummary',
+        sa.Column('topic', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('mentions', sa.Integer(), nullable=False),
+        sa.Column('positive', sa.Integer(), nullable=False),
+        sa.Column('neutral', sa.Integer(), nullable=False),
+        sa.Column('negative', sa.Integer(), nullable=False),
+        sa.Column('sentiment', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('keywords', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('topic', 'kind')
+        )
+        op.create_index(op.f('ix_topicsummary_mentions'), 'topicsummary', ['mentions'], unique=False)
+    if 'topictrend' not in existing:
+        op.create_table('topictrend',
+        sa.Column('topic', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('as_of', sa.DateTime(), nullable=False),
+        sa.Column('fast_mentions', sa.Float(), nullable=False),
+        sa.Column('fast_negative', sa.Float(), nullable=False),
+        sa.Column('slow_mentions', sa.Float(), nullable=False),
+        sa.Column('slow_negative', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('topic')
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table, columns in NEW_COLUMNS.items():
+        present = {column['name'] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column.name in present:
+                continue
+            op.add_column(table, column)
+            if column.name == 'external_id':
+                op.create_unique_constraint(op.f(f'{table}_external_id_key'), table, ['external_id'])
+    _create_tables(set(inspector.get_table_names()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('topictrend')
+    op.drop_index(op.f('ix_topicsummary_mentions'), table_name='topicsummary')
+    op.drop_table('topicsummary')
+    op.drop_table('ingestwatermark')
+    op.drop_table('ingesteddocument')
+    op.drop_table('dailytopicrollup')
+    op.drop_table('dailysentimentrollup')
+    for table, columns in NEW_COLUMNS.items():
+        for column in reversed(columns):
+            op.drop_column(table, column.name)  # drops external_id's unique constraint with it
@@ -0,0 +1,34 @@
+"""user token version
+
+Adds user.token_version, carried in every JWT as the "ver" claim. Bumping
+it (core.auth.revoke_user_tokens) invalidates all tokens issued so far,
+which lets get_current_user serve users from a cache without trusting
+stale tokens. Existing rows and pre-upgrade tokens both start at 0.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 07:41:26.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'token_version')
@@ -0,0 +1,54 @@
+"""write sequence
+
+Adds write_seq to post and comment, drawn from one shared sequence on
+every insert (and on every update by the bulk loader), and keys the
+ingestion watermark on it instead of on Reddit's created_at. A created_at
+mark skipped rows loaded after it with older timestamps: pages the
+scraper resumes after newer ones, --no-ingest loads, and loads whose
+ChromaDB step failed after the database commit.
+
+Existing rows are numbered in table order. The old watermarks are
+dropped, so the next incremental run scans everything once (the content
+hashes keep unchanged documents from being rewritten).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 07:12:40.331907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('write_seq')))
+    for table in ('post', 'comment'):
+        # Volatile default: every existing row gets its own value
+        op.add_column(table, sa.Column('write_seq', sa.BigInteger(), server_default=sa.text("nextval('write_seq')"), nullable=False))
+        op.create_index(op.f(f'ix_{table}_write_seq'), table, ['write_seq'], unique=False)
+    op.execute("DELETE FROM ingestwatermark")
+    op.add_column('ingestwatermark', sa.Column('write_seq', sa.BigInteger(), nullable=False))
+    op.drop_column('ingestwatermark', 'high_water_mark')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM ingestwatermark")
+    op.add_column('ingestwatermark', sa.Column('high_water_mark', postgresql.TIMESTAMP(), autoincrement=False, nullable=False))
+    op.drop_column('ingestwatermark', 'write_seq')
+    for table in ('comment', 'post'):
+        op.drop_index(op.f(f'ix_{table}_write_seq'), table_name=table)
+        op.drop_column(table, 'write_seq')
+    op.execute(sa.schema.DropSequence(sa.Sequence('write_seq')))
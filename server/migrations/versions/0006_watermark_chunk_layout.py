@@ -0,0 +1,36 @@
+"""watermark chunk layout
+
+Adds ingestwatermark.chunk_layout, the CHUNK_SCHEMA_VERSION, chunk_size
+and chunk_overlap a watermark was recorded with. Incremental ingestion
+ignores a watermark whose layout differs from the current one, so bumping
+CHUNK_SCHEMA_VERSION rescans and rewrites every document instead of only
+the ones written after the mark. Existing marks get an empty layout and
+trigger that rescan once.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 09:05:12.648213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingestwatermark', sa.Column('chunk_layout', sqlmodel.sql.sqltypes.AutoString(), server_default='', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ingestwatermark', 'chunk_layout')
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""write_seq on update
+
+Gives a post or comment a new write_seq whenever an UPDATE changes its
+content, whoever issues it. Until now only the bulk loader's upsert drew
+a new value, so a row edited through the ORM (or by hand) never reached
+incremental ingestion. The trigger only looks at content, the one column
+ingestion hashes: relabelling sentiment doesn't make the rows look
+written again.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 14:21:37.508116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "CREATE FUNCTION bump_write_seq() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN NEW.write_seq := nextval('write_seq'); RETURN NEW; END $$"
+    )
+    for table in ('post', 'comment'):
+        # Also covers a comment table partitioned by db/partitions.py: the trigger is cloned to every partition
+        op.execute(
+            f"CREATE TRIGGER {table}_bump_write_seq BEFORE UPDATE ON {table} FOR EACH ROW "
+            "WHEN (OLD.content IS DISTINCT FROM NEW.content) EXECUTE FUNCTION bump_write_seq()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('post', 'comment'):
+        op.execute(f"DROP TRIGGER {table}_bump_write_seq ON {table}")
+    op.execute("DROP FUNCTION bump_write_seq()")
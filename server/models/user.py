@@ -11,6 +11,7 @@ class User(SQLModel, table=True):
     full_name: Optional[str] = None
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    token_version: int = Field(default=0)  # bumped to revoke every token issued so far (core.auth.revoke_user_tokens)
 
 
 class UserCreate(SQLModel):
@@ -41,4 +42,6 @@ class Token(SQLModel):
 
 class TokenData(SQLModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None
+    token_version: int = 0
 
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from core import auth
+from models.user import User
+
+
+@pytest.fixture(autouse=True)
+def cheap_bcrypt(monkeypatch):
+    monkeypatch.setattr(auth.settings, "BCRYPT_ROUNDS", 4)
+    # A pool per test whose threads are gone afterwards (later tests fork process pools)
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bcrypt")
+    monkeypatch.setattr(auth, "_hash_executor", executor)
+    yield
+    executor.shutdown()
+
+
+def test_hash_and_verify():
+    async def main():
+        hashed = await auth.get_password_hash("geheim")
+        return hashed, await auth.verify_password("geheim", hashed), await auth.verify_password("fout", hashed)
+
+    hashed, right, wrong = asyncio.run(main())
+    assert hashed.startswith("$2b$04$")
+    assert right and not wrong
+
+
+def test_verify_rejects_what_isnt_a_bcrypt_hash():
+    assert asyncio.run(auth.verify_password("geheim", "geheim")) is False
+
+
+def test_verify_rehashes_another_cost_factor(monkeypatch):
+    hashed = auth._hash("geheim")
+    assert auth._verify_and_update("geheim", hashed) == (True, None)
+    monkeypatch.setattr(auth.settings, "BCRYPT_ROUNDS", 5)
+    valid, new_hash = auth._verify_and_update("geheim", hashed)
+    assert valid and new_hash.startswith("$2b$05$")
+    assert auth._verify_and_update("fout", hashed) == (False, None)
+
+
+def test_hashing_runs_off_the_event_loop(monkeypatch):
+    threads = []
+    monkeypatch.setattr(auth, "_hash", lambda password: threads.append(threading.current_thread().name) or "x")
+    asyncio.run(auth.get_password_hash("geheim"))
+    assert threads[0].startswith("bcrypt") and threads[0] != threading.current_thread().name
+
+
+def test_hashing_runs_at_most_the_configured_number_at_a_time(monkeypatch):
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def slow_hash(password):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return password
+
+    async def main():
+        monkeypatch.setattr(auth, "_hash_slots", asyncio.Semaphore(2))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.create_task(ticker())
+        hashes = await asyncio.gather(*(auth.get_password_hash(str(n)) for n in range(6)))
+        ticking.cancel()
+        return hashes, ticks
+
+    monkeypatch.setattr(auth, "_hash", slow_hash)
+    hashes, ticks = asyncio.run(main())
+    assert hashes == [str(n) for n in range(6)]
+    assert peak == 2
+    assert ticks >= 10  # the event loop kept running while bcrypt did
+
+
+def test_cancelled_waiters_never_hash(monkeypatch):
+    hashed = []
+    monkeypatch.setattr(auth, "_hash", lambda password: hashed.append(password) or time.sleep(0.05) or password)
+
+    async def main():
+        monkeypatch.setattr(auth, "_hash_slots", asyncio.Semaphore(1))
+        first = asyncio.create_task(auth.get_password_hash("eerste"))
+        waiting = asyncio.create_task(auth.get_password_hash("tweede"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await first
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert hashed == ["eerste"]
+
+
+class FakeSession:
+    """Stands in for the database behind the user cache."""
+
+    def __init__(self, user):
+        self.user = user
+
+    async def get(self, model, user_id):
+        return self.user if user_id == self.user.id else None
+
+
+@pytest.fixture
+def session(monkeypatch):
+    user = User(id=7, email="anna@example.org", username="anna", hashed_password="x", token_version=3)
+    session = FakeSession(user)
+
+    async def get_async_session():
+        yield session
+
+    monkeypatch.setattr(auth.settings, "SECRET_KEY", auth.settings.SECRET_KEY or "test-secret")
+    monkeypatch.setattr(auth, "get_async_session", get_async_session)
+    auth._user_cache.set(user.username, user)
+    yield session
+    auth.invalidate_user_cache(user.username)
+
+
+def test_tokens_carry_no_active_claim(session):
+    assert auth.token_claims(session.user) == {"sub": "anna", "uid": 7, "ver": 3}
+
+
+def test_revoked_tokens_are_refused_on_both_paths(session):
+    token = auth.create_access_token(auth.token_claims(session.user))
+    assert asyncio.run(auth.get_optional_username(token)) == "anna"
+    assert asyncio.run(auth.get_current_user(token, session)) is session.user
+
+    session.user.token_version += 1  # as revoke_user_tokens() leaves it in the database
+    assert asyncio.run(auth.get_optional_username(token)) is None
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(auth.get_current_user(token, session))
+    assert error.value.status_code == 401
+
+
+def test_optional_username_ignores_inactive_users(session):
+    token = auth.create_access_token(auth.token_claims(session.user))
+    session.user.is_active = False
+    assert asyncio.run(auth.get_optional_username(token)) is None
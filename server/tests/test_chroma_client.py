@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+import core
+
+
+@pytest.fixture
+def chroma(monkeypatch):
+    """Fake server and clock; the server starts down."""
+    state = SimpleNamespace(up=False, now=100.0, probes=0)
+
+    def init_http_client():
+        state.probes += 1
+        return "http-client" if state.up else None
+
+    monkeypatch.setattr(core, "_init_chroma_client", init_http_client)
+    monkeypatch.setattr(core, "_init_local_chroma_client", lambda: "local-client")
+    monkeypatch.setattr(core, "time", SimpleNamespace(monotonic=lambda: state.now))
+    monkeypatch.setattr(core, "chroma_client", None)
+    monkeypatch.setattr(core, "chroma_backend", None)
+    monkeypatch.setattr(core, "_chroma_retry_at", 0.0)
+    settings = core.get_settings()
+    for name, value in dict(CHROMA_HOST="chroma", CHROMA_LOCAL_FALLBACK=False, CHROMA_RETRY_SECONDS=30.0).items():
+        monkeypatch.setattr(settings, name, value)
+    state.settings = settings
+    return state
+
+
+def test_no_fallback_unless_enabled(chroma):
+    with pytest.raises(RuntimeError):
+        core.get_chroma_client()
+    # Within CHROMA_RETRY_SECONDS the server isn't probed again
+    with pytest.raises(RuntimeError):
+        core.get_chroma_client()
+    assert chroma.probes == 1
+    chroma.up, chroma.now = True, 131.0
+    assert core.get_chroma_client() == "http-client"
+    assert core.chroma_backend == "http"
+
+
+def test_fallback_serves_readers_but_not_writers_until_the_server_is_back(chroma):
+    chroma.settings.CHROMA_LOCAL_FALLBACK = True
+    assert core.get_chroma_client() == "local-client"
+    assert core.chroma_backend == "fallback"
+    with pytest.raises(RuntimeError):
+        core.get_chroma_client(allow_fallback=False)
+
+    chroma.up = True
+    assert core.get_chroma_client() == "local-client"  # not probed again yet
+    chroma.now = 131.0
+    assert core.get_chroma_client(allow_fallback=False) == "http-client"
+    assert chroma.probes == 2
+
+
+def test_empty_host_means_the_local_store(chroma):
+    chroma.settings.CHROMA_HOST = ""
+    assert core.get_chroma_client(allow_fallback=False) == "local-client"
+    assert core.chroma_backend == "local"
+    assert chroma.probes == 0
@@ -0,0 +1,124 @@
+import math
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from core import embedding_cache
+from core.embedding_cache import TOUCH_INTERVAL, CachedEmbedder, EmbeddingCache
+from core.embeddings import HashingEmbedder, ParallelEmbedder
+
+
+class CountingEmbedder:
+    """Records every text it is asked to embed."""
+    name = "counting"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=100)
+    yield cache
+    cache.close()
+
+
+def test_hashing_embedder_is_deterministic_and_normalised():
+    embedder = HashingEmbedder(dimensions=64)
+    first, second = embedder.embed(["Afval op de Haagweg", "Afval op de Haagweg"])
+    assert len(first) == 64
+    assert first == second
+    assert math.isclose(math.sqrt(sum(value * value for value in first)), 1.0)
+    assert embedder.name == "hashing-64"
+
+
+def test_hashing_embedder_ignores_case_and_handles_empty_text():
+    embedder = HashingEmbedder(dimensions=32)
+    upper, lower, empty = embedder.embed(["Rijswijk Haagweg", "rijswijk haagweg", ""])
+    assert upper == lower
+    assert empty == [0.0] * 32
+
+
+def test_parallel_embedder_matches_in_process_order():
+    texts = [f"bericht nummer {i} over parkeren" for i in range(25)]
+    expected = HashingEmbedder(dimensions=16).embed(texts)
+    with ParallelEmbedder(HashingEmbedder(dimensions=16), workers=2, batch_size=4) as embedder:
+        assert embedder.embed(texts) == expected
+        assert embedder._pool is not None
+
+
+def test_parallel_embedder_embeds_small_batches_in_process():
+    with ParallelEmbedder(HashingEmbedder(dimensions=16), workers=4, batch_size=8) as embedder:
+        assert embedder.embed(["kort"]) == HashingEmbedder(dimensions=16).embed(["kort"])
+        assert embedder._pool is None
+        assert embedder.name == "hashing-16"
+
+
+def test_cached_embedder_embeds_each_text_once(cache):
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner, cache)
+    assert embedder.embed(["a", "bb", "a"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert inner.calls == [["a", "bb"]]
+
+    assert embedder.embed(["bb", "ccc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert inner.calls == [["a", "bb"], ["ccc"]]
+    assert len(cache) == 3
+
+
+def test_cached_embedder_keys_on_model_name(cache):
+    CachedEmbedder(CountingEmbedder(), cache).embed(["tekst"])
+    other = CountingEmbedder()
+    other.name = "other-model"
+    CachedEmbedder(other, cache).embed(["tekst"])
+    assert other.calls == [["tekst"]]
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=20)
+    try:
+        cache.put_many({f"key{i}": [float(i)] for i in range(20)})
+        clock.now += TOUCH_INTERVAL + 1
+        cache.get_many(["key0"])
+        cache.put_many({"key20": [20.0]})
+        assert len(cache) == 19  # evicts one entry extra
+        assert cache.get_many(["key0"]) == {"key0": [0.0]}
+        assert cache.get_many(["key1", "key2"]) == {}
+    finally:
+        cache.close()
+
+
+def test_embedding_cache_batches_last_used_refreshes(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "TOUCH_BATCH", 2)
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path, max_entries=20)
+
+    def last_used():
+        with sqlite3.connect(path) as connection:
+            return dict(connection.execute("SELECT key, last_used FROM embeddings"))
+
+    try:
+        cache.put_many({"a": [1.0], "b": [2.0], "c": [3.0]})
+        clock.now += 1
+        cache.get_many(["a", "b"])  # too recent to refresh
+        clock.now += TOUCH_INTERVAL
+        cache.get_many(["a"])
+        assert last_used()["a"] == 1000.0
+        cache.get_many(["b"])
+        assert last_used() == {"a": clock.now, "b": clock.now, "c": 1000.0}
+        clock.now += TOUCH_INTERVAL + 1
+        cache.get_many(["c"])
+    finally:
+        cache.close()
+    assert last_used()["c"] == clock.now  # written on close
@@ -0,0 +1,64 @@
+from api.v1.history import message_tokens, trim_to_token_budget
+from core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def exchange(n, length=40):
+    return [
+        {"role": "user", "content": f"vraag {n}".ljust(length)},
+        {"role": "assistant", "content": f"antwoord {n}".ljust(length)},
+    ]
+
+
+def test_trim_keeps_history_within_budget():
+    history = exchange(1) + exchange(2)
+    assert trim_to_token_budget(history, budget=1000) == history
+    assert trim_to_token_budget(history, budget=2 * message_tokens(history[0])) == exchange(2)
+    assert trim_to_token_budget(history, budget=0) == []
+
+
+def test_trim_starts_on_a_user_turn():
+    history = exchange(1) + exchange(2)
+    # Dropping only the first message would leave an assistant turn first
+    budget = sum(message_tokens(message) for message in history) - 1
+    assert trim_to_token_budget(history, budget) == exchange(2)
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl_cache_pop_and_clear():
+    cache = TTLCache(maxsize=2, ttl=60, clock=FakeClock())
+    cache.set("a", None)
+    assert "a" in cache  # stored None is still a hit
+    assert cache.pop("a", "gone") is None
+    assert cache.pop("a", "gone") == "gone"
+    cache.set("b", 2)
+    cache.clear()
+    assert len(cache) == 0
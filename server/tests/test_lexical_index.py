@@ -0,0 +1,69 @@
+import pytest
+
+from core.lexical_index import LexicalIndex, reciprocal_rank_fusion
+
+
+def build_index():
+    index = LexicalIndex()
+    index.add_many(
+        ["a", "b", "c"],
+        [
+            "Wegwerkzaamheden op de Haagweg in Rijswijk",
+            "Nieuwe speeltuin in het park",
+            "Haagweg weer open, Haagweg drukker dan ooit",
+        ],
+    )
+    return index
+
+
+def test_search_ranks_by_term_frequency():
+    results = build_index().search("haagweg", k=10)
+    assert [doc_id for doc_id, _ in results] == ["c", "a"]
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_search_respects_k_and_allowed_ids():
+    index = build_index()
+    assert [doc_id for doc_id, _ in index.search("haagweg", k=1)] == ["c"]
+    assert [doc_id for doc_id, _ in index.search("haagweg", allowed_ids={"a", "b"})] == ["a"]
+
+
+def test_search_without_matches_or_documents():
+    assert build_index().search("fietsenstalling") == []
+    assert build_index().search("de het") == []  # only stopwords
+    assert LexicalIndex().search("haagweg") == []
+
+
+def test_add_replaces_and_remove_frees_slot():
+    index = build_index()
+    index.add("a", "Speeltuin aan de Haagweg")
+    assert len(index) == 3
+    assert {doc_id for doc_id, _ in index.search("speeltuin")} == {"a", "b"}
+
+    index.remove("b")
+    index.remove("missing")
+    assert "b" not in index
+    assert [doc_id for doc_id, _ in index.search("speeltuin")] == ["a"]
+
+    index.add("d", "Bibliotheek")
+    assert len(index) == 3
+    assert index._slots["d"] == 1  # reuses b's slot
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "index" / "civicpulse.pkl")
+    index = build_index()
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+    assert len(loaded) == 3
+    assert loaded.search("haagweg") == index.search("haagweg")
+    loaded.add("e", "Haagweg")  # the lock survives pickling
+
+    assert len(LexicalIndex.load(str(tmp_path / "missing.pkl"))) == 0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+    assert reciprocal_rank_fusion([]) == []
@@ -0,0 +1,52 @@
+import asyncio
+
+from api.v1 import chat
+from api.v1.response_cache import ResponseCache, normalize_question, response_cache_key
+
+
+def key(**overrides):
+    arguments = dict(question="Wat vinden mensen van het afval?", model="llama", context="ctx")
+    arguments.update(overrides)
+    return response_cache_key(**arguments)
+
+
+def test_normalize_question():
+    assert normalize_question("  Wat  vinden mensen\nvan het AFVAL?! ") == "wat vinden mensen van het afval"
+
+
+def test_key_ignores_question_formatting():
+    assert key() == key(question="wat vinden mensen van het afval")
+
+
+def test_key_changes_with_question_model_and_context():
+    keys = {key(), key(question="En de parkeerdruk?"), key(model="other"), key(context="new ctx")}
+    assert len(keys) == 4
+
+
+def test_key_separates_fields():
+    assert key(question="afval", context="ctx") != key(question="afva", context="lctx")
+
+
+def test_cache_hit_skips_the_dashboard_queries(monkeypatch):
+    dashboard_calls = []
+
+    async def retrieve_context(request):
+        return "ctx", [{"url": "http://x"}]
+
+    async def format_dashboard_data_for_prompt():
+        dashboard_calls.append(1)
+        return "dash"
+
+    monkeypatch.setattr(chat, "get_async_llm_client", lambda: object())
+    monkeypatch.setattr(chat, "retrieve_context", retrieve_context)
+    monkeypatch.setattr(chat, "format_dashboard_data_for_prompt", format_dashboard_data_for_prompt)
+    monkeypatch.setattr(chat, "response_cache", ResponseCache(maxsize=10, ttl=60))
+    request = chat.ChatRequest(message="Wat vinden mensen van het afval?")
+
+    miss = asyncio.run(chat.prepare_chat(request, None))
+    assert miss.cached is None and dashboard_calls == [1]
+    chat.response_cache.set(miss.cache_key, {"response": "Veel klachten.", "sources": miss.sources})
+
+    hit = asyncio.run(chat.prepare_chat(request, None))
+    assert hit.cached == {"response": "Veel klachten.", "sources": [{"url": "http://x"}]}
+    assert dashboard_calls == [1]
@@ -0,0 +1,30 @@
+import datetime
+
+from api.v1.retrieval import RetrievalFilters
+
+
+def test_no_filters():
+    assert RetrievalFilters().to_where() is None
+    assert RetrievalFilters(sources=[], subreddits=[]).to_where() is None
+
+
+def test_single_filter_is_not_wrapped():
+    assert RetrievalFilters(min_score=5).to_where() == {"score": {"$gte": 5}}
+    assert RetrievalFilters(types=["post"]).to_where() == {"type": {"$in": ["post"]}}
+
+
+def test_filters_are_combined_with_and():
+    where = RetrievalFilters(
+        date_from=datetime.datetime(2025, 1, 1),
+        date_to=datetime.datetime(2025, 1, 31, tzinfo=datetime.timezone(datetime.timedelta(hours=1))),
+        sources=("reddit",),
+        subreddits=["Rijswijk", "TheHague"],
+        min_score=0,
+    ).to_where()
+    assert where == {"$and": [
+        {"created_at": {"$gte": 1735689600}},  # naive datetimes are UTC
+        {"created_at": {"$lte": 1738278000}},
+        {"source": {"$in": ["reddit"]}},
+        {"subreddit": {"$in": ["Rijswijk", "TheHague"]}},
+        {"score": {"$gte": 0}},
+    ]}
@@ -0,0 +1,53 @@
+import pytest
+
+from core.worker_pool import WorkerPool
+from db.sentiment import LexiconSentimentModel
+
+
+@pytest.fixture
+def model():
+    return LexiconSentimentModel()
+
+
+def test_labels_positive_negative_and_neutral(model):
+    labels = [label for label, _ in model.predict([
+        "Wat een mooie en schone straat, echt fijn",
+        "Terrible noise and dirty streets",
+        "De vergadering is dinsdag om acht uur",
+    ])]
+    assert labels == ["positive", "negative", "neutral"]
+
+
+def test_negation_flips_the_following_words(model):
+    assert model.score("goed") > 0
+    assert model.score("niet goed") < 0
+    assert model.score("not bad at all") > 0
+
+
+def test_negation_only_reaches_three_words(model):
+    assert model.score("geen idee wat ik ervan vind, goed") > 0
+
+
+def test_scores_stay_in_range_and_empty_text_is_neutral(model):
+    assert model.score("geweldig " * 50) <= 1.0
+    assert model.score("verschrikkelijk " * 50) >= -1.0
+    assert model.predict(["", None]) == [("neutral", 0.0), ("neutral", 0.0)]
+
+
+def test_longer_texts_need_more_evidence(model):
+    assert model.score("goed") > model.score("goed " + "woord " * 20)
+
+
+def test_threshold_decides_neutral(model):
+    assert model.predict(["prima"])[0][0] == "positive"
+    assert LexiconSentimentModel(threshold=1.0).predict(["prima"])[0][0] == "neutral"
+
+
+def test_worker_pool_matches_in_process(model):
+    texts = ["mooi", "vies", "gewoon een zin", "niet veilig"]
+    pool = WorkerPool(model, workers=2)
+    try:
+        predictions = [p for batch in pool.map("predict", [texts[:2], texts[2:]]) for p in batch]
+    finally:
+        pool.shutdown()
+    assert predictions == model.predict(texts)
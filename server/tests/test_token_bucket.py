@@ -0,0 +1,60 @@
+import asyncio
+import importlib.util
+import time
+from pathlib import Path
+
+import pytest
+
+SCRAPER = Path(__file__).resolve().parents[2] / "scraping" / "reddit-clean-scraper.py"
+
+
+@pytest.fixture(scope="module")
+def TokenBucket(tmp_path_factory):
+    # The scraper creates its datasets/ directory on import
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.chdir(tmp_path_factory.mktemp("scraper"))
+    try:
+        spec = importlib.util.spec_from_file_location("reddit_clean_scraper", SCRAPER)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        monkeypatch.undo()
+    return module.TokenBucket
+
+
+def timed(coroutine):
+    started = time.monotonic()
+    asyncio.run(coroutine)
+    return time.monotonic() - started
+
+
+def test_burst_goes_out_immediately(TokenBucket):
+    bucket = TokenBucket(rate=1, capacity=3)
+
+    async def burst():
+        for _ in range(3):
+            await bucket.acquire()
+
+    assert timed(burst()) < 0.1
+    assert bucket.tokens < 1
+
+
+def test_waits_for_refill_when_empty(TokenBucket):
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    async def requests():
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+
+    # One token saved up, four refilled at 20/s
+    assert 0.18 <= timed(requests()) < 0.5
+
+
+def test_pause_holds_back_everyone_and_empties_the_bucket(TokenBucket):
+    bucket = TokenBucket(rate=1000, capacity=5)
+
+    async def paused():
+        bucket.pause(0.2)
+        await asyncio.gather(bucket.acquire(), bucket.acquire())
+
+    assert timed(paused()) >= 0.2
+    assert bucket.tokens < 5
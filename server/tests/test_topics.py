@@ -0,0 +1,57 @@
+import numpy as np
+import scipy.sparse as sp
+
+from db.dashboard_queries import SENTIMENTS
+from db.topics import Corpus, extract_keywords, minibatch_kmeans, tfidf
+
+
+def corpus(rows, sentiments):
+    terms = np.array(["afval", "parkeren", "tram", "fiets"], dtype=object)
+    labels = np.array([SENTIMENTS.index(sentiment) for sentiment in sentiments], dtype=np.int8)
+    return Corpus(sp.csr_matrix(np.array(rows, dtype=np.float32)), terms, labels, {})
+
+
+def test_tfidf_rows_are_unit_length():
+    weights = tfidf(sp.csr_matrix(np.array([[3, 1, 0, 0], [0, 0, 0, 0], [1, 0, 2, 0]], dtype=np.float32)))
+    norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+    assert np.allclose(norms, [1.0, 0.0, 1.0])
+
+
+def test_tfidf_weighs_rare_terms_higher():
+    # Both terms occur once in the first document; "afval" is in every document, "parkeren" only there
+    weights = tfidf(sp.csr_matrix(np.array([[1, 1], [1, 0], [1, 0]], dtype=np.float32))).toarray()
+    assert weights[0, 1] > weights[0, 0]
+
+
+def test_tfidf_is_sublinear_in_term_counts():
+    weights = tfidf(sp.csr_matrix(np.array([[10, 1], [1, 1]], dtype=np.float32))).toarray()
+    assert np.isclose(weights[0, 0] / weights[0, 1], 1 + np.log(10))
+
+
+def test_extract_keywords_counts_mentions_per_sentiment():
+    keywords = extract_keywords(corpus(
+        [[2, 0, 1, 0], [1, 0, 0, 0], [1, 1, 0, 0], [0, 0, 1, 0]],
+        ["negative", "negative", "neutral", "positive"],
+    ), top=2)
+    assert [keyword["topic"] for keyword in keywords] == ["afval", "tram"]
+    assert keywords[0] == {"topic": "afval", "keywords": ["afval"], "positive": 0, "neutral": 1, "negative": 2}
+    assert keywords[1] == {"topic": "tram", "keywords": ["tram"], "positive": 1, "neutral": 0, "negative": 1}
+
+
+def test_extract_keywords_of_an_empty_corpus():
+    assert extract_keywords(corpus(np.zeros((2, 4)), ["neutral", "neutral"])) == []
+
+
+def test_minibatch_kmeans_separates_clusters():
+    rng = np.random.default_rng(1)
+    directions = np.eye(3)
+    vectors = np.concatenate([direction + rng.normal(scale=0.05, size=(50, 3)) for direction in directions])
+    labels = minibatch_kmeans(vectors, n_clusters=3, batch_size=32, iterations=50)
+    groups = [set(labels[start:start + 50]) for start in range(0, 150, 50)]
+    assert all(len(group) == 1 for group in groups)
+    assert len(set.union(*groups)) == 3
+
+
+def test_minibatch_kmeans_caps_clusters_at_the_number_of_vectors():
+    labels = minibatch_kmeans(np.array([[1.0, 0.0], [0.0, 1.0]]), n_clusters=5)
+    assert sorted(labels) == [0, 1]